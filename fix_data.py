@@ -12,7 +12,8 @@ from musicinsights.models import Upload
 from musicinsights.services.exportify_parser import parse_exportify_file
 
 def fix_data():
-    u = Upload.objects.first()
+    # Only uploads created around a stored file can be reparsed
+    u = Upload.objects.exclude(original_file='').first()
     if u:
         print(f"Reparsing upload: {u.original_file.name}")
         parse_exportify_file(u)
@@ -1,4 +1,5 @@
 import os
+import sys
 import django
 from django.core.files import File
 from pathlib import Path
@@ -9,7 +10,7 @@ django.setup()
 from musicinsights.models import Upload
 from musicinsights.services.exportify_parser import parse_exportify_file
 
-csv_path = Path(r'e:\Projects\musicdata-project\Your_Top_Songs_2024.csv')
+csv_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'Your_Top_Songs_2024.csv')
 
 with open(csv_path, 'rb') as f:
     upload = Upload.objects.create(original_file=File(f, name=csv_path.name))
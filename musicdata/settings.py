@@ -78,14 +78,68 @@ WSGI_APPLICATION = 'musicdata.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Tuned for several gunicorn workers sharing one SQLite file. WAL lets readers
+# run while a writer commits instead of blocking on the rollback journal;
+# synchronous=NORMAL is durable under WAL and skips an fsync per commit; the
+# page cache (negative = KiB) keeps the analytics tables in memory. Run on
+# every new connection.
+SQLITE_INIT_COMMAND = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    f"PRAGMA cache_size=-{int(os.environ.get('SQLITE_CACHE_KB', 64 * 1024))};"
+    'PRAGMA temp_store=MEMORY;'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            # Busy timeout (seconds): wait for the writer lock instead of failing with "database is locked"
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            # Take the write lock at BEGIN, so a transaction never fails mid-way upgrading from a read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Computed dashboard contexts keyed by playlist content hash. LocMemCache
+    # moves entries to the front on every read and culls from the back, so
+    # MAX_ENTRIES makes this a size-bounded LRU.
+    'snapshots': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard-snapshots',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('SNAPSHOT_CACHE_MAX_ENTRIES', 50)),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    # Spotify artist/top-track lookups, shared by every gunicorn worker:
+    # Redis when REDIS_URL is set, otherwise a table in the main database
+    # (created by `manage.py createcachetable` in build.sh).
+    'spotify': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'spotify_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,6 +191,34 @@ MEDIA_ROOT = BASE_DIR / 'media'
 SPOTIPY_CLIENT_ID = os.environ.get('SPOTIPY_CLIENT_ID')
 SPOTIPY_CLIENT_SECRET = os.environ.get('SPOTIPY_CLIENT_SECRET')
 
+# Lifetime (seconds) of cached Spotify lookups; misses are cached for less
+SPOTIFY_CACHE_TTL = int(os.environ.get('SPOTIFY_CACHE_TTL', 60 * 60 * 24))
+SPOTIFY_NEGATIVE_CACHE_TTL = int(os.environ.get('SPOTIFY_NEGATIVE_CACHE_TTL', 60 * 60))
+
+# Deep-cuts lookups: per-call timeout, overall deadline (seconds) and thread pool size
+SPOTIFY_REQUEST_TIMEOUT = float(os.environ.get('SPOTIFY_REQUEST_TIMEOUT', 3))
+SPOTIFY_DEADLINE = float(os.environ.get('SPOTIFY_DEADLINE', 6))
+SPOTIFY_MAX_WORKERS = int(os.environ.get('SPOTIFY_MAX_WORKERS', 5))
+
+# Deep cuts are computed off the request path by this many background threads
+# per process. Tests set DEEP_CUTS_RUN_INLINE to run the job synchronously.
+DEEP_CUTS_WORKERS = int(os.environ.get('DEEP_CUTS_WORKERS', 2))
+DEEP_CUTS_RUN_INLINE = False
+
+# Uploads are parsed as they stream in and rejected once past either limit
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+UPLOAD_MAX_ROWS = int(os.environ.get('UPLOAD_MAX_ROWS', 200_000))
+# Zipped library exports: total unzipped CSV size, and parser processes per
+# upload (1: parse in the request's own process; more are spawned, not forked)
+UPLOAD_MAX_ARCHIVE_BYTES = int(os.environ.get('UPLOAD_MAX_ARCHIVE_BYTES', 500 * 1024 * 1024))
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 1))
+
+# Sessions are compressed (zlib, or 'lzma') and kept under SESSION_MAX_BYTES
+# by evicting the least recently used playlists from the history (0: no limit)
+SESSION_SERIALIZER = 'musicinsights.session_serializer.CompressedJSONSerializer'
+SESSION_COMPRESSION = os.environ.get('SESSION_COMPRESSION', 'zlib')
+SESSION_MAX_BYTES = int(os.environ.get('SESSION_MAX_BYTES', 16 * 1024))
+
 
 # Google Analytics
 GOOGLE_ANALYTICS_ID = os.environ.get('GOOGLE_ANALYTICS_ID')
@@ -1,11 +1,8 @@
+from .services.history_index import get_history_index
+
 def recent_uploads(request):
-    # Fetch history from session
-    history = request.session.get('history', [])
-    
-    # Reverse to show newest first
-    dashboard_list = list(reversed(history))
-        
-    return {'recent_uploads': dashboard_list}
+    # Metadata-only index, already newest first; no playlist payloads are read
+    return {'recent_uploads': get_history_index(request)}
 
 def google_analytics(request):
     from django.conf import settings
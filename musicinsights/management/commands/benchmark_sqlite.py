@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Process, Queue
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from musicinsights.models import PlaylistEntry
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.playlist_store import load_playlist, save_playlist
+from musicinsights.services.sql_aggregation import aggregate_upload
+
+# sqlite3's default busy timeout, which is what Django used before OPTIONS were set
+DEFAULT_TIMEOUT = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Before/after benchmark for the SQLite settings and analytics indexes: "
+        "concurrent writers and readers on a scratch database with the default "
+        "journal vs settings.SQLITE_INIT_COMMAND, then the dashboard queries on "
+        "a generated playlist with and without the indexes. Changes to the "
+        "configured database are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Writer and reader processes each (default: 4)")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of the contention run (default: 5)")
+        parser.add_argument('--rows', type=int, default=100_000, help="Entries in the generated playlist (default: 100000)")
+
+    def handle(self, workers, seconds, rows, **options):
+        self.stdout.write(f"Contention: {workers} writers + {workers} readers for {seconds:g}s")
+        for label, init_command, timeout in (
+            ('before (rollback journal)', '', DEFAULT_TIMEOUT),
+            ('after (tuned)', settings.SQLITE_INIT_COMMAND, settings.DATABASES['default']['OPTIONS']['timeout']),
+        ):
+            commits, reads, errors = _contention(init_command, timeout, workers, seconds)
+            self.stdout.write(
+                f"  {label:<26} {commits / seconds:8.0f} commits/s {reads / seconds:8.0f} reads/s "
+                f"{errors:5d} lock errors"
+            )
+
+        self.stdout.write(f"Analytics queries on {rows} entries:")
+        with transaction.atomic():
+            upload = _generate_upload(rows)
+            after = _time_queries(upload)
+            with connection.cursor() as cursor:
+                for index in PlaylistEntry._meta.indexes:
+                    cursor.execute(f'DROP INDEX "{index.name}"')
+            before = _time_queries(upload)
+            transaction.set_rollback(True)
+
+        for name in after:
+            self.stdout.write(f"  {name:<26} before {before[name]:6.3f}s  after {after[name]:6.3f}s")
+
+
+def _contention(init_command, timeout, workers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE entry (id INTEGER PRIMARY KEY, upload INTEGER, value REAL)')
+        db.commit()
+        db.close()
+
+        results = Queue()
+        deadline = time.time() + seconds
+        processes = [
+            Process(target=_worker, args=(path, init_command, timeout, deadline, writer, results))
+            for writer in [True] * workers + [False] * workers
+        ]
+        for p in processes:
+            p.start()
+        totals = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+
+    commits = sum(count for writer, count, _ in totals if writer)
+    reads = sum(count for writer, count, _ in totals if not writer)
+    return commits, reads, sum(errors for _, _, errors in totals)
+
+
+def _worker(path, init_command, timeout, deadline, writer, results):
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    for pragma in filter(None, (p.strip() for p in init_command.split(';'))):
+        db.execute(pragma)
+
+    count = errors = 0
+    while time.time() < deadline:
+        try:
+            if writer:
+                # A small ingest-style transaction
+                db.execute('BEGIN IMMEDIATE')
+                db.executemany('INSERT INTO entry (upload, value) VALUES (?, ?)', [(count % 10, 0.5)] * 20)
+                db.execute('COMMIT')
+            else:
+                db.execute('SELECT upload, COUNT(*), AVG(value) FROM entry GROUP BY upload').fetchall()
+            count += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+    db.close()
+    results.put((writer, count, errors))
+
+
+def _generate_upload(rows):
+    template = generate_dummy_data()
+    entries = []
+    while len(entries) < rows:
+        copy = len(entries) // len(template)
+        for entry in template[:rows - len(entries)]:
+            # Distinct tracks per copy, like a real library
+            entries.append({**entry, 'track': {**entry['track'], 'uri': f"{entry['track']['uri']}-{copy}"}})
+    return save_playlist(entries, "benchmark")
+
+
+def _time_queries(upload):
+    timings = {}
+    for name, run in (
+        ('aggregate_upload', lambda: aggregate_upload(upload)),
+        ('load_playlist', lambda: load_playlist(upload)),
+        ('entries by added_at', lambda: list(PlaylistEntry.objects.filter(upload=upload).values_list('id', flat=True)[:100])),
+    ):
+        started = time.perf_counter()
+        run()
+        timings[name] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,66 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from musicinsights.models import Upload
+from musicinsights.services.bulk_import import find_sources, prepare_sources
+from musicinsights.services.playlist_store import save_playlist
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a directory or .zip of Exportify CSVs. Files are parsed in worker "
+        "processes and each is saved in its own transaction; files whose contents "
+        "were already imported are skipped, so an interrupted run can be restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Directory (searched recursively) or .zip archive")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Parser processes; 1 parses in this process (default: CPU count)",
+        )
+
+    def handle(self, path, workers, **options):
+        try:
+            sources = find_sources(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.verbosity = options['verbosity']
+        known_hashes = set(Upload.objects.exclude(source_hash='').values_list('source_hash', flat=True))
+        self.stats = {'imported': 0, 'skipped': 0, 'failed': 0, 'rows': 0}
+        started = time.perf_counter()
+
+        for name, prepare in prepare_sources(sources, workers, known_hashes):
+            self._save(name, known_hashes, prepare)
+
+        elapsed = time.perf_counter() - started
+        stats = self.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['imported']} files ({stats['rows']} rows) in {elapsed:.1f}s, "
+            f"{stats['rows'] / elapsed if elapsed else 0:.0f} rows/sec; "
+            f"skipped {stats['skipped']} already imported, {stats['failed']} failed."
+        ))
+
+    def _save(self, name, known_hashes, prepare):
+        try:
+            source_hash, frame, aggregate, filter_index = prepare()
+        except (ValueError, OSError, UnicodeError) as e:
+            self.stats['failed'] += 1
+            self.stderr.write(f"Failed {name}: {e}")
+            return
+
+        # Workers only know what was imported before the run started; this
+        # also catches the same file appearing twice in one run
+        if frame is None or source_hash in known_hashes:
+            self.stats['skipped'] += 1
+            return
+
+        save_playlist(
+            frame, os.path.basename(name), aggregate=aggregate, source_hash=source_hash, filter_index=filter_index,
+        )
+        known_hashes.add(source_hash)
+        self.stats['imported'] += 1
+        self.stats['rows'] += len(frame)
+        if self.verbosity > 1:
+            self.stdout.write(f"Imported {name} ({len(frame)} rows)")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0003_track_acousticness_track_danceability_track_energy_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='upload',
+            name='original_file',
+            field=models.FileField(blank=True, upload_to='uploads/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0004_upload_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
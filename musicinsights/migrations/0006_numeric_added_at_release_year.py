@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def backfill(apps, schema_editor):
+    """Fill the new columns for rows stored before they existed."""
+    PlaylistEntry = apps.get_model('musicinsights', 'PlaylistEntry')
+    Track = apps.get_model('musicinsights', 'Track')
+
+    # The original timestamp strings are gone, so use the stored (UTC) hour,
+    # which is what dashboards showed for these rows until now
+    entries = []
+    for entry in PlaylistEntry.objects.filter(added_at__isnull=False).only('id', 'added_at').iterator():
+        entry.added_hour = entry.added_at.hour
+        entries.append(entry)
+    PlaylistEntry.objects.bulk_update(entries, ['added_hour'], batch_size=BATCH_SIZE)
+
+    tracks = []
+    for track in Track.objects.exclude(release_date__isnull=True).exclude(release_date='').only('id', 'release_date').iterator():
+        try:
+            track.release_year = int(track.release_date[:4])
+        except ValueError:
+            continue
+        tracks.append(track)
+    Track.objects.bulk_update(tracks, ['release_year'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0005_upload_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlistentry',
+            name='added_hour',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='release_year',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0006_numeric_added_at_release_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='aggregate',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
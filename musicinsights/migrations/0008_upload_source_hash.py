@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0007_upload_aggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def split_genres(apps, schema_editor):
+    """Move each track's comma-joined genres into Genre rows and M2M links, keeping their order."""
+    Track = apps.get_model('musicinsights', 'Track')
+    Genre = apps.get_model('musicinsights', 'Genre')
+    TrackGenre = Track.genres.through
+
+    track_genres = []
+    for track_id, text in Track.objects.exclude(genres_text__isnull=True).exclude(genres_text='').values_list('id', 'genres_text').iterator():
+        names = list(dict.fromkeys(g for g in text.split(',') if g))
+        track_genres.append((track_id, names))
+
+    names = {name for _, track_names in track_genres for name in track_names}
+    Genre.objects.bulk_create([Genre(name=name) for name in names], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    genre_pks = dict(Genre.objects.values_list('name', 'id'))
+
+    TrackGenre.objects.bulk_create(
+        [
+            TrackGenre(track_id=track_id, genre_id=genre_pks[name])
+            for track_id, track_names in track_genres
+            for name in track_names
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0008_upload_source_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='track',
+            old_name='genres',
+            new_name='genres_text',
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='genres',
+            field=models.ManyToManyField(related_name='tracks', to='musicinsights.genre'),
+        ),
+        migrations.RunPython(split_genres, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='track',
+            name='genres_text',
+        ),
+    ]
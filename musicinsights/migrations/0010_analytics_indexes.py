@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0009_genre'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playlistentry',
+            index=models.Index(fields=['upload', 'added_at'], name='entry_upload_added_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlistentry',
+            index=models.Index(fields=['upload', 'track'], name='entry_upload_track_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlistentry',
+            index=models.Index(fields=['upload', 'added_hour'], name='entry_upload_hour_idx'),
+        ),
+    ]
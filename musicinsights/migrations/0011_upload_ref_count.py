@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0010_analytics_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='ref_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
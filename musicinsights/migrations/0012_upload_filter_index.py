@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musicinsights', '0011_upload_ref_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='filter_index',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
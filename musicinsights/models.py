@@ -4,7 +4,17 @@ from django.db import models
 
 class Upload(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
-    original_file = models.FileField(upload_to='uploads/')
+    original_file = models.FileField(upload_to='uploads/', blank=True)
+    name = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # SHA-256 of the raw file: byte-identical uploads and bulk reimports reuse this Upload
+    source_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Session histories referencing this Upload; it's deleted when the last one lets go
+    ref_count = models.PositiveIntegerField(default=1)
+    # PlaylistAggregate.to_dict(), computed at ingest so dashboards skip the row scan
+    aggregate = models.JSONField(null=True, blank=True)
+    # FilterIndex.to_dict(), built at ingest so dashboard filters never re-read the rows
+    filter_index = models.JSONField(null=True, blank=True)
 
 
     def __str__(self):
@@ -17,6 +27,12 @@ class Artist(models.Model):
     def __str__(self):
         return self.name
 
+class Genre(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
 class Album(models.Model):
     spotify_id = models.CharField(max_length=100, unique=True)
     name = models.CharField(max_length=255)
@@ -31,7 +47,8 @@ class Track(models.Model):
     duration_ms = models.IntegerField(null=True, blank=True)
     album = models.ForeignKey(Album, on_delete=models.SET_NULL, null=True, blank=True)
     artists = models.ManyToManyField(Artist, related_name='tracks')
-    genres = models.TextField(null=True, blank=True)
+    # In the order the export lists them
+    genres = models.ManyToManyField(Genre, related_name='tracks')
 
     # Audio Features
     danceability = models.FloatField(null=True, blank=True)
@@ -44,6 +61,7 @@ class Track(models.Model):
     tempo = models.FloatField(null=True, blank=True)
     popularity = models.IntegerField(null=True, blank=True)
     release_date = models.CharField(max_length=20, null=True, blank=True)
+    release_year = models.SmallIntegerField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -54,6 +72,22 @@ class PlaylistEntry(models.Model):
     track = models.ForeignKey(Track, on_delete=models.CASCADE)
     playlist_name = models.CharField(max_length=255, blank=True, null=True)
     added_at = models.DateTimeField(null=True, blank=True)
+    # Hour as written in the export (added_at itself is stored in UTC); None for date-only values
+    added_hour = models.PositiveSmallIntegerField(null=True, blank=True)
 
     class Meta:
-        ordering = ['-added_at']
\ No newline at end of file
+        ordering = ['-added_at']
+        # Every analytics query is scoped to one upload. (upload, track) and
+        # (upload, added_hour) cover the GROUP BYs in sql_aggregation, so they
+        # never touch the table itself; (upload, added_at) serves the default ordering.
+        indexes = [
+            models.Index(fields=['upload', 'added_at'], name='entry_upload_added_at_idx'),
+            models.Index(fields=['upload', 'track'], name='entry_upload_track_idx'),
+            models.Index(fields=['upload', 'added_hour'], name='entry_upload_hour_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Entries created one at a time (admin, shell) rather than by save_playlist
+        if self.added_hour is None and self.added_at is not None:
+            self.added_hour = self.added_at.hour
+        super().save(*args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,306 @@
+from collections import Counter
+from .exportify_parser import parse_added_at, parse_release_year
+from .playlist_frame import PlaylistFrame
+
+FEATURES = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'liveness', 'speechiness']
+
+TIME_OF_DAY_LABELS = ['Morning', 'Afternoon', 'Evening', 'Night']
+POPULARITY_LABELS = ['0-20', '21-40', '41-60', '61-80', '81-100']
+TEMPO_LABELS = ['<80 BPM', '80-100 BPM', '100-120 BPM', '120-140 BPM', '>140 BPM']
+
+# Bump whenever to_dict()'s layout changes; stored aggregates with another
+# version are recomputed from the playlist's rows.
+AGGREGATE_VERSION = 1
+
+# Counters keyed by something other than a track; a key drops out once its count reaches zero
+COUNTER_FIELDS = ['artist_counter', 'genre_counter', 'hour_counter', 'era_counts', 'uri_counts']
+# Fixed-label histograms, which keep every label even at zero
+BUCKET_FIELDS = ['time_of_day_counts', 'popularity_counts', 'tempo_counts']
+# The parts of a track dict the dashboard reads back from track_objects
+SUMMARY_TRACK_FIELDS = ['name', 'artists', 'album', 'valence', 'energy']
+
+
+class PlaylistAggregate:
+    """
+    Everything the dashboard, recommendations and Spotify deep cuts count
+    about a playlist, gathered in a single pass over its entries.
+
+    Aggregates form a monoid: `a + b` is the aggregate of both playlists'
+    entries and `a - b` takes b's entries back out, so a new version of a
+    playlist can be aggregated from the previous one plus the changed rows.
+    track_rows is per-entry display data and is only filled by add();
+    combined and stored aggregates leave it empty.
+    """
+
+    def __init__(self):
+        self.total_tracks = 0
+        self.total_duration_ms = 0
+        self.playlist_name = None
+
+        self.artist_counter = Counter()
+        self.artist_duration = Counter()
+        self.genre_counter = Counter()
+        self.hour_counter = Counter()
+        self.time_of_day_counts = {label: 0 for label in TIME_OF_DAY_LABELS}
+        self.era_counts = Counter()
+        self.popularity_counts = {label: 0 for label in POPULARITY_LABELS}
+        self.tempo_counts = {label: 0 for label in TEMPO_LABELS}
+
+        self.feature_totals = {f: 0.0 for f in FEATURES}
+        self.feature_counts = {f: 0 for f in FEATURES}
+        self.tempo_total = 0.0
+        self.high_energy_tracks = 0
+
+        self.uri_counts = Counter()
+
+        # Per-track data (not just counts) that the dashboard tables need
+        self.track_listening_time = Counter()  # Key: (track_name, artist_name), Value: duration
+        self.track_entry_counts = Counter()  # Key: (track_name, artist_name), Value: number of entries
+        self.track_objects = {}  # Key: (track_name, artist_name), Value: track dict
+        self.track_rows = []  # One bucketed row per entry, for frontend JS filtering
+
+    @property
+    def known_uris(self):
+        return set(self.uri_counts)
+
+    def add(self, entry):
+        track = entry['track']
+        duration_ms = track.get('duration_ms') or 0
+
+        if self.total_tracks == 0:
+            self.playlist_name = entry.get('playlist_name')
+        self.total_tracks += 1
+        self.total_duration_ms += duration_ms
+
+        if track.get('uri'):
+            self.uri_counts[track['uri']] += 1
+
+        # Track Key for aggregation
+        artist_names = ", ".join(track['artists'])
+        track_key = (track['name'], artist_names)
+        self.track_objects[track_key] = track
+        self.track_listening_time[track_key] += duration_ms
+        self.track_entry_counts[track_key] += 1
+
+        for artist_name in track['artists']:
+            self.artist_counter[artist_name] += 1
+            self.artist_duration[artist_name] += duration_ms
+
+        # Parsed entries carry numeric fields; hand-built ones may only have the strings
+        if 'added_hour' in entry:
+            hour = entry['added_hour']
+        else:
+            hour = added_at_hour(entry.get('added_at'))
+        time_str = None
+        if hour is not None:
+            self.hour_counter[hour] += 1
+            time_str = time_of_day_bucket(hour)
+            self.time_of_day_counts[time_str] += 1
+
+        if 'release_year' in track:
+            era_str = era_for_year(track['release_year'])
+        else:
+            era_str = era_bucket(track.get('release_date'))
+        if era_str:
+            self.era_counts[era_str] += 1
+
+        pop_str = popularity_bucket(track.get('popularity'))
+        if pop_str:
+            self.popularity_counts[pop_str] += 1
+
+        bpm = track.get('tempo')
+        tempo_str = tempo_bucket(bpm)
+        if tempo_str:
+            self.tempo_counts[tempo_str] += 1
+            self.tempo_total += bpm
+
+        for f in FEATURES:
+            val = track.get(f)
+            if val is not None:
+                self.feature_totals[f] += val
+                self.feature_counts[f] += 1
+
+        energy = track.get('energy')
+        if energy and energy > 0.7:
+            self.high_energy_tracks += 1
+
+        track_genres = track.get('genres', [])
+        for g in track_genres:
+            self.genre_counter[g] += 1
+
+        row = {
+            'name': track['name'],
+            'artist': artist_names,
+            'album': track['album'],
+            'listening_time_hours': round(duration_ms / (1000 * 60 * 60), 3),
+            'duration_ms': duration_ms, # Needed for aggregation
+            'era': era_str,
+            'time_of_day': time_str,
+            'popularity_bucket': pop_str,
+            'tempo_bucket': tempo_str,
+            'genres': track_genres,
+            'url': track.get('external_urls', {}).get('spotify', '#')
+        }
+        for f in FEATURES:
+            row[f] = track.get(f)
+        self.track_rows.append(row)
+
+    def avg_features(self):
+        return [
+            round(self.feature_totals[f] / self.feature_counts[f], 3) if self.feature_counts[f] > 0 else 0
+            for f in FEATURES
+        ]
+
+    def __add__(self, other):
+        return self._combine(other, 1)
+
+    def __sub__(self, other):
+        return self._combine(other, -1)
+
+    def _combine(self, other, sign):
+        result = PlaylistAggregate()
+        result.total_tracks = self.total_tracks + sign * other.total_tracks
+        result.total_duration_ms = self.total_duration_ms + sign * other.total_duration_ms
+        result.high_energy_tracks = self.high_energy_tracks + sign * other.high_energy_tracks
+        result.playlist_name = self.playlist_name if self.total_tracks else other.playlist_name
+
+        for name in COUNTER_FIELDS + ['track_entry_counts']:
+            counts = _combine_counts(getattr(self, name), getattr(other, name), sign)
+            setattr(result, name, Counter({k: v for k, v in counts.items() if v > 0}))
+        # Durations and track data follow the entry counts: an artist whose tracks
+        # all total 0 ms still appears, one with no entries left doesn't
+        result.artist_duration = _combine_counts(self.artist_duration, other.artist_duration, sign)
+        result.track_listening_time = _combine_counts(self.track_listening_time, other.track_listening_time, sign)
+        track_objects = {**self.track_objects, **other.track_objects} if sign > 0 else self.track_objects
+        for counter, keys in ((result.artist_duration, result.artist_counter),
+                              (result.track_listening_time, result.track_entry_counts)):
+            for key in [k for k in counter if k not in keys]:
+                del counter[key]
+        result.track_objects = {k: track_objects[k] for k in result.track_entry_counts}
+
+        for name in BUCKET_FIELDS:
+            theirs = getattr(other, name)
+            setattr(result, name, {label: n + sign * theirs[label] for label, n in getattr(self, name).items()})
+
+        for f in FEATURES:
+            result.feature_counts[f] = self.feature_counts[f] + sign * other.feature_counts[f]
+            # Reset rather than keep subtraction's float residue once nothing is left
+            if result.feature_counts[f]:
+                result.feature_totals[f] = self.feature_totals[f] + sign * other.feature_totals[f]
+        if any(result.tempo_counts.values()):
+            result.tempo_total = self.tempo_total + sign * other.tempo_total
+        return result
+
+    def to_dict(self):
+        """JSON-serializable form for storage (see Upload.aggregate); track_rows isn't included."""
+        return {
+            'version': AGGREGATE_VERSION,
+            'total_tracks': self.total_tracks,
+            'total_duration_ms': self.total_duration_ms,
+            'playlist_name': self.playlist_name,
+            # Lists of pairs rather than objects: keeps int keys and insertion order
+            'counters': {name: list(getattr(self, name).items()) for name in COUNTER_FIELDS + ['artist_duration']},
+            'buckets': {name: getattr(self, name) for name in BUCKET_FIELDS},
+            'feature_totals': self.feature_totals,
+            'feature_counts': self.feature_counts,
+            'tempo_total': self.tempo_total,
+            'high_energy_tracks': self.high_energy_tracks,
+            'tracks': [
+                [name, artist, self.track_listening_time[(name, artist)], count,
+                 {f: self.track_objects[(name, artist)].get(f) for f in SUMMARY_TRACK_FIELDS}]
+                for (name, artist), count in self.track_entry_counts.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregate = cls()
+        aggregate.total_tracks = data['total_tracks']
+        aggregate.total_duration_ms = data['total_duration_ms']
+        aggregate.playlist_name = data['playlist_name']
+        for name, pairs in data['counters'].items():
+            setattr(aggregate, name, Counter(dict(pairs)))
+        for name, buckets in data['buckets'].items():
+            setattr(aggregate, name, dict(buckets))
+        aggregate.feature_totals = dict(data['feature_totals'])
+        aggregate.feature_counts = dict(data['feature_counts'])
+        aggregate.tempo_total = data['tempo_total']
+        aggregate.high_energy_tracks = data['high_energy_tracks']
+        for name, artist, listening_time, count, track in data['tracks']:
+            aggregate.track_listening_time[(name, artist)] = listening_time
+            aggregate.track_entry_counts[(name, artist)] = count
+            aggregate.track_objects[(name, artist)] = track
+        return aggregate
+
+
+# Frames at least this long go through the numpy backend when it's installed;
+# below it the per-row loop is already fast and skips numpy's fixed overhead.
+VECTORIZE_MIN_ROWS = 1000
+
+
+def aggregate_playlist(playlist_data, vectorize=None):
+    """
+    One pass over a list of entries or a PlaylistFrame.
+
+    Large frames are aggregated column-wise with numpy if it's available
+    (see vectorized_aggregation); pass vectorize=True/False to force a backend.
+    """
+    from . import vectorized_aggregation  # imports this module
+
+    if isinstance(playlist_data, PlaylistFrame) and vectorized_aggregation.available():
+        if vectorize or (vectorize is None and len(playlist_data) >= VECTORIZE_MIN_ROWS):
+            return vectorized_aggregation.aggregate_frame(playlist_data)
+
+    aggregate = PlaylistAggregate()
+    for entry in playlist_data:
+        aggregate.add(entry)
+    return aggregate
+
+
+def _combine_counts(mine, theirs, sign):
+    combined = Counter(mine)
+    for key, value in theirs.items():
+        combined[key] += sign * value
+    return combined
+
+
+def added_at_hour(added_at_str):
+    """Hour of day from an Exportify 'Added At' ISO timestamp, or None if it has no time part."""
+    return parse_added_at(added_at_str)[1]
+
+
+def time_of_day_bucket(hour):
+    if 5 <= hour <= 11: return 'Morning'
+    elif 12 <= hour <= 17: return 'Afternoon'
+    elif 18 <= hour <= 23: return 'Evening'
+    else: return 'Night'
+
+
+def era_bucket(release_date):
+    return era_for_year(parse_release_year(release_date))
+
+
+def era_for_year(year):
+    if year is None:
+        return None
+    return f"{(year // 10) * 10}s"
+
+
+def popularity_bucket(pop):
+    if pop is None:
+        return None
+    if pop <= 20: return '0-20'
+    elif pop <= 40: return '21-40'
+    elif pop <= 60: return '41-60'
+    elif pop <= 80: return '61-80'
+    else: return '81-100'
+
+
+def tempo_bucket(bpm):
+    if not bpm:
+        return None
+    if bpm < 80: return '<80 BPM'
+    elif bpm < 100: return '80-100 BPM'
+    elif bpm < 120: return '100-120 BPM'
+    elif bpm < 140: return '120-140 BPM'
+    else: return '>140 BPM'
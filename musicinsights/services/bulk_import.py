@@ -0,0 +1,150 @@
+import hashlib
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from .aggregation import aggregate_playlist
+from .exportify_parser import DEFAULT_CHUNK_SIZE, iter_exportify_entries
+from .filter_index import FilterIndex
+from .playlist_frame import PlaylistFrame
+
+# Everything but prepare_sources runs in worker processes (import_exportify's
+# and zip uploads'), so it only parses and aggregates; the database writes
+# stay in the parent.
+
+
+def find_sources(path):
+    """
+    The Exportify CSVs under a directory (recursively) or inside a .zip, as
+    (archive, name) pairs: archive is the zip's path or None, and name is
+    the file's path or its member name within the zip. Sorted by name.
+    """
+    if zipfile.is_zipfile(path):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                names = [info.filename for info in archive.infolist()
+                         if not info.is_dir() and info.filename.lower().endswith('.csv')]
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"{path} is not a valid zip archive: {e}") from e
+        return [(path, name) for name in sorted(names)]
+
+    if not os.path.isdir(path):
+        raise ValueError(f"{path} is neither a directory nor a zip archive.")
+    names = []
+    for root, _, files in os.walk(path):
+        names.extend(os.path.join(root, f) for f in files if f.lower().endswith('.csv'))
+    return [(None, name) for name in sorted(names)]
+
+
+def hash_source(archive, name):
+    """SHA-256 of a source file's raw bytes."""
+    with _open_source(archive, name) as f:
+        return hash_file(f)
+
+
+def hash_file(f):
+    """SHA-256 of a binary file object's remaining bytes, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(DEFAULT_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_source(archive, name):
+    """Parse, aggregate and index one source file into (PlaylistFrame, PlaylistAggregate, FilterIndex)."""
+    with _open_source(archive, name) as f:
+        frame = PlaylistFrame.from_entries(iter_exportify_entries(f, name))
+    # Row by row, since the filter index needs track_rows
+    aggregate = aggregate_playlist(frame, vectorize=False)
+    filter_index = FilterIndex.from_aggregate(aggregate)
+    # Per-entry display rows aren't stored, so don't pickle them back to the parent
+    aggregate.track_rows = []
+    return frame, aggregate, filter_index
+
+
+# What reading a damaged zip member raises, or an encrypted one
+# (RuntimeError), or one with an unsupported compression method
+ZIP_ERRORS = (zipfile.BadZipFile, RuntimeError, NotImplementedError)
+
+
+# Raw-file hashes already in the database, set once per worker process by init_worker
+_known_hashes = frozenset()
+
+
+def init_worker(known_hashes):
+    global _known_hashes
+    _known_hashes = frozenset(known_hashes)
+
+
+def prepare_source(archive, name):
+    """
+    Worker task: (source_hash, frame, aggregate, filter_index) for one
+    source file, with all but the hash None if a file with that hash was
+    already imported. Zip members that can't be read raise ValueError, like
+    malformed CSVs do.
+    """
+    try:
+        source_hash = hash_source(archive, name)
+        if source_hash in _known_hashes:
+            return source_hash, None, None, None
+        return (source_hash, *parse_source(archive, name))
+    except ZIP_ERRORS as e:
+        if archive is None:
+            raise
+        raise ValueError(f"{name} could not be read from the archive: {e}") from e
+
+
+def prepare_sources(sources, workers, known_hashes=frozenset(), mp_context=None):
+    """
+    Run prepare_source over (archive, name) pairs in a pool of `workers`
+    processes, yielding (name, result) as each finishes, where result()
+    returns prepare_source's value or raises its error. With one worker
+    everything runs in this process instead. mp_context picks how worker
+    processes are started (the platform default if None).
+    """
+    if workers <= 1:
+        init_worker(known_hashes)
+        for archive, name in sources:
+            yield name, partial(prepare_source, archive, name)
+        return
+
+    # Keep a bounded number of files in flight so parsed frames don't pile
+    # up in memory when the (single) database writer falls behind
+    pending = {}
+    queue = iter(sources)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp_context, initializer=init_worker, initargs=(known_hashes,),
+    ) as pool:
+        while True:
+            for archive, name in queue:
+                pending[pool.submit(prepare_source, archive, name)] = name
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result
+
+
+def _open_source(archive, name):
+    if archive is None:
+        return open(name, 'rb')
+    # ZipExtFile.close() doesn't close the archive, so keep a reference for the caller's `with`
+    return _ZipMember(archive, name)
+
+
+class _ZipMember:
+    def __init__(self, archive, name):
+        self._archive = zipfile.ZipFile(archive)
+        self._member = self._archive.open(name)
+
+    def read(self, size=-1):
+        return self._member.read(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._member.close()
+        self._archive.close()
@@ -0,0 +1,76 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from .spotify_cache import SPOTIFY_CACHE_ALIAS
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+READY = 'ready'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_deep_cuts(content_hash, build_aggregate, spotify):
+    """
+    Deep cuts for a playlist (or library) as (status, tracks). On a miss,
+    build_aggregate() is called from the job for its PlaylistAggregate.
+
+    Results are cached per content hash in the shared Spotify cache,
+    so once any worker has computed them every later view is instant. On a
+    miss a background job is queued and (PENDING, []) is returned; the
+    dashboard polls until it gets (READY, tracks).
+    """
+    cache = caches[SPOTIFY_CACHE_ALIAS]
+    key = _result_key(content_hash)
+
+    tracks = cache.get(key)
+    if tracks is not None:
+        return READY, tracks
+
+    # cache.add is atomic, so only one worker (process or thread) queues the job
+    if cache.add(_pending_key(content_hash), True, timeout=settings.SPOTIFY_DEADLINE * 4):
+        if settings.DEEP_CUTS_RUN_INLINE:
+            _run_job(content_hash, build_aggregate, spotify)
+            return READY, cache.get(key, [])
+        _get_executor().submit(_run_job, content_hash, build_aggregate, spotify)
+    return PENDING, []
+
+
+def _run_job(content_hash, build_aggregate, spotify):
+    cache = caches[SPOTIFY_CACHE_ALIAS]
+    try:
+        tracks = spotify.get_missing_top_tracks(None, aggregate=build_aggregate())
+        # Empty usually means Spotify failed or timed out; retry sooner
+        timeout = settings.SPOTIFY_CACHE_TTL if tracks else settings.SPOTIFY_NEGATIVE_CACHE_TTL
+        cache.set(_result_key(content_hash), tracks, timeout)
+    except Exception:
+        logger.exception("Deep cuts job failed for %s", content_hash)
+    finally:
+        cache.delete(_pending_key(content_hash))
+        if not settings.DEEP_CUTS_RUN_INLINE:
+            # Worker threads get their own DB connections; don't leak them
+            connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DEEP_CUTS_WORKERS,
+                thread_name_prefix='deep-cuts',
+            )
+        return _executor
+
+
+def _result_key(content_hash):
+    return f"deep_cuts:{content_hash}"
+
+
+def _pending_key(content_hash):
+    return f"deep_cuts:{content_hash}:pending"
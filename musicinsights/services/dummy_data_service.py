@@ -1,10 +1,17 @@
 import random
+import uuid
 from datetime import datetime, timedelta
+from .exportify_parser import parse_added_at, parse_release_year
+
+# Demo track URIs start with this, followed by a per-call run id, so each
+# generated demo has its own Track rows instead of rewriting shared ones
+DEMO_URI_PREFIX = 'spotify:track:dummy-'
 
 def generate_dummy_data():
     """
     Generates a list of dummy track entries mimicking the structure of parsed Exportify CSV data.
     """
+    run_id = uuid.uuid4().hex[:12]
     
     genres_list = ['Pop', 'Rock', 'Hip Hop', 'Jazz', 'Electronic', 'Classical', 'Indie', 'R&B']
     artists_pool = [
@@ -51,7 +58,7 @@ def generate_dummy_data():
                 'album': album,
                 'duration_ms': random.randint(120000, 300000), # 2-5 minutes
                 'genres': track_genres,
-                'uri': f'spotify:track:dummy{i}',
+                'uri': f'{DEMO_URI_PREFIX}{run_id}-{i}',
                 'danceability': danceability,
                 'energy': energy,
                 'valence': random.uniform(0.1, 0.9),
@@ -66,6 +73,8 @@ def generate_dummy_data():
             'added_at': (base_date - timedelta(days=random.randint(0, 365))).isoformat(),
             'playlist_name': 'Demo Playlist'
         }
+        track['track']['release_year'] = parse_release_year(track['track']['release_date'])
+        track['added_at_epoch'], track['added_hour'] = parse_added_at(track['added_at'])
         tracks.append(track)
         
     return tracks
@@ -1,6 +1,13 @@
 # musicinsights/services/exportify_parser.py
+import codecs
 import csv
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# Read uploads in 64 KB pieces so memory stays flat regardless of file size.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
 
 def parse_exportify_csv(file_content, file_name):
     """
@@ -15,80 +22,322 @@ def parse_exportify_csv(file_content, file_name):
       - Genres
       - Audio Features...
     """
-    # Playlist name from filename
-    playlist_name = file_name.rsplit('/', 1)[-1].rsplit('\\', 1)[-1].rsplit('.', 1)[0]
+    return list(iter_exportify_entries(file_content, file_name))
+
+
+def parse_exportify_file(upload):
+    """
+    Parse an Upload's original_file and store its entries on that Upload
+    through the bulk ingestion in playlist_store, replacing any from an
+    earlier parse. Returns the Upload.
+    """
+    # Both modules import this one
+    from .playlist_frame import PlaylistFrame
+    from .playlist_store import save_upload_entries
 
-    # Decode content
+    file = upload.original_file
+    file.open('rb')
     try:
-        decoded = file_content.decode('utf-8-sig')
-    except UnicodeDecodeError:
-        decoded = file_content.decode('latin-1')
-        
-    reader = csv.DictReader(decoded.splitlines())
-    
-    entries = []
-
-    for row in reader:
-        track_uri = row.get('Track URI') or ''
-        track_name = row.get('Track Name') or 'Unknown Track'
-        album_name = row.get('Album Name') or 'Unknown Album'
-        artist_names = row.get('Artist Name(s)') or ''
-        added_at_raw = row.get('Added At') or None
-        duration_ms = _safe_int(row.get('Duration (ms)'))
-        genres = row.get('Genres') or ''
-
-        # Parse artists
-        artists = [a.strip() for a in artist_names.split(';') if a.strip()]
-
-        # Audio features
-        audio_features = {
-            'danceability': _safe_float(row.get('Danceability')),
-            'energy': _safe_float(row.get('Energy')),
-            'valence': _safe_float(row.get('Valence')),
-            'acousticness': _safe_float(row.get('Acousticness')),
-            'instrumentalness': _safe_float(row.get('Instrumentalness')),
-            'liveness': _safe_float(row.get('Liveness')),
-            'speechiness': _safe_float(row.get('Speechiness')),
-            'tempo': _safe_float(row.get('Tempo')),
-            'popularity': _safe_int(row.get('Popularity')),
-            'release_date': row.get('Release Date')
-        }
+        frame = PlaylistFrame.from_entries(iter_exportify_entries(file, file.name))
+    finally:
+        file.close()
+    return save_upload_entries(upload, frame)
+
+
+def iter_exportify_entries(source, file_name, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streaming variant of parse_exportify_csv.
+
+    `source` can be raw bytes, a Django File/UploadedFile (read via .chunks())
+    or any binary file object. Entries are yielded one at a time, so only a
+    single chunk plus the row being decoded is held in memory.
+    """
+    parser = ExportifyStreamParser(file_name)
+    for chunk in _iter_chunks(source, chunk_size):
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+class ExportifyStreamParser:
+    """
+    Incremental Exportify CSV parser.
+
+    Call feed() with raw bytes as they arrive and close() once the input is
+    exhausted; both return the entries completed so far. Decoding is
+    incremental: a UTF-8 BOM is stripped, and the first chunk that is not
+    valid UTF-8 switches the rest of the stream to latin-1.
+    """
+
+    def __init__(self, file_name):
+        if not file_name.lower().endswith('.csv'):
+            raise ValueError("Unsupported file type. Please upload an Exportify .csv file.")
+
+        # Playlist name from filename
+        self.playlist_name = file_name.rsplit('/', 1)[-1].rsplit('\\', 1)[-1].rsplit('.', 1)[0]
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._head = b''
+        self._started = False
+        self._partial_line = ''
+        self._record_lines = []
+        self._in_quotes = False
+        self._lines = deque()
+        self._reader = csv.reader(_LineFeed(self._lines))
+        self._header = None
+
+    def feed(self, chunk):
+        if not self._started:
+            # Hold back until we can tell whether the stream starts with a BOM
+            chunk = self._head + chunk
+            if len(chunk) < len(codecs.BOM_UTF8) and codecs.BOM_UTF8.startswith(chunk):
+                self._head = chunk
+                return []
+            self._head = b''
+            if chunk.startswith(codecs.BOM_UTF8):
+                chunk = chunk[len(codecs.BOM_UTF8):]
+            self._started = True
+
+        self._split_lines(self._decode(chunk))
+        return self._drain()
+
+    def close(self):
+        self._started = True
+        self._split_lines(self._decode(self._head, final=True))
+        self._head = b''
+
+        # Whatever is left is the last line (no trailing newline) plus any
+        # record that never closed its quotes; csv treats both as end of data.
+        if self._partial_line:
+            self._record_lines.append(self._partial_line)
+            self._partial_line = ''
+        self._lines.extend(self._record_lines)
+        self._record_lines = []
+        return self._drain()
+
+    def _decode(self, chunk, final=False):
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            # Not UTF-8 after all: decode the rest of the stream as latin-1,
+            # starting with any bytes the UTF-8 decoder was still buffering.
+            pending, _ = self._decoder.getstate()
+            self._decoder = codecs.getincrementaldecoder('latin-1')()
+            return self._decoder.decode(pending + chunk, final)
+
+    def _split_lines(self, text):
+        if not text:
+            return
+        lines = (self._partial_line + text).split('\n')
+        self._partial_line = lines.pop()
+
+        for line in lines:
+            line += '\n'
+            # Exportify escapes quotes by doubling them, so an odd count means
+            # a quoted field (e.g. a multi-line name) continues on the next line.
+            if line.count('"') % 2:
+                self._in_quotes = not self._in_quotes
+            self._record_lines.append(line)
+            if not self._in_quotes:
+                self._lines.extend(self._record_lines)
+                self._record_lines = []
+
+    def _drain(self):
+        entries = []
+        try:
+            for fields in self._reader:
+                if not fields:
+                    continue
+                if self._header is None:
+                    self._header = fields
+                    self._decode_row = compile_row_decoder(tuple(fields))
+                    continue
+                entries.append(self._decode_row(fields, self.playlist_name))
+        except csv.Error as e:
+            # e.g. a field over csv's size limit; callers expect ValueError
+            raise ValueError(f"Could not read the CSV file: {e}.") from e
+        return entries
+
 
-        # Added At
-        added_at = None
-        if added_at_raw:
-            try:
-                # Keep as string for JSON serialization, or ISO format
-                # datetime.fromisoformat(added_at_raw.replace('Z', '+00:00'))
-                added_at = added_at_raw # Keep raw string, parse later if needed or ensure it's ISO
-            except ValueError:
-                pass
-
-        entry = {
-            'track': {
-                'name': track_name,
-                'artists': artists,
-                'album': album_name,
-                'duration_ms': duration_ms,
-                'genres': [g.strip() for g in genres.split(',') if g.strip()],
-                'uri': track_uri,
-                **audio_features
-            },
+class _LineFeed:
+    """
+    Iterator over a deque of complete CSV lines. Unlike a generator it can
+    run dry and be refilled, which lets one csv.reader span every feed().
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._lines:
+            raise StopIteration
+        return self._lines.popleft()
+
+
+def _iter_chunks(source, chunk_size):
+    if isinstance(source, (bytes, bytearray)):
+        yield bytes(source)
+    elif hasattr(source, 'chunks'):
+        yield from source.chunks(chunk_size)
+    else:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+# Canonical column -> the headers it goes by, in order of preference. Older
+# Exportify exports (and some other exporters) name the same data differently.
+COLUMN_ALIASES = {
+    'uri': ('Track URI', 'Spotify URI', 'URI'),
+    'name': ('Track Name', 'Name'),
+    'album': ('Album Name', 'Album'),
+    'artists': ('Artist Name(s)', 'Artist Name', 'Artists'),
+    'added_at': ('Added At',),
+    'duration_ms': ('Duration (ms)', 'Track Duration (ms)'),
+    'genres': ('Genres', 'Artist Genres'),
+    'release_date': ('Release Date', 'Album Release Date'),
+    'danceability': ('Danceability',),
+    'energy': ('Energy',),
+    'valence': ('Valence',),
+    'acousticness': ('Acousticness',),
+    'instrumentalness': ('Instrumentalness',),
+    'liveness': ('Liveness',),
+    'speechiness': ('Speechiness',),
+    'tempo': ('Tempo',),
+    'popularity': ('Popularity',),
+}
+FLOAT_COLUMNS = ('danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'liveness', 'speechiness', 'tempo')
+
+
+def resolve_columns(header):
+    """{canonical column: position in header} for the COLUMN_ALIASES a header has."""
+    positions = {}
+    for i, name in enumerate(header):
+        positions.setdefault(name.strip().lower(), i)
+    resolved = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias.lower() in positions:
+                resolved[column] = positions[alias.lower()]
+                break
+    return resolved
+
+
+@lru_cache(maxsize=32)
+def compile_row_decoder(header):
+    """
+    A function (fields, playlist_name) -> entry for csv.reader rows under
+    this header (a tuple).
+
+    Column positions are resolved once, so decoding a row is plain indexing,
+    with no per-row dict or lookups by name. Columns the header lacks read
+    a None padded on past the last column; short rows are padded the same
+    way, so their missing fields read like absent columns, and extra fields
+    on long rows are ignored.
+    """
+    positions = resolve_columns(header)
+    width = len(header)
+    # Index of the None padded onto every row
+    missing = width
+
+    name, artists, album, duration_ms, genres, uri, popularity, release_date_at, added_at_at = (
+        positions.get(column, missing)
+        for column in (
+            'name', 'artists', 'album', 'duration_ms', 'genres', 'uri', 'popularity', 'release_date', 'added_at',
+        )
+    )
+    features = tuple((column, positions.get(column, missing)) for column in FLOAT_COLUMNS)
+
+    def decode(fields, playlist_name):
+        if len(fields) > width:
+            fields = fields[:width]
+        fields = fields + [None] * (width + 1 - len(fields))
+        release_date = fields[release_date_at]
+        # Keep the raw ISO string for display and storage, plus the numeric
+        # forms analytics use, so nothing downstream re-parses strings
+        added_at = fields[added_at_at] or None
+        added_at_epoch, added_hour = parse_added_at(added_at)
+        track = {
+            'name': fields[name] or 'Unknown Track',
+            'artists': list(_split_artists(fields[artists] or '')),
+            'album': fields[album] or 'Unknown Album',
+            'duration_ms': _safe_int(fields[duration_ms]),
+            'genres': list(_split_genres(fields[genres] or '')),
+            'uri': fields[uri] or '',
+        }
+        for column, index in features:
+            track[column] = _safe_float(fields[index])
+        track['popularity'] = _safe_int(fields[popularity])
+        track['release_date'] = release_date
+        track['release_year'] = parse_release_year(release_date)
+        return {
+            'track': track,
             'added_at': added_at,
-            'playlist_name': playlist_name
+            'added_at_epoch': added_at_epoch,
+            'added_hour': added_hour,
+            'playlist_name': playlist_name,
         }
-        entries.append(entry)
 
-    return entries
+    return decode
+
+def parse_added_at(value):
+    """
+    (epoch seconds, hour of day) for an Exportify 'Added At' value; either may be None.
+
+    Accepts full timestamps with a 'Z' or numeric offset, with or without
+    fractional seconds, and bare dates. A bare date has an epoch (midnight
+    UTC) but no hour. The hour is the one written in the timestamp, and
+    naive timestamps are taken as UTC.
+    """
+    if not value:
+        return None, None
+    value = value.strip()
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None, None
+    hour = dt.hour if len(value) > 10 else None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()), hour
+
+def parse_release_year(value):
+    """Year from a 'Release Date' of any precision Spotify uses: '1994', '1994-05' or '1994-05-01'."""
+    if not value:
+        return None
+    try:
+        return int(value[:4])
+    except (ValueError, TypeError):
+        return None
+
+@lru_cache(maxsize=4096)
+def _split_artists(value):
+    # Artist strings repeat as often as genres do
+    return tuple(a.strip() for a in value.split(';') if a.strip())
+
+@lru_cache(maxsize=4096)
+def _split_genres(value):
+    # Playlists repeat the same few genre strings, so split each one once
+    return tuple(g.strip() for g in value.split(',') if g.strip())
 
+# Blank or malformed numbers are missing (None), not zero, so they don't
+# drag down averages or land in the lowest bucket
 def _safe_int(value):
+    if not value:
+        return None
     try:
         return int(value)
     except (ValueError, TypeError):
-        return 0
+        return None
 
 def _safe_float(value):
+    if not value:
+        return None
     try:
         return float(value)
     except (ValueError, TypeError):
-        return 0.0
+        return None
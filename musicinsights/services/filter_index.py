@@ -0,0 +1,248 @@
+from collections import Counter
+from itertools import chain
+from django.core.cache import caches
+from .aggregation import FEATURES, POPULARITY_LABELS, TEMPO_LABELS, TIME_OF_DAY_LABELS, aggregate_playlist
+from .snapshot_cache import SNAPSHOT_CACHE_ALIAS
+
+# Bump whenever FilterIndex's attributes change so pickled and stored
+# indexes from an older deploy are rebuilt instead of loaded.
+FILTER_INDEX_VERSION = 1
+
+# Query parameter -> key in PlaylistAggregate.track_rows
+FILTER_DIMENSIONS = {
+    'era': 'era',
+    'genre': 'genres',
+    'popularity': 'popularity_bucket',
+    'tempo': 'tempo_bucket',
+    'time_of_day': 'time_of_day',
+}
+
+DEFAULT_TRACK_LIMIT = 100
+MOOD_GRID_SIZE = 10
+
+
+class FilterIndex:
+    """
+    Inverted indexes for a playlist's dashboard filters. Built at ingest and
+    stored with the Upload (see playlist_store.load_filter_index).
+
+    Every (dimension, bucket) pair maps to a bitset held in a plain Python
+    int, where bit i is set if row i falls in that bucket. A filter
+    combination is then a handful of big-int ANDs, and the chart counts for
+    bucketed dimensions are popcounts of `bucket & mask`, so only the top-N
+    table, artist tallies, feature averages and mood grid look at matching
+    rows one by one.
+    """
+
+    def __init__(self):
+        self.total_tracks = 0
+        self.bitsets = {dimension: {} for dimension in FILTER_DIMENSIONS}
+
+        # Per-row columns for the parts of the response that need the rows themselves
+        self.names = []
+        self.artists = []  # The joined "A, B" artist string, as shown in the table
+        self.artist_lists = []  # That string split back into names, as the top-artists card counts them
+        self.main_artists = []  # First name in the string; the duration chart credits only them
+        self.durations = []
+        self.features = {f: [] for f in FEATURES}
+        self.has_features = []
+        self.mood_bins = []  # Index into the MOOD_GRID_SIZE x MOOD_GRID_SIZE grid, or None
+
+    @classmethod
+    def from_aggregate(cls, aggregate):
+        index = cls()
+        rows_by_bucket = {dimension: {} for dimension in FILTER_DIMENSIONS}
+        for i, row in enumerate(aggregate.track_rows):
+            for dimension, key in FILTER_DIMENSIONS.items():
+                values = row[key] if dimension == 'genre' else [row[key]]
+                for value in values:
+                    if value:
+                        rows_by_bucket[dimension].setdefault(value, []).append(i)
+
+            index.names.append(row['name'])
+            index.artists.append(row['artist'])
+            index.artist_lists.append(tuple(a.strip() for a in row['artist'].split(',') if a.strip()))
+            index.main_artists.append(row['artist'].split(',')[0])
+            index.durations.append(row['duration_ms'] or 0)
+            for f in FEATURES:
+                index.features[f].append(row[f])
+            index.has_features.append(any(row[f] is not None for f in FEATURES))
+            index.mood_bins.append(_mood_bin(row['valence'], row['energy']))
+
+        index.total_tracks = len(aggregate.track_rows)
+        for dimension, buckets in rows_by_bucket.items():
+            index.bitsets[dimension] = {
+                value: _bitset(rows, index.total_tracks) for value, rows in buckets.items()
+            }
+        return index
+
+    @classmethod
+    def concat(cls, indexes):
+        """One index over every row of `indexes`, in order, as if built from their rows together."""
+        combined = cls()
+        for index in indexes:
+            offset = combined.total_tracks
+            for dimension, buckets in index.bitsets.items():
+                combined_buckets = combined.bitsets[dimension]
+                for value, bits in buckets.items():
+                    combined_buckets[value] = combined_buckets.get(value, 0) | (bits << offset)
+            for column in ('names', 'artists', 'artist_lists', 'main_artists', 'durations', 'has_features', 'mood_bins'):
+                getattr(combined, column).extend(getattr(index, column))
+            for f in FEATURES:
+                combined.features[f].extend(index.features[f])
+            combined.total_tracks += index.total_tracks
+        return combined
+
+    def to_dict(self):
+        """JSON-serializable form for storage (see Upload.filter_index); bitsets are hex strings."""
+        return {
+            'version': FILTER_INDEX_VERSION,
+            'total_tracks': self.total_tracks,
+            'bitsets': {
+                dimension: {value: format(bits, 'x') for value, bits in buckets.items()}
+                for dimension, buckets in self.bitsets.items()
+            },
+            'names': self.names,
+            'artists': self.artists,
+            'artist_lists': [list(names) for names in self.artist_lists],
+            'main_artists': self.main_artists,
+            'durations': self.durations,
+            'features': self.features,
+            'has_features': self.has_features,
+            'mood_bins': self.mood_bins,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        index.total_tracks = data['total_tracks']
+        index.bitsets = {
+            dimension: {value: int(bits, 16) for value, bits in data['bitsets'].get(dimension, {}).items()}
+            for dimension in FILTER_DIMENSIONS
+        }
+        index.names = data['names']
+        index.artists = data['artists']
+        index.artist_lists = [tuple(names) for names in data['artist_lists']]
+        index.main_artists = data['main_artists']
+        index.durations = data['durations']
+        index.features = data['features']
+        index.has_features = data['has_features']
+        index.mood_bins = data['mood_bins']
+        return index
+
+    def match(self, filters):
+        """Bitset of the rows matching every {dimension: bucket} filter."""
+        mask = (1 << self.total_tracks) - 1
+        for dimension, value in filters.items():
+            if value:
+                mask &= self.bitsets[dimension].get(value, 0)
+        return mask
+
+    def query(self, filters, limit=DEFAULT_TRACK_LIMIT):
+        """
+        The dashboard's filterable cards for the rows matching `filters`:
+        the first `limit` tracks, top artists and every chart's counts.
+        """
+        mask = self.match(filters)
+        rows = _set_bits(mask)
+
+        artist_counts = Counter(chain.from_iterable(map(self.artist_lists.__getitem__, rows)))
+        artist_duration = Counter()
+        for i in rows:
+            artist_duration[self.main_artists[i]] += self.durations[i]
+
+        featured_rows = sum(map(self.has_features.__getitem__, rows))
+        feature_totals = {}
+        for f in FEATURES:
+            column = self.features[f]
+            feature_totals[f] = sum((v for v in map(column.__getitem__, rows) if v is not None), 0.0)
+
+        mood_counts = Counter(map(self.mood_bins.__getitem__, rows))
+        mood_counts.pop(None, None)
+
+        return {
+            'total': len(rows),
+            'tracks': [{'name': self.names[i], 'artist': self.artists[i]} for i in rows[:limit]],
+            'top_artists': artist_counts.most_common(10),
+            'charts': {
+                'era': sorted(self._counts('era', mask).items()),
+                'genre': Counter(self._counts('genre', mask)).most_common(10),
+                'popularity': self._ordered_counts('popularity', mask, POPULARITY_LABELS),
+                'tempo': self._ordered_counts('tempo', mask, TEMPO_LABELS, keep_empty=True),
+                'time_of_day': self._ordered_counts('time_of_day', mask, TIME_OF_DAY_LABELS),
+                'features': [
+                    round(feature_totals[f] / featured_rows, 3) if featured_rows else 0
+                    for f in FEATURES
+                ],
+                'mood': [
+                    [b // MOOD_GRID_SIZE, b % MOOD_GRID_SIZE, count]
+                    for b, count in sorted(mood_counts.items())
+                ],
+                'artist_duration': [
+                    [name, round(ms / (1000 * 60), 1)] for name, ms in artist_duration.most_common(10)
+                ],
+            },
+        }
+
+    def _counts(self, dimension, mask):
+        counts = {}
+        for value, bits in self.bitsets[dimension].items():
+            count = (bits & mask).bit_count()
+            if count:
+                counts[value] = count
+        return counts
+
+    def _ordered_counts(self, dimension, mask, labels, keep_empty=False):
+        counts = self._counts(dimension, mask)
+        return [[label, counts.get(label, 0)] for label in labels if keep_empty or counts.get(label)]
+
+
+def build_filter_index(playlist_data):
+    """The FilterIndex for a list of entries or a PlaylistFrame, from one pass over its rows."""
+    # Only the row-by-row aggregation fills track_rows
+    return FilterIndex.from_aggregate(aggregate_playlist(playlist_data, vectorize=False))
+
+
+def get_filter_index(content_hash, load):
+    """
+    Return the cached FilterIndex for a playlist, calling load() on a miss.
+
+    Like dashboard snapshots, the index is keyed by content hash and lives
+    in the snapshot cache, so the stored index is decoded once per distinct
+    playlist and again only after LRU eviction.
+    """
+    cache = caches[SNAPSHOT_CACHE_ALIAS]
+    key = f"filter_index:{content_hash}"
+
+    index = cache.get(key, version=FILTER_INDEX_VERSION)
+    if index is None:
+        index = load()
+        cache.set(key, index, version=FILTER_INDEX_VERSION)
+    return index
+
+
+def _bitset(rows, size):
+    # Set bits in a byte buffer and convert once; OR-ing into an int per row would copy it every time
+    bits = bytearray((size + 7) // 8)
+    for i in rows:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _set_bits(mask):
+    """Row ids of the set bits in mask, in ascending order."""
+    bits = bin(mask)[:1:-1]  # Least significant bit first, without the '0b' prefix
+    rows = []
+    i = bits.find('1')
+    while i != -1:
+        rows.append(i)
+        i = bits.find('1', i + 1)
+    return rows
+
+
+def _mood_bin(valence, energy):
+    if valence is None or energy is None:
+        return None
+    x = min(MOOD_GRID_SIZE - 1, int(valence * MOOD_GRID_SIZE))
+    y = min(MOOD_GRID_SIZE - 1, int(energy * MOOD_GRID_SIZE))
+    return x * MOOD_GRID_SIZE + y
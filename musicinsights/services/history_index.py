@@ -0,0 +1,111 @@
+import logging
+from django.conf import settings
+from django.db.models import Count
+from ..models import Upload
+from .dummy_data_service import DEMO_URI_PREFIX
+from .playlist_store import prune_tracks, release_upload
+
+logger = logging.getLogger(__name__)
+
+# Session key for the nav's copy of the history: newest first, metadata only
+HISTORY_INDEX_KEY = 'history_index'
+INDEX_FIELDS = ('id', 'name', 'created_at', 'track_count')
+# Playlist ids in the order their dashboards were last viewed, most recent last
+HISTORY_LRU_KEY = 'history_lru'
+
+
+def set_history(request, history):
+    """
+    Store a session's history along with the index the nav renders from.
+
+    A session that would serialize to more than settings.SESSION_MAX_BYTES
+    has playlists dropped from its history, least recently used first, until
+    it fits or only one is left; their Uploads are released. Returns the
+    dropped playlist ids.
+    """
+    _store_history(request, history)
+    budget = settings.SESSION_MAX_BYTES
+    if not budget:
+        return []
+
+    size = session_size(request)
+    evicted = []
+    while size > budget and len(history) > 1:
+        playlist_id = eviction_order(request.session)[0]
+        dropped = next(p for p in history if p['id'] == playlist_id)
+        history = [p for p in history if p['id'] != playlist_id]
+        _store_history(request, history)
+        release_upload(playlist_id)
+        if dropped.get('is_demo'):
+            prune_tracks(DEMO_URI_PREFIX)
+        evicted.append(playlist_id)
+        size = session_size(request)
+    if evicted:
+        logger.warning(
+            "Session was over its %d byte budget; evicted playlists %s (now %d bytes)", budget, evicted, size,
+        )
+    return evicted
+
+
+def _store_history(request, history):
+    request.session['history'] = history
+    request.session[HISTORY_INDEX_KEY] = [
+        {field: p.get(field) for field in INDEX_FIELDS} for p in reversed(history)
+    ]
+    if HISTORY_LRU_KEY in request.session:
+        ids = {p['id'] for p in history}
+        request.session[HISTORY_LRU_KEY] = [i for i in request.session[HISTORY_LRU_KEY] if i in ids]
+
+
+def session_size(request):
+    """Bytes the session's serializer turns it into (before signing)."""
+    return len(request.session.serializer().dumps(dict(request.session.items())))
+
+
+def touch_history(request, playlist_id):
+    """Mark a playlist as the most recently used; set_history evicts from the other end."""
+    lru = request.session.get(HISTORY_LRU_KEY, [])
+    # Re-viewing the same dashboard doesn't need a session write
+    if lru[-1:] != [playlist_id]:
+        request.session[HISTORY_LRU_KEY] = [i for i in lru if i != playlist_id] + [playlist_id]
+
+
+def eviction_order(session_dict):
+    """A session's playlist ids, least recently used first. Never-viewed playlists come first, oldest first."""
+    ids = [p['id'] for p in session_dict.get('history', [])]
+    lru = [i for i in session_dict.get(HISTORY_LRU_KEY, []) if i in ids]
+    viewed = set(lru)
+    return [i for i in ids if i not in viewed] + lru
+
+
+def get_history_index(request):
+    """
+    [{'id', 'name', 'created_at', 'track_count'}] for the session's
+    playlists, newest first. Read as stored, so rendering the nav costs no
+    copying or filtering of the history; sessions from before the index
+    existed get theirs built once, with track counts from the database.
+    """
+    index = request.session.get(HISTORY_INDEX_KEY)
+    if index is not None:
+        return index
+
+    history = [p for p in request.session.get('history', []) if 'data' not in p]
+    if not history:
+        return []
+    missing = [p['id'] for p in history if p.get('track_count') is None]
+    if missing:
+        counts = {
+            str(pk): count
+            for pk, count in Upload.objects.filter(pk__in=missing)
+            .annotate(track_count=Count('entries'))
+            .values_list('pk', 'track_count')
+        }
+        history = [
+            p if p.get('track_count') is not None else {**p, 'track_count': counts.get(p['id'], 0)}
+            for p in history
+        ]
+    # Only the index is written: this runs while rendering templates, which
+    # mustn't evict (and release) playlists; the views that change the
+    # history keep the session under budget
+    _store_history(request, history)
+    return request.session[HISTORY_INDEX_KEY]
@@ -0,0 +1,32 @@
+import hashlib
+from .aggregation import PlaylistAggregate
+from .filter_index import FilterIndex
+from .playlist_store import load_aggregate, load_filter_index
+
+
+class Library:
+    """
+    Every playlist in a session's history, analyzed as one.
+
+    The combined aggregate is the sum of each Upload's stored aggregate, and
+    the filter index their stored indexes end to end, so building either
+    costs one merge per playlist rather than a pass over every track in the
+    library.
+    """
+
+    def __init__(self, uploads):
+        self.uploads = list(uploads)
+
+    @property
+    def content_hash(self):
+        # Order matters: it decides which playlist's copy of a shared track is shown
+        digest = hashlib.sha256(b'library')
+        for upload in self.uploads:
+            digest.update(upload.content_hash.encode('ascii'))
+        return digest.hexdigest()
+
+    def aggregate(self):
+        return sum((load_aggregate(upload) for upload in self.uploads), PlaylistAggregate())
+
+    def filter_index(self):
+        return FilterIndex.concat(load_filter_index(upload) for upload in self.uploads)
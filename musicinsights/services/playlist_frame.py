@@ -0,0 +1,256 @@
+import hashlib
+import json
+import math
+from array import array
+from collections import Counter
+from .exportify_parser import parse_added_at, parse_release_year
+
+# Numeric track fields, stored as one array('d') column each (NaN = missing).
+FEATURE_COLUMNS = [
+    'danceability', 'energy', 'valence', 'acousticness', 'instrumentalness',
+    'liveness', 'speechiness', 'tempo', 'popularity', 'duration_ms',
+]
+# Columns that callers expect back as ints rather than floats.
+INT_COLUMNS = {'popularity', 'duration_ms'}
+
+# Stand-in for None in the integer columns parsed from timestamps and release dates.
+NO_VALUE = -1
+
+# to_dict() keys derived from added_at/release_date; left out of content_hash()
+# since they add no content of their own.
+DERIVED_KEYS = ('added_at_epochs', 'added_hours', 'release_years')
+
+
+class StringTable:
+    """Interned string dictionary: each distinct value is stored once and referenced by id."""
+
+    def __init__(self, values=()):
+        self.values = []
+        self._ids = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value):
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self._ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+    def __getitem__(self, string_id):
+        return self.values[string_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class PlaylistFrame:
+    """
+    Columnar container for a parsed playlist.
+
+    Audio features live in typed array('d') columns, and artists, albums,
+    genres, release dates and playlist names are dictionary-encoded into
+    StringTables, so the per-row cost is little more than the track name,
+    URI and timestamp strings instead of a nested dict with ~18 keys.
+    Indexing or iterating yields entries shaped exactly like
+    parse_exportify_csv's output, so code written against the list-of-dicts
+    format keeps working unchanged.
+    """
+
+    def __init__(self):
+        self.artists = StringTable()
+        self.albums = StringTable()
+        self.genres = StringTable()
+        self.playlist_names = StringTable()
+        self.release_dates = StringTable()
+
+        self.names = []
+        self.uris = []
+        self.added_at = []
+        self.album_ids = array('I')
+        self.playlist_name_ids = array('I')
+        self.release_date_ids = array('I')
+        # Multi-valued columns: flat id arrays plus per-row offsets (CSR layout)
+        self.artist_ids = array('I')
+        self.artist_offsets = array('I', [0])
+        self.genre_ids = array('I')
+        self.genre_offsets = array('I', [0])
+        self.columns = {name: array('d') for name in FEATURE_COLUMNS}
+        # Parsed once at ingest (see exportify_parser.parse_added_at), NO_VALUE = missing
+        self.added_at_epochs = array('q')
+        self.added_hours = array('b')
+        self.release_years = array('h')
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build a frame from any iterable of parsed entries (list or generator)."""
+        frame = cls()
+        for entry in entries:
+            frame.append(entry)
+        return frame
+
+    def append(self, entry):
+        track = entry['track']
+        self.names.append(track['name'])
+        self.uris.append(track.get('uri') or '')
+        self.added_at.append(entry.get('added_at'))
+        self.release_date_ids.append(self.release_dates.intern(track.get('release_date')))
+        self.album_ids.append(self.albums.intern(track['album']))
+        self.playlist_name_ids.append(self.playlist_names.intern(entry.get('playlist_name')))
+
+        self.artist_ids.extend(self.artists.intern(a) for a in track['artists'])
+        self.artist_offsets.append(len(self.artist_ids))
+        self.genre_ids.extend(self.genres.intern(g) for g in track.get('genres', []))
+        self.genre_offsets.append(len(self.genre_ids))
+
+        for name, column in self.columns.items():
+            value = track.get(name)
+            column.append(math.nan if value is None else value)
+
+        # Entries from the parser carry these already; others are parsed here, once
+        if 'added_hour' in entry:
+            epoch, hour = entry.get('added_at_epoch'), entry['added_hour']
+        else:
+            epoch, hour = parse_added_at(entry.get('added_at'))
+        if 'release_year' in track:
+            year = track['release_year']
+        else:
+            year = parse_release_year(track.get('release_date'))
+        self.added_at_epochs.append(NO_VALUE if epoch is None else epoch)
+        self.added_hours.append(NO_VALUE if hour is None else hour)
+        self.release_years.append(NO_VALUE if year is None else year)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('PlaylistFrame index out of range')
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def row(self, index):
+        """Materialize row `index` as a parse_exportify_csv-style entry dict."""
+        track = {
+            'name': self.names[index],
+            'artists': self.row_artists(index),
+            'album': self.albums[self.album_ids[index]],
+            'genres': self.row_genres(index),
+            'uri': self.uris[index],
+            'release_date': self.release_dates[self.release_date_ids[index]],
+        }
+        for name, column in self.columns.items():
+            value = column[index]
+            if math.isnan(value):
+                track[name] = None
+            elif name in INT_COLUMNS:
+                track[name] = int(value)
+            else:
+                track[name] = value
+        track['release_year'] = _optional(self.release_years[index])
+        return {
+            'track': track,
+            'added_at': self.added_at[index],
+            'added_at_epoch': _optional(self.added_at_epochs[index]),
+            'added_hour': _optional(self.added_hours[index]),
+            'playlist_name': self.playlist_names[self.playlist_name_ids[index]],
+        }
+
+    def row_artists(self, index):
+        start, end = self.artist_offsets[index], self.artist_offsets[index + 1]
+        return [self.artists[i] for i in self.artist_ids[start:end]]
+
+    def row_genres(self, index):
+        start, end = self.genre_offsets[index], self.genre_offsets[index + 1]
+        return [self.genres[i] for i in self.genre_ids[start:end]]
+
+    def artist_counts(self):
+        """Counter of artist name -> number of rows, computed on the id column."""
+        return Counter({self.artists[i]: n for i, n in Counter(self.artist_ids).items()})
+
+    def to_dict(self):
+        """JSON-serializable columnar form (used for session storage)."""
+        return {
+            'artists': self.artists.values,
+            'albums': self.albums.values,
+            'genres': self.genres.values,
+            'playlist_names': self.playlist_names.values,
+            'release_dates': self.release_dates.values,
+            'names': self.names,
+            'uris': self.uris,
+            'added_at': self.added_at,
+            'album_ids': self.album_ids.tolist(),
+            'playlist_name_ids': self.playlist_name_ids.tolist(),
+            'release_date_ids': self.release_date_ids.tolist(),
+            'artist_ids': self.artist_ids.tolist(),
+            'artist_offsets': self.artist_offsets.tolist(),
+            'genre_ids': self.genre_ids.tolist(),
+            'genre_offsets': self.genre_offsets.tolist(),
+            'columns': {
+                name: [None if math.isnan(v) else v for v in column]
+                for name, column in self.columns.items()
+            },
+            'added_at_epochs': [_optional(v) for v in self.added_at_epochs],
+            'added_hours': [_optional(v) for v in self.added_hours],
+            'release_years': [_optional(v) for v in self.release_years],
+        }
+
+    def content_hash(self):
+        """SHA-256 of the canonical columnar form; equal playlists hash equal."""
+        data = self.to_dict()
+        for key in DERIVED_KEYS:
+            del data[key]
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_dict(cls, data):
+        frame = cls()
+        frame.artists = StringTable(data['artists'])
+        frame.albums = StringTable(data['albums'])
+        frame.genres = StringTable(data['genres'])
+        frame.playlist_names = StringTable(data['playlist_names'])
+        frame.release_dates = StringTable(data['release_dates'])
+        frame.names = data['names']
+        frame.uris = data['uris']
+        frame.added_at = data['added_at']
+        frame.album_ids = array('I', data['album_ids'])
+        frame.playlist_name_ids = array('I', data['playlist_name_ids'])
+        frame.release_date_ids = array('I', data['release_date_ids'])
+        frame.artist_ids = array('I', data['artist_ids'])
+        frame.artist_offsets = array('I', data['artist_offsets'])
+        frame.genre_ids = array('I', data['genre_ids'])
+        frame.genre_offsets = array('I', data['genre_offsets'])
+        for name in FEATURE_COLUMNS:
+            values = data['columns'].get(name) or [None] * len(frame.names)
+            frame.columns[name] = array('d', (math.nan if v is None else v for v in values))
+
+        if 'added_hours' in data:
+            epochs, hours, years = data['added_at_epochs'], data['added_hours'], data['release_years']
+        else:
+            # Stored before these were parsed at ingest
+            epochs, hours = zip(*map(parse_added_at, frame.added_at)) if frame.added_at else ((), ())
+            years = [parse_release_year(frame.release_dates[i]) for i in frame.release_date_ids]
+        frame.added_at_epochs = array('q', (NO_VALUE if v is None else v for v in epochs))
+        frame.added_hours = array('b', (NO_VALUE if v is None else v for v in hours))
+        frame.release_years = array('h', (NO_VALUE if v is None else v for v in years))
+        return frame
+
+    @classmethod
+    def coerce(cls, playlist_data):
+        """Accept a frame, its to_dict() form or a legacy list of entries."""
+        if isinstance(playlist_data, cls):
+            return playlist_data
+        if isinstance(playlist_data, dict):
+            return cls.from_dict(playlist_data)
+        return cls.from_entries(playlist_data)
+
+
+def _optional(value):
+    return None if value == NO_VALUE else value
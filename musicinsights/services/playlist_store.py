@@ -0,0 +1,361 @@
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import F
+from ..models import Upload, Artist, Album, Genre, Track, PlaylistEntry
+from .aggregation import AGGREGATE_VERSION, PlaylistAggregate, aggregate_playlist
+from .filter_index import FILTER_INDEX_VERSION, FilterIndex, build_filter_index
+from .playlist_frame import PlaylistFrame
+
+# Rows per INSERT / lookup query. Keeps us well under SQLite's bound-parameter limit.
+BATCH_SIZE = 500
+
+# Track columns copied straight from the parsed playlist
+TRACK_FEATURE_FIELDS = [
+    'danceability', 'energy', 'valence', 'acousticness', 'instrumentalness',
+    'liveness', 'speechiness', 'tempo', 'popularity', 'duration_ms',
+]
+
+# Exportify CSVs carry artist/album names but no ids, and local files have no
+# track URI, so those rows are keyed by name under these prefixes instead.
+NAME_KEY_PREFIX = 'name:'
+LOCAL_TRACK_PREFIX = 'local:'
+
+
+def save_playlist(playlist_data, name, aggregate=None, source_hash='', filter_index=None):
+    """
+    Persist a parsed playlist as an Upload with its PlaylistEntry rows.
+
+    The playlist's PlaylistAggregate and FilterIndex are stored with the
+    Upload: pass them in if they've already been computed, otherwise the
+    aggregate is computed in the database from the new rows and the index
+    from the frame. source_hash identifies the file it was parsed from, so
+    identical files can share the Upload (see find_upload).
+    """
+    frame = PlaylistFrame.coerce(playlist_data)
+    if filter_index is None:
+        filter_index = build_filter_index(frame)
+
+    with transaction.atomic():
+        upload = Upload.objects.create(
+            name=name,
+            content_hash=frame.content_hash(),
+            aggregate=aggregate.to_dict() if aggregate is not None else None,
+            filter_index=filter_index.to_dict(),
+            source_hash=source_hash,
+        )
+        _bulk_ingest(upload, frame)
+        if aggregate is None:
+            refresh_aggregate(upload)
+    return upload
+
+
+def find_upload(source_hash):
+    """The stored Upload parsed from a file with this raw-file hash, or None."""
+    return Upload.objects.filter(source_hash=source_hash).order_by('id').first()
+
+
+def retain_upload(upload):
+    """Count one more session history referencing an existing Upload."""
+    Upload.objects.filter(pk=upload.pk).update(ref_count=F('ref_count') + 1)
+
+
+def release_upload(upload_id):
+    """Drop one session's reference to an Upload, deleting it once nothing references it."""
+    with transaction.atomic():
+        Upload.objects.filter(pk=upload_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        Upload.objects.filter(pk=upload_id, ref_count=0).delete()
+
+
+def prune_tracks(key_prefix):
+    """Delete catalog Tracks keyed under key_prefix that no PlaylistEntry uses any more."""
+    Track.objects.filter(spotify_id__startswith=key_prefix, playlistentry__isnull=True).delete()
+
+
+def save_upload_entries(upload, playlist_data):
+    """
+    Store a parsed playlist on an existing Upload (one created around its
+    original_file), replacing any entries from an earlier parse.
+    """
+    frame = PlaylistFrame.coerce(playlist_data)
+
+    with transaction.atomic():
+        upload.entries.all().delete()
+        if not upload.name and len(frame):
+            upload.name = frame.playlist_names[frame.playlist_name_ids[0]]
+        upload.content_hash = frame.content_hash()
+        upload.filter_index = build_filter_index(frame).to_dict()
+        upload.save(update_fields=['name', 'content_hash', 'filter_index'])
+        _bulk_ingest(upload, frame)
+        refresh_aggregate(upload)
+    return upload
+
+
+def _bulk_ingest(upload, frame):
+    """
+    Upsert the frame's artists, albums and tracks and add its PlaylistEntry
+    rows to `upload`.
+
+    Artists, albums and tracks are shared between uploads. Tracks are keyed
+    by URI and upserted, so a re-export with new audio features or artists
+    replaces what the existing row had. Entries are written BATCH_SIZE at a
+    time with a fixed number of queries per batch (track upsert, pk lookup,
+    artist and genre links, entry insert), so neither query count nor model
+    instances held in memory grow with the row count beyond one batch.
+    """
+    artist_pks = _bulk_get_or_create_named(Artist, frame.artists.values)
+    album_pks = _bulk_get_or_create_named(Album, frame.albums.values)
+    genre_pks = _bulk_get_or_create_genres(frame.genres.values)
+    TrackArtist = Track.artists.through
+    TrackGenre = Track.genres.through
+
+    for start in range(0, len(frame), BATCH_SIZE):
+        # One Track per key; a track listed twice in a playlist still gets two entries
+        tracks = {}
+        rows = []
+        for i in range(start, min(start + BATCH_SIZE, len(frame))):
+            entry = frame[i]
+            track = entry['track']
+            key = _track_key(track)
+            rows.append((key, entry['playlist_name'], _from_epoch(entry['added_at_epoch']), entry['added_hour']))
+            if key not in tracks:
+                tracks[key] = (track, Track(
+                    spotify_id=key,
+                    name=track['name'],
+                    album_id=album_pks[track['album']],
+                    release_date=track.get('release_date'),
+                    release_year=track.get('release_year'),
+                    **{f: track.get(f) for f in TRACK_FEATURE_FIELDS},
+                ))
+
+        Track.objects.bulk_create(
+            [t for _, t in tracks.values()],
+            update_conflicts=True,
+            unique_fields=['spotify_id'],
+            update_fields=['name', 'album', 'release_date', 'release_year', *TRACK_FEATURE_FIELDS],
+        )
+        track_pks = _lookup_pks(Track, list(tracks))
+
+        # Replace, not add to, the artists and genres of tracks already in the catalog
+        TrackArtist.objects.filter(track_id__in=track_pks.values()).delete()
+        TrackGenre.objects.filter(track_id__in=track_pks.values()).delete()
+        TrackArtist.objects.bulk_create(
+            [
+                TrackArtist(track_id=track_pks[key], artist_id=artist_pks[artist])
+                for key, (track, _) in tracks.items()
+                for artist in track['artists']
+            ],
+            # An artist listed twice on one track
+            ignore_conflicts=True,
+        )
+        TrackGenre.objects.bulk_create(
+            [
+                TrackGenre(track_id=track_pks[key], genre_id=genre_pks[genre])
+                for key, (track, _) in tracks.items()
+                for genre in track['genres']
+            ],
+            # A genre listed twice on one track
+            ignore_conflicts=True,
+        )
+
+        PlaylistEntry.objects.bulk_create([
+            PlaylistEntry(
+                upload=upload,
+                track_id=track_pks[key],
+                playlist_name=playlist_name,
+                added_at=added_at,
+                added_hour=added_hour,
+            )
+            for key, playlist_name, added_at, added_hour in rows
+        ])
+
+
+def save_playlist_version(playlist_data, name, previous, aggregate=None, source_hash='', filter_index=None):
+    """
+    Save a newer export of the playlist stored as `previous`.
+
+    An aggregate already computed for the new export (uploads have one from
+    parsing) is stored as is, so a file gets the same stats whether or not
+    it's a new version. Without one, it's derived from the previous
+    version's; see _version_aggregate.
+    """
+    frame = PlaylistFrame.coerce(playlist_data)
+    if aggregate is None:
+        aggregate = _version_aggregate(frame, previous)
+    return save_playlist(frame, name, aggregate=aggregate, source_hash=source_hash, filter_index=filter_index)
+
+
+def _version_aggregate(frame, previous):
+    """
+    The aggregate for a newer export of `previous`, aggregating only the
+    changed rows. Entries are matched to the previous version's by Track
+    URI (as a multiset, so a track listed twice needs two matches), and the
+    added ones are merged onto the previous aggregate.
+
+    The result is delta-based: unchanged tracks keep the attributes the
+    previous version was aggregated with, even where the new export's
+    differ. When entries were removed, the new export is aggregated in full
+    instead, since the rows they'd be subtracted with are shared Tracks
+    that any later upload may have re-exported with different attributes.
+    """
+    previous_keys = list(
+        PlaylistEntry.objects.filter(upload=previous).order_by('id').values_list('id', 'track__spotify_id')
+    )
+    unmatched = Counter(key for _, key in previous_keys)
+    added = PlaylistFrame()
+    for entry in frame:
+        key = _track_key(entry['track'])
+        if unmatched[key] > 0:
+            unmatched[key] -= 1
+        else:
+            added.append(entry)
+
+    if any(count > 0 for count in unmatched.values()):
+        return aggregate_playlist(frame)
+    aggregate = load_aggregate(previous)
+    if len(added):
+        aggregate = aggregate + aggregate_playlist(added)
+    return aggregate
+
+
+def load_aggregate(upload):
+    """
+    The stored PlaylistAggregate for an Upload, computing (and storing) it
+    for uploads saved before aggregates were, or with an older layout.
+    """
+    if upload.aggregate and upload.aggregate.get('version') == AGGREGATE_VERSION:
+        return PlaylistAggregate.from_dict(upload.aggregate)
+    return refresh_aggregate(upload)
+
+
+def refresh_aggregate(upload):
+    """
+    Recompute an Upload's stored aggregate from its PlaylistEntry rows with
+    SQL aggregation. Called whenever the entries are (re)written.
+    """
+    from .sql_aggregation import aggregate_upload  # imports this module
+
+    aggregate = aggregate_upload(upload)
+    upload.aggregate = aggregate.to_dict()
+    upload.save(update_fields=['aggregate'])
+    return aggregate
+
+
+def load_filter_index(upload):
+    """
+    The stored FilterIndex for an Upload, building (and storing) it from the
+    rows for uploads saved before indexes were, or with an older layout.
+    """
+    if upload.filter_index and upload.filter_index.get('version') == FILTER_INDEX_VERSION:
+        return FilterIndex.from_dict(upload.filter_index)
+    index = build_filter_index(load_playlist(upload))
+    upload.filter_index = index.to_dict()
+    upload.save(update_fields=['filter_index'])
+    return index
+
+
+def load_playlist(upload, entry_ids=None):
+    """
+    Rebuild the PlaylistFrame for an Upload (or Upload pk) in three queries,
+    optionally limited to some of its PlaylistEntry ids.
+    """
+    entries = PlaylistEntry.objects.filter(upload=upload)
+    if entry_ids is not None:
+        entries = entries.filter(id__in=entry_ids)
+    entries = (
+        entries
+        .order_by('id')
+        .values_list(
+            'track_id', 'playlist_name', 'added_at', 'added_hour',
+            'track__spotify_id', 'track__name', 'track__album__name',
+            'track__release_date', 'track__release_year',
+            *[f'track__{f}' for f in TRACK_FEATURE_FIELDS],
+        )
+    )
+    track_artists = load_track_links(upload, Track.artists.through, 'artist')
+    track_genres = load_track_links(upload, Track.genres.through, 'genre')
+
+    frame = PlaylistFrame()
+    for (track_id, playlist_name, added_at, added_hour,
+         key, name, album, release_date, release_year, *features) in entries:
+        frame.append({
+            'track': {
+                'name': name,
+                'artists': track_artists.get(track_id, []),
+                'album': album or 'Unknown Album',
+                'genres': track_genres.get(track_id, []),
+                'uri': '' if key.startswith(LOCAL_TRACK_PREFIX) else key,
+                'release_date': release_date,
+                **dict(zip(TRACK_FEATURE_FIELDS, features)),
+                'release_year': release_year,
+            },
+            'added_at': added_at.isoformat() if added_at else None,
+            'added_at_epoch': int(added_at.timestamp()) if added_at else None,
+            'added_hour': added_hour,
+            'playlist_name': playlist_name,
+        })
+    return frame
+
+
+def load_track_links(upload, through, target):
+    """
+    {track pk: [names]} over an Upload's tracks for one of Track's M2M
+    through models (target 'artist' or 'genre'), in the order the links
+    were created.
+    """
+    links = (
+        through.objects.filter(track__playlistentry__upload=upload)
+        .order_by('id')
+        .values_list('id', 'track_id', f'{target}__name')
+        .distinct()
+    )
+    names = {}
+    for _, track_id, name in links:
+        names.setdefault(track_id, []).append(name)
+    return names
+
+
+def _bulk_get_or_create_named(model, names):
+    """Insert any missing Artist/Album rows by name and return {name: pk}."""
+    keys = {_name_key(name): name for name in names}
+    model.objects.bulk_create(
+        [model(spotify_id=key, name=name) for key, name in keys.items()],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    pks = _lookup_pks(model, list(keys))
+    return {name: pks[_name_key(name)] for name in names}
+
+
+def _bulk_get_or_create_genres(names):
+    """Insert any missing Genre rows and return {name: pk}."""
+    Genre.objects.bulk_create(
+        [Genre(name=name) for name in names],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return _lookup_pks(Genre, list(names), field='name')
+
+
+def _lookup_pks(model, keys, field='spotify_id'):
+    pks = {}
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        pks.update(model.objects.filter(**{f'{field}__in': batch}).values_list(field, 'id'))
+    return pks
+
+
+def _name_key(name):
+    return f"{NAME_KEY_PREFIX}{name}"[:100]
+
+
+def _track_key(track):
+    if track.get('uri'):
+        return track['uri'][:100]
+    return f"{LOCAL_TRACK_PREFIX}{track['name']}|{';'.join(track['artists'])}"[:100]
+
+
+def _from_epoch(epoch):
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
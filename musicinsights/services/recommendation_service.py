@@ -1,37 +1,22 @@
-from collections import Counter
-from datetime import datetime
+from ..models import Upload
+from .aggregation import aggregate_playlist
+from .playlist_store import load_aggregate
 
-def build_recommendations(playlist_data):
-    entries = playlist_data
-    artist_counter = Counter()
-    genre_counter = Counter()
-    time_of_day_counter = Counter()
-    total_listening_time_ms = 0
-    track_count = len(entries)
+def build_recommendations(playlist_data, aggregate=None):
+    # Reuse the dashboard's single pass when the caller already has it
+    if aggregate is None:
+        # A stored Upload (read from its materialized aggregate), a list of
+        # parsed entries or a PlaylistFrame (rows are built on iteration)
+        if isinstance(playlist_data, Upload):
+            aggregate = load_aggregate(playlist_data)
+        else:
+            aggregate = aggregate_playlist(playlist_data)
 
-    for e in entries:
-        track = e['track']
-        duration_ms = track.get('duration_ms') or 0
-        total_listening_time_ms += duration_ms
-        
-        for artist in track['artists']:
-            artist_counter[artist] += 1
-            
-        for g in track.get('genres', []):
-            genre_counter[g] += 1
-                    
-        added_at_str = e.get('added_at')
-        if added_at_str:
-            try:
-                if 'T' in added_at_str:
-                     dt = datetime.fromisoformat(added_at_str.replace('Z', '+00:00'))
-                else:
-                     dt = None
-                
-                if dt:
-                    time_of_day_counter[dt.hour] += 1
-            except ValueError:
-                pass
+    artist_counter = aggregate.artist_counter
+    genre_counter = aggregate.genre_counter
+    time_of_day_counter = aggregate.hour_counter
+    total_listening_time_ms = aggregate.total_duration_ms
+    track_count = aggregate.total_tracks
 
     recs = []
 
@@ -73,14 +58,14 @@ def build_recommendations(playlist_data):
         recs.append("🌃 Late night listener! Your nocturnal sessions deserve a dedicated chill playlist.")
     
     # Energy-based recommendation (if we have audio features)
-    high_energy_tracks = sum(1 for e in entries if e['track'].get('energy') and e['track']['energy'] > 0.7)
+    high_energy_tracks = aggregate.high_energy_tracks
     if high_energy_tracks > track_count * 0.6:
         recs.append("⚡ Your library is high-energy! Balance it out with some mellow tracks for variety.")
     elif high_energy_tracks < track_count * 0.3:
         recs.append("😌 You prefer chill vibes. Add some upbeat tracks for when you need a boost.")
 
     # Tempo-based recommendation
-    total_tempo = sum(e['track']['tempo'] for e in entries if e['track'].get('tempo'))
+    total_tempo = aggregate.tempo_total
     avg_tempo = total_tempo / track_count if track_count > 0 else 0
     if avg_tempo > 120:
         recs.append("🏃‍♂️ High Tempo! Great for workouts.")
@@ -0,0 +1,33 @@
+from django.core.cache import caches
+
+# Alias in settings.CACHES holding computed dashboard contexts
+SNAPSHOT_CACHE_ALIAS = 'snapshots'
+
+# Bump whenever the shape of the dashboard context changes so stale
+# snapshots from an older deploy are ignored instead of rendered.
+SNAPSHOT_VERSION = 3
+
+
+def snapshot_key(content_hash):
+    return f"dashboard:{content_hash}"
+
+
+def get_dashboard_snapshot(content_hash, build):
+    """
+    Return the cached dashboard context for a playlist, calling build() to
+    compute (and store) it on a miss.
+
+    Playlists never change after upload, so the content hash fully
+    identifies the result and snapshots never expire; the cache's LRU limit
+    is what bounds memory. The returned dict is a copy, so callers can add
+    per-request keys (display name, Spotify results) without touching the
+    cached snapshot.
+    """
+    cache = caches[SNAPSHOT_CACHE_ALIAS]
+    key = snapshot_key(content_hash)
+
+    snapshot = cache.get(key, version=SNAPSHOT_VERSION)
+    if snapshot is None:
+        snapshot = build()
+        cache.set(key, snapshot, version=SNAPSHOT_VERSION)
+    return dict(snapshot)
@@ -0,0 +1,75 @@
+import hashlib
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+
+# Alias in settings.CACHES; Redis or the database, so all workers share it
+SPOTIFY_CACHE_ALIAS = 'spotify'
+
+# Stored for artists Spotify has no match for, so we don't search again
+NO_MATCH = '__no_match__'
+
+# Returned by lookups when nothing is cached (as opposed to a cached "no match")
+MISSING = object()
+
+# Hit/miss counters for this process, keyed 'artist_hits', 'tracks_misses', ...
+CACHE_STATS = Counter()
+
+
+class SpotifyLookupCache:
+    """
+    TTL cache for the two lookups behind "Deep Cuts":
+    artist name -> artist id, and artist id -> top tracks.
+
+    Artists with no search match are cached too (negative caching) with a
+    shorter TTL, so a typo'd or local-only artist doesn't cost a search on
+    every page view. Lookups return MISSING when the network has to be asked.
+    """
+
+    def __init__(self, alias=SPOTIFY_CACHE_ALIAS, ttl=None, negative_ttl=None):
+        self.cache = caches[alias]
+        self.ttl = ttl if ttl is not None else settings.SPOTIFY_CACHE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.SPOTIFY_NEGATIVE_CACHE_TTL
+
+    def artist_id(self, artist_name):
+        """Cached artist id, None for a cached no-match, or MISSING."""
+        return self._get('artist', _artist_key(artist_name))
+
+    def set_artist_id(self, artist_name, artist_id):
+        self._set(_artist_key(artist_name), artist_id)
+
+    def top_tracks(self, artist_id):
+        """Cached top-track list, None for a cached empty result, or MISSING."""
+        return self._get('tracks', _top_tracks_key(artist_id))
+
+    def set_top_tracks(self, artist_id, tracks):
+        self._set(_top_tracks_key(artist_id), tracks)
+
+    def _get(self, kind, key):
+        value = self.cache.get(key)
+        if value is None:
+            CACHE_STATS[f'{kind}_misses'] += 1
+            return MISSING
+        CACHE_STATS[f'{kind}_hits'] += 1
+        return None if value == NO_MATCH else value
+
+    def _set(self, key, value):
+        if value:
+            self.cache.set(key, value, self.ttl)
+        else:
+            self.cache.set(key, NO_MATCH, self.negative_ttl)
+
+
+def cache_stats():
+    """Snapshot of this process's hit/miss counters."""
+    return dict(CACHE_STATS)
+
+
+def _artist_key(artist_name):
+    # Artist names can contain spaces and other characters that aren't safe in every backend's keys
+    digest = hashlib.sha1(artist_name.strip().lower().encode('utf-8')).hexdigest()
+    return f"spotify:artist:{digest}"
+
+
+def _top_tracks_key(artist_id):
+    return f"spotify:top_tracks:{artist_id}"
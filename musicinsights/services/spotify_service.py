@@ -1,67 +1,190 @@
+import logging
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
+from spotipy.exceptions import SpotifyException
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
 import random
+import time
+from .playlist_frame import PlaylistFrame
+from .spotify_cache import SpotifyLookupCache, MISSING
+
+logger = logging.getLogger(__name__)
 
 class SpotifyService:
-    def __init__(self, client_id, client_secret):
-        self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=client_id,
-            client_secret=client_secret
-        ))
+    def __init__(self, client_id, client_secret, cache=None):
+        self.sp = spotipy.Spotify(
+            auth_manager=SpotifyClientCredentials(
+                client_id=client_id,
+                client_secret=client_secret
+            ),
+            requests_timeout=settings.SPOTIFY_REQUEST_TIMEOUT,
+            # 429s are retried by _call_with_backoff, which knows the deadline;
+            # keep them out of urllib3's retry list so Retry-After reaches us.
+            status_forcelist=(500, 502, 503, 504),
+            retries=0,
+            status_retries=0,
+        )
+        self.cache = cache or SpotifyLookupCache()
+        self.max_workers = settings.SPOTIFY_MAX_WORKERS
+        self.deadline_seconds = settings.SPOTIFY_DEADLINE
+
+    def search_artist_id(self, artist_name):
+        # We limit search to type='artist' and exact match if possible, but search is fuzzy.
+        search_res = self.sp.search(q=f"artist:{artist_name}", type='artist', limit=1)
+        items = search_res['artists']['items']
+        return items[0]['id'] if items else None
+
+    def fetch_top_tracks(self, artist_id):
+        # Get their top tracks (returns up to 10), trimmed to what we render
+        top_tracks = self.sp.artist_top_tracks(artist_id)
+        return [
+            {
+                'id': track['id'],
+                'uri': track['uri'],
+                'name': track['name'],
+                'artists': [artist['name'] for artist in track['artists']],
+                'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
+                'preview_url': track['preview_url'],
+                'external_url': track['external_urls']['spotify'],
+            }
+            for track in top_tracks['tracks']
+        ]
+
+    def _call_with_backoff(self, fn, arg, deadline):
+        """Call fn(arg), sleeping through 429s as long as the deadline allows."""
+        attempt = 0
+        while True:
+            try:
+                return fn(arg)
+            except SpotifyException as e:
+                if e.http_status != 429:
+                    raise
+                wait_seconds = _retry_after_seconds(e.headers, attempt)
+                if time.monotonic() + wait_seconds >= deadline:
+                    raise
+                time.sleep(wait_seconds)
+                attempt += 1
+
+    def _fetch_artist(self, artist_name, artist_id, deadline):
+        """
+        Worker-thread task: network calls only (cache reads/writes stay on the
+        request thread). Returns (artist_id, top_tracks) where either may be
+        None if nothing was fetched.
+        """
+        if artist_id is MISSING:
+            artist_id = self._call_with_backoff(self.search_artist_id, artist_name, deadline)
+            if not artist_id:
+                return None, None
+        return artist_id, self._call_with_backoff(self.fetch_top_tracks, artist_id, deadline)
+
+    def fetch_artists_top_tracks(self, artist_names):
+        """
+        Top tracks for each artist, as {artist_name: [track, ...]}.
 
-    def get_missing_top_tracks(self, playlist_data, limit=10):
+        Cached lookups are answered immediately; the rest run concurrently on a
+        bounded thread pool, so the whole step takes about as long as the
+        slowest artist rather than the sum of all of them. Artists still
+        pending when the overall deadline passes are left out (partial result).
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        results = {}
+        pending = {}
+
+        for artist_name in artist_names:
+            artist_id = self.cache.artist_id(artist_name)
+            if artist_id is None:
+                continue  # cached "no match"
+            if artist_id is not MISSING:
+                tracks = self.cache.top_tracks(artist_id)
+                if tracks is not MISSING:
+                    results[artist_name] = tracks or []
+                    continue
+            pending[artist_name] = artist_id
+
+        if not pending:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending)))
+        futures = {
+            executor.submit(self._fetch_artist, name, artist_id, deadline): (name, artist_id)
+            for name, artist_id in pending.items()
+        }
+        try:
+            not_done = set(futures)
+            while not_done:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, not_done = wait(not_done, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    artist_name, cached_id = futures[future]
+                    try:
+                        artist_id, tracks = future.result()
+                    except Exception:
+                        logger.exception("Error fetching deep cuts for %s", artist_name)
+                        continue
+                    if cached_id is MISSING:
+                        self.cache.set_artist_id(artist_name, artist_id)
+                    if artist_id:
+                        self.cache.set_top_tracks(artist_id, tracks)
+                        results[artist_name] = tracks or []
+        finally:
+            # Don't hold the request for stragglers; they end at their own timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    def get_missing_top_tracks(self, playlist_data, limit=10, aggregate=None):
         """
         Identify top artists from the playlist, fetch their top tracks from Spotify,
         and return the ones that are NOT already in the playlist ('Deep Cuts').
+        Pass the dashboard's PlaylistAggregate to skip counting artists again.
         """
         try:
             from collections import Counter
             
             # 1. Identify Top Artists & Known Tracks
-            artist_counter = Counter()
-            known_uris = set()
-            
-            for entry in playlist_data:
-                track = entry.get('track', {})
-                # Add to known URIs
-                if track.get('uri'):
-                    known_uris.add(track['uri'])
-                
-                # Count artists
-                for artist in track.get('artists', []):
-                    artist_counter[artist] += 1
+            if aggregate is not None:
+                artist_counter = aggregate.artist_counter
+                known_uris = aggregate.known_uris
+            elif isinstance(playlist_data, PlaylistFrame):
+                # Columnar fast path: no per-row dicts needed
+                artist_counter = playlist_data.artist_counts()
+                known_uris = set(uri for uri in playlist_data.uris if uri)
+            else:
+                artist_counter = Counter()
+                known_uris = set()
+
+                for entry in playlist_data:
+                    track = entry.get('track', {})
+                    # Add to known URIs
+                    if track.get('uri'):
+                        known_uris.add(track['uri'])
+
+                    # Count artists
+                    for artist in track.get('artists', []):
+                        artist_counter[artist] += 1
 
             # Get top 5 artists
             top_artists = [name for name, _ in artist_counter.most_common(5)]
             
             recommendations = []
             
-            # 2. For each top artist, find missing hits
+            # 2. For each top artist, find missing hits (fetched concurrently)
+            artist_tracks = self.fetch_artists_top_tracks(top_artists)
             for artist_name in top_artists:
-                # Search for artist to get ID
-                # We limit search to type='artist' and exact match if possible, but search is fuzzy.
-                search_res = self.sp.search(q=f"artist:{artist_name}", type='artist', limit=1)
-                items = search_res['artists']['items']
-                
-                if not items:
-                    continue
-                    
-                artist_id = items[0]['id']
-                
-                # Get their top tracks (returns up to 10)
-                top_tracks = self.sp.artist_top_tracks(artist_id)
-                
-                for track in top_tracks['tracks']:
+                for track in artist_tracks.get(artist_name, []):
                     # Check if we already have this song
                     if track['uri'] not in known_uris:
                         # Avoid duplicates in recommendations list itself
                         if not any(r['id'] == track['id'] for r in recommendations):
                             recommendations.append({
                                 'name': track['name'],
-                                'artists': [artist['name'] for artist in track['artists']],
-                                'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
+                                'artists': track['artists'],
+                                'album_art': track['album_art'],
                                 'preview_url': track['preview_url'],
-                                'external_url': track['external_urls']['spotify'],
+                                'external_url': track['external_url'],
                                 'id': track['id'],
                                 'reason': f"Essential {artist_name} track"
                             })
@@ -70,6 +193,14 @@ class SpotifyService:
             random.shuffle(recommendations)
             return recommendations[:limit]
 
-        except Exception as e:
-            print(f"Error fetching deep cuts: {e}")
+        except Exception:
+            logger.exception("Error fetching deep cuts")
             return []
+
+
+def _retry_after_seconds(headers, attempt):
+    """Seconds to wait after a 429: Spotify's Retry-After header, else exponential backoff."""
+    try:
+        return max(float((headers or {}).get('Retry-After')), 0)
+    except (TypeError, ValueError):
+        return 0.5 * (2 ** attempt)
@@ -0,0 +1,123 @@
+from django.db.models import Case, Count, F, FloatField, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from ..models import PlaylistEntry, Track
+from .aggregation import FEATURES, PlaylistAggregate, era_for_year, time_of_day_bucket
+from .playlist_store import LOCAL_TRACK_PREFIX, load_track_links
+
+POPULARITY_BUCKET = Case(
+    When(track__popularity__lte=20, then=Value('0-20')),
+    When(track__popularity__lte=40, then=Value('21-40')),
+    When(track__popularity__lte=60, then=Value('41-60')),
+    When(track__popularity__lte=80, then=Value('61-80')),
+    default=Value('81-100'),
+)
+TEMPO_BUCKET = Case(
+    When(track__tempo__lt=80, then=Value('<80 BPM')),
+    When(track__tempo__lt=100, then=Value('80-100 BPM')),
+    When(track__tempo__lt=120, then=Value('100-120 BPM')),
+    When(track__tempo__lt=140, then=Value('120-140 BPM')),
+    default=Value('>140 BPM'),
+)
+# Integer division: 1994 -> 1990
+DECADE = F('track__release_year') / 10 * 10
+HAS_TEMPO = Q(track__tempo__isnull=False) & ~Q(track__tempo=0)
+
+
+def aggregate_upload(upload):
+    """
+    The PlaylistAggregate for a stored Upload, computed in the database.
+
+    Totals, feature sums, genre counts and the hour, decade, popularity and
+    tempo histograms are aggregate and GROUP BY queries. Artist and
+    per-track data come from one grouped row per distinct track, so the
+    work done in Python scales with distinct tracks rather than entries,
+    in a fixed number of queries. Counters are filled in
+    order of first appearance, like aggregate_playlist, so most_common()
+    breaks ties the same way. track_rows is left empty.
+    """
+    entries = PlaylistEntry.objects.filter(upload=upload).order_by()
+    aggregate = PlaylistAggregate()
+
+    totals = entries.aggregate(
+        total_tracks=Count('id'),
+        total_duration_ms=Coalesce(Sum('track__duration_ms'), 0),
+        high_energy_tracks=Count('id', filter=Q(track__energy__gt=0.7)),
+        tempo_total=Coalesce(Sum('track__tempo', filter=HAS_TEMPO), 0.0, output_field=FloatField()),
+        **{f'{f}_total': Coalesce(Sum(f'track__{f}'), 0.0, output_field=FloatField()) for f in FEATURES},
+        **{f'{f}_count': Count(f'track__{f}') for f in FEATURES},
+    )
+    if not totals['total_tracks']:
+        return aggregate
+
+    aggregate.total_tracks = totals['total_tracks']
+    aggregate.total_duration_ms = totals['total_duration_ms']
+    aggregate.high_energy_tracks = totals['high_energy_tracks']
+    aggregate.tempo_total = totals['tempo_total']
+    for f in FEATURES:
+        aggregate.feature_totals[f] = totals[f'{f}_total']
+        aggregate.feature_counts[f] = totals[f'{f}_count']
+    aggregate.playlist_name = entries.order_by('id').values_list('playlist_name', flat=True).first()
+
+    for hour, count in _grouped(entries.filter(added_hour__isnull=False), F('added_hour')):
+        aggregate.hour_counter[hour] = count
+        aggregate.time_of_day_counts[time_of_day_bucket(hour)] += count
+    for decade, count in _grouped(entries.filter(track__release_year__isnull=False), DECADE):
+        aggregate.era_counts[era_for_year(decade)] = count
+    for label, count in _grouped(entries.filter(track__popularity__isnull=False), POPULARITY_BUCKET):
+        aggregate.popularity_counts[label] = count
+    for label, count in _grouped(entries.filter(HAS_TEMPO), TEMPO_BUCKET):
+        aggregate.tempo_counts[label] = count
+
+    # Index-backed GROUP BY over the genre links. Genres first seen on the
+    # same entry are ordered by link id rather than their order on that track.
+    TrackGenre = Track.genres.through
+    genres = (
+        TrackGenre.objects.filter(track__playlistentry__upload=upload)
+        .values('genre__name')
+        .annotate(entries=Count('track__playlistentry'), first=Min('track__playlistentry__id'), link=Min('id'))
+        .order_by('first', 'link')
+        .values_list('genre__name', 'entries')
+    )
+    for name, count in genres:
+        aggregate.genre_counter[name] = count
+
+    track_artists = load_track_links(upload, Track.artists.through, 'artist')
+
+    tracks = (
+        entries.values('track_id')
+        .annotate(entries=Count('id'), first=Min('id'))
+        .order_by('first')
+        .values_list(
+            'track_id', 'entries', 'track__spotify_id', 'track__name', 'track__album__name',
+            'track__duration_ms', 'track__valence', 'track__energy',
+        )
+    )
+    for track_id, count, key, name, album, duration_ms, valence, energy in tracks:
+        track_artist_names = track_artists.get(track_id, [])
+        track_key = (name, ", ".join(track_artist_names))
+        aggregate.track_listening_time[track_key] += (duration_ms or 0) * count
+        aggregate.track_entry_counts[track_key] += count
+        for artist in track_artist_names:
+            aggregate.artist_counter[artist] += count
+            aggregate.artist_duration[artist] += (duration_ms or 0) * count
+        aggregate.track_objects[track_key] = {
+            'name': name,
+            'artists': track_artist_names,
+            'album': album or 'Unknown Album',
+            'valence': valence,
+            'energy': energy,
+        }
+        if not key.startswith(LOCAL_TRACK_PREFIX):
+            aggregate.uri_counts[key] += count
+    return aggregate
+
+
+def _grouped(entries, expression):
+    """(value, entry count) per distinct value of expression, in order of first appearance."""
+    return (
+        entries.annotate(value=expression)
+        .values('value')
+        .annotate(count=Count('id'), first=Min('id'))
+        .order_by('first')
+        .values_list('value', 'count')
+    )
@@ -1,200 +1,51 @@
-from collections import Counter
 import json
-from datetime import datetime
-
-def build_dashboard_context(playlist_data, playlist_name_override=None):
-    entries = playlist_data
-    total_tracks = len(entries)
-
-    artist_counter = Counter()
-    track_listening_time = Counter() # Key: (track_name, artist_name), Value: duration
-    track_objects = {} # Key: (track_name, artist_name), Value: track dict
-    
-    # monthly_listening_time = Counter() # Removed as per previous changes
-
-    # --- Audio Features Averages ---
-    features = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'liveness', 'speechiness']
-    feature_totals = {f: 0.0 for f in features}
-    feature_counts = {f: 0 for f in features}
-    
-    # --- Genre Counting ---
-    genre_counter = Counter()
-
-    # Total listening time
-    total_listening_time_ms = 0
-
-    # --- New Metrics Initialization ---
-    time_of_day_counts = {'Morning': 0, 'Afternoon': 0, 'Evening': 0, 'Night': 0}
-    era_counts = Counter()
-    popularity_counts = { '0-20': 0, '21-40': 0, '41-60': 0, '61-80': 0, '81-100': 0 }
-    tempo_counts = { '<80 BPM': 0, '80-100 BPM': 0, '100-120 BPM': 0, '120-140 BPM': 0, '>140 BPM': 0 }
-    
-    all_tracks_serialized = [] # For frontend JS filtering
-
-    for e in entries:
-        track = e['track']
-        duration_ms = track.get('duration_ms') or 0
-        
-        # Track Key for aggregation
-        track_key = (track['name'], ", ".join(track['artists']))
-        track_objects[track_key] = track
-        
-        for artist_name in track['artists']:
-            artist_counter[artist_name] += 1
-
-        # Count by track object and accumulate listening time
-        track_listening_time[track_key] += duration_ms
-        
-        total_listening_time_ms += duration_ms
-
-        added_at_str = e.get('added_at')
-        if added_at_str:
-            # Parse ISO string
-            try:
-                if 'T' in added_at_str:
-                     dt = datetime.fromisoformat(added_at_str.replace('Z', '+00:00'))
-                else:
-                     dt = None
-                
-                if dt:
-                    # Time of Day
-                    h = dt.hour
-                    if 5 <= h <= 11: time_str = 'Morning'
-                    elif 12 <= h <= 17: time_str = 'Afternoon'
-                    elif 18 <= h <= 23: time_str = 'Evening'
-                    else: time_str = 'Night'
-                    
-                    time_of_day_counts[time_str] += 1
-            except ValueError:
-                time_str = None
-                pass
+from ..models import Upload
+from .aggregation import FEATURES, aggregate_playlist
+from .playlist_store import load_aggregate
+
+def build_dashboard_context(playlist_data, playlist_name_override=None, aggregate=None, include_tracks=False):
+    # Per-track rows (top_tracks, mood_data) are only built on request: the
+    # dashboard fetches them from the track_list endpoint, and they'd make up
+    # most of every cached snapshot
+    # Counters, feature sums and buckets all come from one shared pass, or
+    # from an Upload's stored aggregate
+    if aggregate is None:
+        # A stored Upload (read from its materialized aggregate), a list of
+        # parsed entries or a PlaylistFrame (rows are built on iteration)
+        if isinstance(playlist_data, Upload):
+            aggregate = load_aggregate(playlist_data)
         else:
-            time_str = None
-
-        # Music Era
-        release_date = track.get('release_date')
-        era_str = None
-        if release_date:
-            try:
-                year = int(release_date[:4])
-                era_str = f"{(year // 10) * 10}s"
-                era_counts[era_str] += 1
-            except (ValueError, TypeError):
-                pass
+            aggregate = aggregate_playlist(playlist_data)
 
-        # Popularity
-        pop = track.get('popularity')
-        pop_str = None
-        if pop is not None:
-            if pop <= 20: pop_str = '0-20'
-            elif pop <= 40: pop_str = '21-40'
-            elif pop <= 60: pop_str = '41-60'
-            elif pop <= 80: pop_str = '61-80'
-            else: pop_str = '81-100'
-            popularity_counts[pop_str] += 1
-
-        # Tempo
-        bpm = track.get('tempo')
-        tempo_str = None
-        if bpm:
-            if bpm < 80: tempo_str = '<80 BPM'
-            elif bpm < 100: tempo_str = '80-100 BPM'
-            elif bpm < 120: tempo_str = '100-120 BPM'
-            elif bpm < 140: tempo_str = '120-140 BPM'
-            else: tempo_str = '>140 BPM'
-            tempo_counts[tempo_str] += 1
-            
-        # Audio features
-        for f in features:
-            val = track.get(f)
-            if val is not None:
-                feature_totals[f] += val
-                feature_counts[f] += 1
-        
-        # Genres
-        track_genres = track.get('genres', [])
-        for g in track_genres:
-            genre_counter[g] += 1
-
-        # --- Serialize for JS ---
-        # We need to construct a clean object for the frontend filter
-        track_obj = {
-            'name': track['name'],
-            'artist': ", ".join(track['artists']),
-            'album': track['album'],
-            'listening_time_hours': round(duration_ms / (1000 * 60 * 60), 3),
-            'duration_ms': duration_ms, # Needed for aggregation
-            'era': era_str,
-            'time_of_day': time_str,
-            'popularity_bucket': pop_str,
-            'tempo_bucket': tempo_str,
-            'genres': track_genres,
-            'url': track.get('external_urls', {}).get('spotify', '#')
-        }
-        
-        # Add audio features
-        for f in features:
-            track_obj[f] = track.get(f)
-            
-        all_tracks_serialized.append(track_obj)
+    total_tracks = aggregate.total_tracks
+    artist_counter = aggregate.artist_counter
+    genre_counter = aggregate.genre_counter
+    time_of_day_counts = aggregate.time_of_day_counts
+    era_counts = aggregate.era_counts
+    popularity_counts = aggregate.popularity_counts
+    tempo_counts = aggregate.tempo_counts
+    features = FEATURES
 
     # --- Top Artists by Duration ---
-    artist_duration = Counter()
-    for track_key, duration_ms in track_listening_time.items():
-        track = track_objects[track_key]
-        for artist_name in track['artists']:
-            artist_duration[artist_name] += duration_ms
-
-    # Get top 10 artists by duration
-    top_artists_duration = artist_duration.most_common(10)
+    top_artists_duration = aggregate.artist_duration.most_common(10)
     top_artists_duration_labels = [x[0] for x in top_artists_duration]
     top_artists_duration_values = [round(x[1] / (1000 * 60), 1) for x in top_artists_duration]
 
     # Calculate averages
-    avg_features = []
-    for f in features:
-        if feature_counts[f] > 0:
-            avg_features.append(round(feature_totals[f] / feature_counts[f], 3))
-        else:
-            avg_features.append(0)
+    avg_features = aggregate.avg_features()
 
     # Convert total listening time to hours
-    total_listening_hours = round(total_listening_time_ms / (1000 * 60 * 60), 3)
+    total_listening_hours = round(aggregate.total_duration_ms / (1000 * 60 * 60), 3)
 
     if playlist_name_override:
         playlist_name = playlist_name_override
     else:
-        playlist_name = entries[0]['playlist_name'] if entries else "Unknown Playlist"
+        playlist_name = aggregate.playlist_name if total_tracks else "Unknown Playlist"
 
     # Prepare Era Data (Sorted)
     sorted_eras = sorted(era_counts.keys())
     era_values = [era_counts[e] for e in sorted_eras]
     
-    # Top Tracks
-    top_tracks_data = []
-    for track_key, time_ms in track_listening_time.items():
-        track = track_objects[track_key]
-        top_tracks_data.append({
-            'name': track['name'],
-            'artist': ", ".join(track['artists']),
-            'album': track['album'],
-            'listening_time_hours': round(time_ms / (1000 * 60 * 60), 2)
-        })
-
-    # Mood Data
-    mood_data = []
-    for track_key in track_listening_time.keys():
-        track = track_objects[track_key]
-        valence = track.get('valence')
-        energy = track.get('energy')
-        if valence is not None and energy is not None:
-             mood_data.append({
-                 'x': valence,
-                 'y': energy,
-                 'name': track['name'],
-                 'artist': track['artists'][0] if track['artists'] else 'Unknown'
-             })
-
     # Vibe Calculation
     vibe = determine_playlist_vibe(avg_features, feature_labels=features)
 
@@ -211,15 +62,14 @@ def build_dashboard_context(playlist_data, playlist_name_override=None):
         time_of_day_counts=time_of_day_counts
     )
 
-    return {
+    context = {
         "playlist_name": playlist_name,
         "playlist_vibe": vibe,
         "text_insights": insights_list,
         "total_tracks": total_tracks,
         "total_listening_hours": total_listening_hours,
         "top_artists": artist_counter.most_common(10),
-        "top_tracks": top_tracks_data,
-        
+
         "top_artists_duration_labels": json.dumps(top_artists_duration_labels),
         "top_artists_duration_values": json.dumps(top_artists_duration_values),
         
@@ -237,12 +87,45 @@ def build_dashboard_context(playlist_data, playlist_name_override=None):
         "popularity_values": json.dumps(list(popularity_counts.values())),
         "tempo_labels": json.dumps(list(tempo_counts.keys())),
         "tempo_values": json.dumps(list(tempo_counts.values())),
-        
-        "tempo_values": json.dumps(list(tempo_counts.values())),
-        
+    }
+    if include_tracks:
+        context.update(track_context(aggregate))
+    return context
+
+
+def track_context(aggregate):
+    """Per-track dashboard rows: top_tracks and the mood scatter's points."""
+    track_listening_time = aggregate.track_listening_time
+    track_objects = aggregate.track_objects
+
+    # Top Tracks
+    top_tracks_data = []
+    for track_key, time_ms in track_listening_time.items():
+        track = track_objects[track_key]
+        top_tracks_data.append({
+            'name': track['name'],
+            'artist': ", ".join(track['artists']),
+            'album': track['album'],
+            'listening_time_hours': round(time_ms / (1000 * 60 * 60), 2)
+        })
+
+    # Mood Data
+    mood_data = []
+    for track_key in track_listening_time.keys():
+        track = track_objects[track_key]
+        valence = track.get('valence')
+        energy = track.get('energy')
+        if valence is not None and energy is not None:
+             mood_data.append({
+                 'x': valence,
+                 'y': energy,
+                 'name': track['name'],
+                 'artist': track['artists'][0] if track['artists'] else 'Unknown'
+             })
+
+    return {
+        "top_tracks": top_tracks_data,
         "mood_data": json.dumps(mood_data),
-        
-        "all_tracks_json": json.dumps(all_tracks_serialized),
     }
 
 def generate_text_insights(total_tracks, artist_counter, genre_counter, era_counts, popularity_counts, tempo_counts, avg_features_values, feature_labels, time_of_day_counts):
@@ -0,0 +1,62 @@
+import json
+from django.core.cache import caches
+from .playlist_frame import StringTable
+from .snapshot_cache import SNAPSHOT_CACHE_ALIAS
+
+# Bump whenever the payload layout changes; it's part of the ETag, so
+# browsers refetch instead of decoding an old layout.
+TRACK_LIST_VERSION = 1
+
+
+def encode_track_list(aggregate):
+    """
+    The dashboard's per-track data (tracks table and mood map), one entry
+    per distinct track, in a compact columnar JSON layout:
+
+        {"version": 1,
+         "strings": {"artists": [...], "albums": [...]},
+         "columns": {"name": [...], "artists": [[0, 3], ...], "album": [2, ...],
+                     "listening_time_hours": [...], "valence": [...], "energy": [...]}}
+
+    Artist and album names are stored once in string tables and referenced
+    by index, key names appear once instead of once per row, and numbers
+    are rounded to what the dashboard displays.
+    """
+    artists = StringTable()
+    albums = StringTable()
+    columns = {name: [] for name in ('name', 'artists', 'album', 'listening_time_hours', 'valence', 'energy')}
+
+    for track_key, time_ms in aggregate.track_listening_time.items():
+        track = aggregate.track_objects[track_key]
+        columns['name'].append(track['name'])
+        columns['artists'].append([artists.intern(a) for a in track['artists']])
+        columns['album'].append(albums.intern(track['album']))
+        columns['listening_time_hours'].append(round(time_ms / (1000 * 60 * 60), 2))
+        columns['valence'].append(_round(track.get('valence')))
+        columns['energy'].append(_round(track.get('energy')))
+
+    return {
+        'version': TRACK_LIST_VERSION,
+        'strings': {'artists': artists.values, 'albums': albums.values},
+        'columns': columns,
+    }
+
+
+def get_track_list_json(content_hash, build):
+    """
+    Serialized track-list payload for a playlist, calling build() for the
+    encode_track_list() dict on a miss. Stored as ready-to-send bytes in
+    the snapshot cache, keyed by content hash like dashboard snapshots.
+    """
+    cache = caches[SNAPSHOT_CACHE_ALIAS]
+    key = f"track_list:{content_hash}"
+
+    body = cache.get(key, version=TRACK_LIST_VERSION)
+    if body is None:
+        body = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+        cache.set(key, body, version=TRACK_LIST_VERSION)
+    return body
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
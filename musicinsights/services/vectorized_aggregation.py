@@ -0,0 +1,188 @@
+from collections import Counter
+from .aggregation import (
+    FEATURES, POPULARITY_LABELS, TEMPO_LABELS, TIME_OF_DAY_LABELS,
+    PlaylistAggregate, era_for_year, time_of_day_bucket,
+)
+from .playlist_frame import FEATURE_COLUMNS, INT_COLUMNS, NO_VALUE
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without numpy everything runs through PlaylistAggregate.add
+    np = None
+
+# Upper bucket edges, matching popularity_bucket (pop <= edge) and tempo_bucket (bpm < edge)
+POPULARITY_EDGES = [20, 40, 60, 80]
+TEMPO_EDGES = [80, 100, 120, 140]
+
+# Hour of day -> index into TIME_OF_DAY_LABELS
+HOUR_BUCKETS = [TIME_OF_DAY_LABELS.index(time_of_day_bucket(hour)) for hour in range(24)]
+
+
+def available():
+    return np is not None
+
+
+def aggregate_frame(frame):
+    """
+    Build the same PlaylistAggregate as aggregate_playlist, but from a
+    PlaylistFrame's column arrays with numpy instead of one add() per row.
+
+    Feature sums use a running (cumulative) sum so floats are added in the
+    same order as the scalar path and the rounded averages come out
+    bit-for-bit identical. Only the per-track rows and track dicts still
+    touch every row in Python.
+    """
+    aggregate = PlaylistAggregate()
+    n = len(frame)
+    if n == 0:
+        return aggregate
+
+    aggregate.total_tracks = n
+    aggregate.playlist_name = frame.playlist_names[frame.playlist_name_ids[0]]
+    aggregate.uri_counts = Counter(uri for uri in frame.uris if uri)
+
+    columns = {name: np.frombuffer(column, dtype=np.float64) for name, column in frame.columns.items()}
+    durations = np.nan_to_num(columns['duration_ms'], nan=0.0).astype(np.int64)
+    aggregate.total_duration_ms = int(durations.sum())
+
+    # --- Artists and genres: bincount over the CSR id columns ---
+    artist_ids = np.frombuffer(frame.artist_ids, dtype=np.uint32)
+    artist_rows = np.repeat(np.arange(n), np.diff(np.frombuffer(frame.artist_offsets, dtype=np.uint32)))
+    artist_counts = np.bincount(artist_ids, minlength=len(frame.artists))
+    artist_durations = np.bincount(artist_ids, weights=durations[artist_rows], minlength=len(frame.artists))
+    # String table ids follow first appearance, so Counter order (and most_common ties) match
+    for artist_id in np.flatnonzero(artist_counts).tolist():
+        name = frame.artists[artist_id]
+        aggregate.artist_counter[name] = int(artist_counts[artist_id])
+        aggregate.artist_duration[name] = int(artist_durations[artist_id])
+
+    genre_counts = np.bincount(np.frombuffer(frame.genre_ids, dtype=np.uint32), minlength=len(frame.genres))
+    for genre_id in np.flatnonzero(genre_counts).tolist():
+        aggregate.genre_counter[frame.genres[genre_id]] = int(genre_counts[genre_id])
+
+    # --- Time of day, from the hour column parsed at ingest ---
+    hours = np.frombuffer(frame.added_hours, dtype=np.int8).astype(np.int64)
+    known_hours = hours[hours != NO_VALUE]
+    aggregate.hour_counter = Counter({h: int(c) for h, c in enumerate(np.bincount(known_hours, minlength=24)) if c})
+    time_counts = np.bincount(np.take(HOUR_BUCKETS, known_hours), minlength=len(TIME_OF_DAY_LABELS))
+    aggregate.time_of_day_counts = dict(zip(TIME_OF_DAY_LABELS, time_counts.tolist()))
+    time_labels = [None if h == NO_VALUE else TIME_OF_DAY_LABELS[HOUR_BUCKETS[h]] for h in hours.tolist()]
+
+    # --- Eras: decade histogram over the release year column ---
+    years = np.frombuffer(frame.release_years, dtype=np.int16).astype(np.int64)
+    dated = years != NO_VALUE
+    decades, first_rows, row_decades = np.unique((years[dated] // 10) * 10, return_index=True, return_inverse=True)
+    era_labels = [era_for_year(int(decade)) for decade in decades]
+    era_counts = np.bincount(row_decades, minlength=len(era_labels))
+    # Insert in order of first appearance in the playlist, like the scalar pass
+    for era in np.argsort(first_rows, kind='stable').tolist():
+        aggregate.era_counts[era_labels[era]] = int(era_counts[era])
+    row_eras = np.full(n, -1, dtype=np.int64)
+    row_eras[dated] = row_decades
+
+    # --- Popularity and tempo: np.digitize against the bucket edges ---
+    popularity = columns['popularity']
+    has_popularity = ~np.isnan(popularity)
+    popularity_buckets = np.digitize(popularity, POPULARITY_EDGES, right=True)
+    aggregate.popularity_counts = dict(zip(
+        POPULARITY_LABELS,
+        np.bincount(popularity_buckets[has_popularity], minlength=len(POPULARITY_LABELS)).tolist(),
+    ))
+
+    tempo = columns['tempo']
+    has_tempo = ~np.isnan(tempo) & (tempo != 0)
+    tempo_buckets = np.digitize(tempo, TEMPO_EDGES)
+    aggregate.tempo_counts = dict(zip(
+        TEMPO_LABELS,
+        np.bincount(tempo_buckets[has_tempo], minlength=len(TEMPO_LABELS)).tolist(),
+    ))
+    aggregate.tempo_total = _running_sum(tempo[has_tempo])
+
+    # --- Audio features ---
+    for f in FEATURES:
+        present = columns[f][~np.isnan(columns[f])]
+        aggregate.feature_totals[f] = _running_sum(present)
+        aggregate.feature_counts[f] = int(present.size)
+    aggregate.high_energy_tracks = int(np.count_nonzero(columns['energy'] > 0.7))
+
+    # --- Per-track data for the tables and the JS filter rows ---
+    artist_lists = _split_rows(frame.artists.values, frame.artist_ids, frame.artist_offsets)
+    genre_lists = _split_rows(frame.genres.values, frame.genre_ids, frame.genre_offsets)
+    artist_names = [", ".join(artists) for artists in artist_lists]
+    duration_list = durations.tolist()
+    last_row = {}
+    for i, track_key in enumerate(zip(frame.names, artist_names)):
+        aggregate.track_listening_time[track_key] += duration_list[i]
+        aggregate.track_entry_counts[track_key] += 1
+        last_row[track_key] = i
+
+    albums = frame.albums.values
+    album_ids = frame.album_ids
+    release_dates = frame.release_dates.values
+    release_date_ids = frame.release_date_ids
+    release_years = [None if year == NO_VALUE else year for year in years.tolist()]
+    column_values = {
+        name: _optional_values(column, int if name in INT_COLUMNS else None)
+        for name, column in columns.items()
+    }
+    # Later duplicates overwrite the track but keep the first one's position
+    for track_key, i in last_row.items():
+        track = {
+            'name': frame.names[i],
+            'artists': artist_lists[i],
+            'album': albums[album_ids[i]],
+            'genres': genre_lists[i],
+            'uri': frame.uris[i],
+            'release_date': release_dates[release_date_ids[i]],
+        }
+        for name in FEATURE_COLUMNS:
+            track[name] = column_values[name][i]
+        track['release_year'] = release_years[i]
+        aggregate.track_objects[track_key] = track
+
+    popularity_labels = _labels(popularity_buckets, has_popularity, POPULARITY_LABELS)
+    tempo_labels = _labels(tempo_buckets, has_tempo, TEMPO_LABELS)
+    row_era_labels = [era_labels[era] if era >= 0 else None for era in row_eras.tolist()]
+
+    for i in range(n):
+        row = {
+            'name': frame.names[i],
+            'artist': artist_names[i],
+            'album': albums[album_ids[i]],
+            'listening_time_hours': round(duration_list[i] / (1000 * 60 * 60), 3),
+            'duration_ms': duration_list[i],
+            'era': row_era_labels[i],
+            'time_of_day': time_labels[i],
+            'popularity_bucket': popularity_labels[i],
+            'tempo_bucket': tempo_labels[i],
+            'genres': genre_lists[i],
+            'url': '#',
+        }
+        for f in FEATURES:
+            row[f] = column_values[f][i]
+        aggregate.track_rows.append(row)
+
+    return aggregate
+
+
+def _running_sum(values):
+    # Sequential left-to-right sum (np.sum is pairwise and can differ in the last bit)
+    return float(np.cumsum(values)[-1]) if values.size else 0.0
+
+
+def _labels(buckets, mask, labels):
+    return [labels[b] if present else None for b, present in zip(buckets.tolist(), mask.tolist())]
+
+
+def _optional_values(column, cast=None):
+    # NaN is the frame's "missing"; NaN != NaN picks it out without a per-value isnan call
+    if cast is None:
+        return [None if v != v else v for v in column.tolist()]
+    return [None if v != v else cast(v) for v in column.tolist()]
+
+
+def _split_rows(strings, ids, offsets):
+    """Expand a CSR id column into one list of strings per row."""
+    flat = [strings[i] for i in ids]
+    bounds = offsets.tolist()
+    return [flat[start:end] for start, end in zip(bounds, bounds[1:])]
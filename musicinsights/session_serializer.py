@@ -0,0 +1,56 @@
+import json
+import logging
+import lzma
+import zlib
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# First byte of a serialized session: which codec follows. Sessions written
+# by Django's JSONSerializer start with '{' and are still read.
+ZLIB = b'z'
+LZMA = b'x'
+
+# Strings every session repeats, used to prime zlib so even a session with
+# one playlist compresses. Changing it makes existing sessions unreadable,
+# so a new dictionary needs a new format byte.
+ZLIB_DICTIONARY = (
+    '{"_auth_user_id":"","_auth_user_backend":"","_auth_user_hash":"",'
+    '"history_lru":["1"],'
+    '"history_index":[{"id":"","name":"","created_at":"2026-","track_count":null}],'
+    '"history":[{"id":"","name":"Demo Playlist","file_name":".csv","created_at":"2026-",'
+    '"track_count":100,"is_demo":true}]}'
+).encode('ascii')
+
+
+class CompressedJSONSerializer:
+    """
+    Session serializer: compact JSON, compressed with zlib (primed with
+    ZLIB_DICTIONARY) or lzma per settings.SESSION_COMPRESSION. Sizes are
+    logged at DEBUG; keeping sessions under settings.SESSION_MAX_BYTES is
+    up to history_index.set_history.
+    """
+
+    def dumps(self, obj):
+        return self._compress(obj)
+
+    def loads(self, data):
+        codec, body = data[:1], data[1:]
+        if codec == ZLIB:
+            decompressor = zlib.decompressobj(zdict=ZLIB_DICTIONARY)
+            raw = decompressor.decompress(body) + decompressor.flush()
+        elif codec == LZMA:
+            raw = lzma.decompress(body)
+        else:
+            raw = data
+        return json.loads(raw.decode('latin-1'))
+
+    def _compress(self, obj):
+        raw = json.dumps(obj, separators=(',', ':')).encode('latin-1')
+        if settings.SESSION_COMPRESSION == 'lzma':
+            data = LZMA + lzma.compress(raw, preset=6)
+        else:
+            compressor = zlib.compressobj(level=9, zdict=ZLIB_DICTIONARY)
+            data = ZLIB + compressor.compress(raw) + compressor.flush()
+        logger.debug("Session: %d bytes of JSON, %d compressed", len(raw), len(data))
+        return data
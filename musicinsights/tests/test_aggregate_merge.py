@@ -0,0 +1,108 @@
+from django.test import TestCase
+from musicinsights.services.aggregation import (
+    BUCKET_FIELDS, COUNTER_FIELDS, FEATURES, PlaylistAggregate, aggregate_playlist,
+)
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.exportify_parser import parse_exportify_csv
+from musicinsights.services.playlist_store import load_aggregate, load_playlist, save_playlist, save_playlist_version
+from musicinsights.services.stats_service import build_dashboard_context
+
+HEADER = "Track URI,Track Name,Album Name,Artist Name(s),Release Date,Added At,Duration (ms),Genres,Energy,Valence\n"
+ROWS = {
+    1: "spotify:track:1,Song A,Album A,Artist A;Artist B,1995-01-01,2023-01-01T08:00:00Z,1000,\"pop,rock\",0.8,0.4\n",
+    2: "spotify:track:2,Song B,Album B,Artist B,2004,2023-01-02T13:00:00Z,2000,rock,0.6,0.9\n",
+    3: "spotify:track:3,Song C,Album C,Artist C,2021-06-01,2023-01-03T21:00:00Z,3000,jazz,0.2,0.1\n",
+    4: "spotify:track:4,Song D,Album C,Artist C,1978,2023-01-04T02:00:00Z,4000,,0.9,0.5\n",
+}
+
+
+def playlist(*rows):
+    return parse_exportify_csv((HEADER + "".join(ROWS[r] for r in rows)).encode('utf-8'), "mix.csv")
+
+
+class AggregateMergeTest(TestCase):
+    def assertSameAggregate(self, actual, expected):
+        self.assertEqual(actual.total_tracks, expected.total_tracks)
+        self.assertEqual(actual.total_duration_ms, expected.total_duration_ms)
+        self.assertEqual(actual.high_energy_tracks, expected.high_energy_tracks)
+        for name in COUNTER_FIELDS + BUCKET_FIELDS + ['artist_duration', 'track_listening_time', 'track_entry_counts']:
+            self.assertEqual(dict(getattr(actual, name)), dict(getattr(expected, name)), name)
+        self.assertEqual(set(actual.track_objects), set(expected.track_objects))
+        self.assertEqual(actual.feature_counts, expected.feature_counts)
+        for f in FEATURES:
+            self.assertAlmostEqual(actual.feature_totals[f], expected.feature_totals[f])
+        self.assertAlmostEqual(actual.tempo_total, expected.tempo_total)
+
+    def test_add_matches_single_pass(self):
+        entries = generate_dummy_data()
+        half = len(entries) // 2
+        merged = aggregate_playlist(entries[:half]) + aggregate_playlist(entries[half:])
+        self.assertSameAggregate(merged, aggregate_playlist(entries))
+
+    def test_subtract_undoes_add(self):
+        a = aggregate_playlist(playlist(1, 2, 3))
+        b = aggregate_playlist(playlist(4, 1))
+        self.assertSameAggregate((a + b) - b, a)
+
+        # Keys with nothing left drop out entirely
+        empty = a - a
+        self.assertEqual(empty.total_tracks, 0)
+        self.assertFalse(empty.artist_counter)
+        self.assertFalse(empty.track_objects)
+        self.assertEqual(empty.feature_totals['energy'], 0.0)
+
+    def test_dict_round_trip_gives_same_dashboard(self):
+        aggregate = aggregate_playlist(generate_dummy_data())
+        restored = PlaylistAggregate.from_dict(aggregate.to_dict())
+
+        self.assertEqual(
+            build_dashboard_context(None, aggregate=restored),
+            build_dashboard_context(None, aggregate=aggregate),
+        )
+
+    def test_new_version_updates_stored_aggregate(self):
+        previous = save_playlist(playlist(1, 2, 3, 1), "mix.csv")
+
+        # One copy of Song A and Song C removed, Song D added
+        upload = save_playlist_version(playlist(2, 1, 4), "mix (1).csv", previous)
+
+        self.assertSameAggregate(load_aggregate(upload), aggregate_playlist(load_playlist(upload)))
+        self.assertEqual(load_aggregate(upload).artist_counter, {'Artist A': 1, 'Artist B': 2, 'Artist C': 1})
+
+    def test_removal_ignores_tracks_reexported_since(self):
+        previous = save_playlist(playlist(1, 2, 3), "mix.csv")
+        # Another playlist re-exports Song C with a different energy
+        save_playlist(parse_exportify_csv((HEADER + ROWS[3].replace(",0.2,", ",0.7,")).encode('utf-8'), "other.csv"), "other.csv")
+
+        upload = save_playlist_version(playlist(1, 2), "mix (1).csv", previous)
+
+        self.assertSameAggregate(load_aggregate(upload), aggregate_playlist(playlist(1, 2)))
+
+    def test_new_version_without_removals_is_delta_based(self):
+        previous = save_playlist(playlist(1, 2), "mix.csv")
+        changed = HEADER + ROWS[1].replace(",0.8,", ",0.3,") + ROWS[2] + ROWS[4]
+        frame = parse_exportify_csv(changed.encode('utf-8'), "mix.csv")
+
+        upload = save_playlist_version(frame, "mix (1).csv", previous)
+
+        # Song A keeps the energy the previous version was aggregated with
+        expected = aggregate_playlist(playlist(1, 2, 4))
+        self.assertSameAggregate(load_aggregate(upload), expected)
+
+    def test_new_version_stores_a_given_aggregate(self):
+        previous = save_playlist(playlist(1, 2), "mix.csv")
+        changed = HEADER + ROWS[1].replace(",0.8,", ",0.3,") + ROWS[2] + ROWS[4]
+        frame = parse_exportify_csv(changed.encode('utf-8'), "mix.csv")
+
+        upload = save_playlist_version(frame, "mix (1).csv", previous, aggregate=aggregate_playlist(frame))
+
+        self.assertSameAggregate(load_aggregate(upload), aggregate_playlist(frame))
+
+    def test_stale_stored_aggregate_is_recomputed(self):
+        upload = save_playlist(playlist(1, 2), "mix.csv")
+        upload.aggregate = {'version': 0}
+        upload.save()
+
+        self.assertEqual(load_aggregate(upload).total_tracks, 2)
+        upload.refresh_from_db()
+        self.assertEqual(upload.aggregate['total_tracks'], 2)
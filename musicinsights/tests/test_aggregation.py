@@ -0,0 +1,54 @@
+from unittest import mock
+from django.test import TestCase
+from musicinsights.services import aggregation
+from musicinsights.services.aggregation import aggregate_playlist
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.recommendation_service import build_recommendations
+from musicinsights.services.stats_service import build_dashboard_context
+
+
+def _entry(name, artists, added_at, duration_ms=60000, **features):
+    return {
+        'track': {'name': name, 'artists': artists, 'album': 'Album', 'duration_ms': duration_ms,
+                  'genres': ['pop'], 'uri': f'spotify:track:{name}', **features},
+        'added_at': added_at,
+        'playlist_name': 'Mix',
+    }
+
+
+class PlaylistAggregateTest(TestCase):
+    def test_single_pass_counts(self):
+        aggregate = aggregate_playlist([
+            _entry('A', ['X', 'Y'], '2023-01-01T08:00:00Z', energy=0.9, tempo=150, popularity=90, release_date='1994-05-01'),
+            _entry('B', ['X'], '2023-01-01T20:00:00Z', energy=0.2, tempo=70, popularity=10, release_date='2001'),
+            _entry('C', ['Z'], None, duration_ms=None),
+        ])
+
+        self.assertEqual(aggregate.total_tracks, 3)
+        self.assertEqual(aggregate.total_duration_ms, 120000)
+        self.assertEqual(aggregate.artist_counter, {'X': 2, 'Y': 1, 'Z': 1})
+        self.assertEqual(aggregate.artist_duration['X'], 120000)
+        self.assertEqual(aggregate.hour_counter, {8: 1, 20: 1})
+        self.assertEqual(aggregate.time_of_day_counts['Morning'], 1)
+        self.assertEqual(aggregate.time_of_day_counts['Evening'], 1)
+        self.assertEqual(aggregate.era_counts, {'1990s': 1, '2000s': 1})
+        self.assertEqual(aggregate.popularity_counts['81-100'], 1)
+        self.assertEqual(aggregate.tempo_counts['>140 BPM'], 1)
+        self.assertEqual(aggregate.tempo_total, 220)
+        self.assertEqual(aggregate.high_energy_tracks, 1)
+        self.assertEqual(aggregate.known_uris, {'spotify:track:A', 'spotify:track:B', 'spotify:track:C'})
+        self.assertEqual(len(aggregate.track_rows), 3)
+
+    def test_consumers_share_one_pass(self):
+        entries = generate_dummy_data()
+        expected_context = build_dashboard_context(entries)
+        expected_recs = build_recommendations(entries)
+
+        aggregate = aggregate_playlist(entries)
+        with mock.patch.object(aggregation.PlaylistAggregate, 'add') as add:
+            context = build_dashboard_context(entries, aggregate=aggregate)
+            recs = build_recommendations(entries, aggregate=aggregate)
+
+        add.assert_not_called()
+        self.assertEqual(context, expected_context)
+        self.assertEqual(recs, expected_recs)
@@ -0,0 +1,127 @@
+import io
+import zipfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from musicinsights import views
+from musicinsights.models import Upload
+
+HEADER = "Track URI,Track Name,Album Name,Artist Name(s),Duration (ms)\n"
+
+
+def playlist_csv(prefix, rows):
+    return (HEADER + "".join(f"spotify:track:{prefix}{i},Song {i},Album,Artist,1000\n" for i in range(rows))).encode()
+
+
+def library_zip(files, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return SimpleUploadedFile("library.zip", buffer.getvalue(), content_type="application/zip")
+
+
+@mock.patch('musicinsights.views.get_spotify_service', return_value=None)
+class ArchiveUploadTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.files = {
+            "Library/Road Trip.csv": playlist_csv("a", 3),
+            "Library/Focus.csv": playlist_csv("b", 2),
+            "Library/notes.txt": b"not a playlist",
+        }
+
+    def assert_imported(self, response):
+        self.assertRedirects(response, reverse('library'), fetch_redirect_response=False)
+        history = self.client.session['history']
+        self.assertEqual([(p['name'], p['track_count']) for p in history], [("Focus.csv", 2), ("Road Trip.csv", 3)])
+        self.assertEqual(sorted(Upload.objects.values_list('name', flat=True)), ["Focus.csv", "Road Trip.csv"])
+
+    @override_settings(UPLOAD_WORKERS=1)
+    def test_each_member_becomes_a_playlist(self, _):
+        self.assert_imported(self.client.post(reverse('upload_file'), {'file': library_zip(self.files)}))
+
+    @override_settings(UPLOAD_WORKERS=2)
+    def test_members_are_parsed_in_a_process_pool(self, _):
+        self.assert_imported(self.client.post(reverse('upload_file'), {'file': library_zip(self.files)}))
+
+    @override_settings(UPLOAD_WORKERS=1, UPLOAD_MAX_ROWS=2)
+    def test_oversized_members_are_skipped(self, _):
+        response = self.client.post(reverse('upload_file'), {'file': library_zip(self.files)})
+
+        upload = Upload.objects.get()
+        self.assertEqual(upload.name, "Focus.csv")
+        self.assertRedirects(response, reverse('dashboard', args=[str(upload.pk)]), fetch_redirect_response=False)
+
+    @override_settings(UPLOAD_WORKERS=1)
+    def test_members_with_the_same_file_name_are_separate_playlists(self, _):
+        files = {"b/Liked.csv": playlist_csv("b", 2), "a/Liked.csv": playlist_csv("a", 3)}
+
+        with mock.patch('musicinsights.views.save_playlist_version') as save_version:
+            self.client.post(reverse('upload_file'), {'file': library_zip(files)})
+
+        save_version.assert_not_called()
+        history = self.client.session['history']
+        self.assertEqual([p['source_path'] for p in history], ["a/Liked.csv", "b/Liked.csv"])
+        self.assertEqual([p['track_count'] for p in history], [3, 2])
+        self.assertEqual([p['name'] for p in history], ["Liked.csv", "Liked (1).csv"])
+
+    @override_settings(UPLOAD_WORKERS=1)
+    def test_reuploaded_members_are_new_versions(self, _):
+        self.client.post(reverse('upload_file'), {'file': library_zip(self.files)})
+        self.files["Library/Focus.csv"] = playlist_csv("b", 4)
+
+        with mock.patch('musicinsights.views.save_playlist_version', wraps=views.save_playlist_version) as save_version:
+            self.client.post(reverse('upload_file'), {'file': library_zip(self.files)})
+
+        save_version.assert_called_once()
+        self.assertEqual(self.client.session['history'][-1]['name'], "Focus (1).csv")
+
+    @override_settings(UPLOAD_WORKERS=1)
+    def test_corrupt_members_are_skipped(self, _):
+        self.files["Library/Road Trip.csv"] = self.files["Library/Road Trip.csv"].replace(b"Song 0", b"Song X")
+        archive = library_zip(self.files, zipfile.ZIP_STORED)
+        # Stored uncompressed, so this flips the member's bytes under its CRC
+        corrupted = SimpleUploadedFile("library.zip", archive.read().replace(b"Song X", b"Song 0"))
+
+        response = self.client.post(reverse('upload_file'), {'file': corrupted})
+
+        upload = Upload.objects.get()
+        self.assertEqual(upload.name, "Focus.csv")
+        self.assertRedirects(response, reverse('dashboard', args=[str(upload.pk)]), fetch_redirect_response=False)
+
+    @override_settings(UPLOAD_WORKERS=1)
+    def test_unparseable_members_are_skipped(self, _):
+        # Over csv's default 128 KB field limit
+        self.files["Library/Road Trip.csv"] = HEADER.encode() + b"spotify:track:x," + b"y" * 200_000 + b",Album,Artist,1000\n"
+
+        response = self.client.post(reverse('upload_file'), {'file': library_zip(self.files)})
+
+        upload = Upload.objects.get()
+        self.assertEqual(upload.name, "Focus.csv")
+        self.assertRedirects(response, reverse('dashboard', args=[str(upload.pk)]), fetch_redirect_response=False)
+
+    def test_rejects_truncated_archives(self, _):
+        archive = library_zip(self.files).read()
+        response = self.client.post(reverse('upload_file'), {'file': SimpleUploadedFile("library.zip", archive[:-30])})
+        self.assertContains(response, "not a valid zip archive")
+
+    @override_settings(UPLOAD_MAX_ARCHIVE_BYTES=100)
+    def test_rejects_archives_too_large_unzipped(self, _):
+        response = self.client.post(reverse('upload_file'), {'file': library_zip(self.files)})
+        self.assertContains(response, "once unzipped")
+        self.assertFalse(Upload.objects.exists())
+
+    def test_rejects_archives_without_csvs(self, _):
+        response = self.client.post(reverse('upload_file'), {'file': library_zip({"notes.txt": b"hi"})})
+        self.assertContains(response, "has no CSV files")
+
+    def test_multiple_csv_files(self, _):
+        response = self.client.post(reverse('upload_file'), {'file': [
+            SimpleUploadedFile("Road Trip.csv", playlist_csv("a", 3)),
+            SimpleUploadedFile("Focus.csv", playlist_csv("b", 2)),
+        ]})
+
+        self.assertRedirects(response, reverse('library'), fetch_redirect_response=False)
+        self.assertEqual([p['name'] for p in self.client.session['history']], ["Road Trip.csv", "Focus.csv"])
@@ -0,0 +1,67 @@
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.playlist_store import save_playlist
+from musicinsights.services.spotify_cache import SPOTIFY_CACHE_ALIAS
+
+DEEP_CUT = {'id': 't1', 'name': 'Hit', 'artists': ['A'], 'album_art': None,
+            'preview_url': None, 'external_url': '#', 'reason': 'Essential A track'}
+
+
+class DeepCutsEndpointTest(TestCase):
+    def setUp(self):
+        caches[SPOTIFY_CACHE_ALIAS].clear()
+        self.client = Client()
+        self.upload = save_playlist(generate_dummy_data(), "Mix")
+        session = self.client.session
+        session['history'] = [{'id': str(self.upload.pk), 'name': "Mix"}]
+        session.save()
+        self.url = reverse('deep_cuts', args=[str(self.upload.pk)])
+
+        self.spotify = mock.Mock()
+        self.spotify.get_missing_top_tracks.return_value = [DEEP_CUT]
+        patcher = mock.patch('musicinsights.views.get_spotify_service', return_value=self.spotify)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dashboard_does_not_call_spotify(self):
+        response = self.client.get(reverse('dashboard', args=[str(self.upload.pk)]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.url)
+        self.spotify.get_missing_top_tracks.assert_not_called()
+
+    @override_settings(DEEP_CUTS_RUN_INLINE=True)
+    def test_results_are_cached_per_playlist(self):
+        first = self.client.get(self.url).json()
+        second = self.client.get(self.url).json()
+
+        self.assertEqual(first, {'status': 'ready', 'tracks': [DEEP_CUT]})
+        self.assertEqual(second, first)
+        self.assertEqual(self.spotify.get_missing_top_tracks.call_count, 1)
+
+    @override_settings(DEEP_CUTS_RUN_INLINE=True)
+    def test_failed_job_is_logged_with_traceback(self):
+        self.spotify.get_missing_top_tracks.side_effect = RuntimeError("Spotify is down")
+
+        with self.assertLogs('musicinsights.services.deep_cuts_jobs', 'ERROR') as logs:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), {'status': 'ready', 'tracks': []})
+        self.assertIn("Spotify is down", logs.output[0])
+        self.assertIsNotNone(logs.records[0].exc_info)
+
+    @mock.patch('musicinsights.services.deep_cuts_jobs._get_executor')
+    def test_job_is_queued_once_while_pending(self, get_executor):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.json(), {'status': 'pending', 'tracks': []})
+        self.assertEqual(get_executor.return_value.submit.call_count, 1)
+
+    def test_other_sessions_cannot_read_playlist(self):
+        response = Client().get(self.url)
+        self.assertEqual(response.status_code, 404)
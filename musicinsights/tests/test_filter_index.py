@@ -0,0 +1,93 @@
+import json
+from collections import Counter
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase, Client
+from django.urls import reverse
+from musicinsights.services.aggregation import aggregate_playlist
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.filter_index import FilterIndex
+from musicinsights.services.playlist_store import load_playlist, save_playlist
+from musicinsights.services.snapshot_cache import SNAPSHOT_CACHE_ALIAS
+
+
+class FilterIndexTest(TestCase):
+    def setUp(self):
+        self.aggregate = aggregate_playlist(generate_dummy_data() * 2)
+        self.index = FilterIndex.from_aggregate(self.aggregate)
+
+    def test_unfiltered_counts_match_dashboard(self):
+        result = self.index.query({})
+
+        self.assertEqual(result['total'], self.aggregate.total_tracks)
+        self.assertEqual(dict(result['charts']['era']), dict(self.aggregate.era_counts))
+        self.assertEqual(result['charts']['genre'], self.aggregate.genre_counter.most_common(10))
+        self.assertEqual(result['charts']['tempo'], list(map(list, self.aggregate.tempo_counts.items())))
+
+    def test_filters_match_brute_force(self):
+        row = self.aggregate.track_rows[0]
+        filters = {'era': row['era'], 'genre': row['genres'][0], 'time_of_day': row['time_of_day']}
+        expected = [
+            r for r in self.aggregate.track_rows
+            if r['era'] == filters['era'] and filters['genre'] in r['genres']
+            and r['time_of_day'] == filters['time_of_day']
+        ]
+
+        result = self.index.query(filters, limit=3)
+
+        self.assertEqual(result['total'], len(expected))
+        self.assertEqual(result['tracks'], [{'name': r['name'], 'artist': r['artist']} for r in expected[:3]])
+        self.assertEqual(
+            dict(result['charts']['popularity']),
+            {k: v for k, v in Counter(r['popularity_bucket'] for r in expected).items() if k},
+        )
+        self.assertEqual(sum(count for _, _, count in result['charts']['mood']), len(expected))
+
+    def test_round_trips_through_storage(self):
+        stored = FilterIndex.from_dict(json.loads(json.dumps(self.index.to_dict())))
+        for filters in ({}, {'genre': 'Rock'}, {'era': self.aggregate.track_rows[3]['era']}):
+            self.assertEqual(stored.query(filters), self.index.query(filters))
+
+    def test_concat_matches_index_of_combined_rows(self):
+        entries = generate_dummy_data()
+        halves = [entries[:20], entries[20:]]
+        combined = FilterIndex.concat(FilterIndex.from_aggregate(aggregate_playlist(h)) for h in halves)
+        expected = FilterIndex.from_aggregate(aggregate_playlist(entries))
+        for filters in ({}, {'genre': 'Rock'}, {'time_of_day': 'Morning'}):
+            self.assertEqual(combined.query(filters, limit=50), expected.query(filters, limit=50))
+
+    def test_unknown_bucket_matches_nothing(self):
+        result = self.index.query({'genre': 'no-such-genre'})
+
+        self.assertEqual(result['total'], 0)
+        self.assertEqual(result['tracks'], [])
+        self.assertEqual(result['charts']['features'], [0] * 7)
+
+
+class FilterTracksEndpointTest(TestCase):
+    def setUp(self):
+        caches[SNAPSHOT_CACHE_ALIAS].clear()
+        self.client = Client()
+        self.upload = save_playlist(generate_dummy_data(), "Mix")
+        session = self.client.session
+        session['history'] = [{'id': str(self.upload.pk), 'name': "Mix"}]
+        session.save()
+        self.url = reverse('filter_tracks', args=[str(self.upload.pk)])
+
+    def test_index_is_stored_at_ingest(self):
+        era_counts = aggregate_playlist(load_playlist(self.upload)).era_counts
+
+        with mock.patch('musicinsights.services.playlist_store.load_playlist') as load, \
+                mock.patch('musicinsights.services.playlist_store.FilterIndex.from_dict',
+                           wraps=FilterIndex.from_dict) as decode:
+            first = self.client.get(self.url, {'era': '2010s'}).json()
+            second = self.client.get(self.url, {'era': '2000s', 'limit': 'x'}).json()
+
+        load.assert_not_called()
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(first['total'], era_counts['2010s'])
+        self.assertEqual(second['total'], era_counts['2000s'])
+        self.assertEqual(first['charts']['era'], [['2010s', era_counts['2010s']]])
+
+    def test_other_sessions_cannot_query_playlist(self):
+        self.assertEqual(Client().get(self.url).status_code, 404)
@@ -0,0 +1,93 @@
+import secrets
+from unittest import mock
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from musicinsights.models import Upload
+from musicinsights.services.history_index import (
+    HISTORY_INDEX_KEY, HISTORY_LRU_KEY, get_history_index, session_size, set_history, touch_history,
+)
+
+CSV_CONTENT = (
+    "Track URI,Track Name,Album Name,Artist Name(s),Duration (ms)\n"
+    "spotify:track:1,Song A,Album A,Artist A,1000\n"
+).encode('utf-8')
+
+
+def history_entry(upload):
+    return {'id': str(upload.pk), 'name': upload.name, 'created_at': "2026-10-01", 'track_count': 1}
+
+
+class SessionBudgetTest(TestCase):
+    def setUp(self):
+        self.uploads = [Upload.objects.create(name=f"Playlist {i}.csv") for i in range(40)]
+        self.history = [history_entry(u) for u in self.uploads]
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        return request
+
+    @override_settings(SESSION_MAX_BYTES=300)
+    def test_evicts_least_recently_used_and_releases_them(self):
+        request = self.request()
+        # Playlist 0 was used last, so the never-used 1, 2, ... go first
+        request.session[HISTORY_LRU_KEY] = [str(self.uploads[5].pk), str(self.uploads[0].pk)]
+
+        with self.assertLogs('musicinsights.services.history_index', 'WARNING'):
+            evicted = set_history(request, self.history)
+
+        ids = [p['id'] for p in request.session['history']]
+        self.assertIn(str(self.uploads[0].pk), ids)
+        self.assertEqual(evicted[0], str(self.uploads[1].pk))
+        self.assertEqual([p['id'] for p in request.session[HISTORY_INDEX_KEY]], ids[::-1])
+        self.assertEqual(sorted(Upload.objects.values_list('pk', flat=True)), sorted(int(i) for i in ids))
+
+    @override_settings(SESSION_MAX_BYTES=300)
+    def test_keeps_the_last_playlist(self):
+        request = self.request()
+        request.session['padding'] = secrets.token_hex(500)
+        touch_history(request, self.history[-1]['id'])
+
+        set_history(request, self.history)
+
+        self.assertEqual(request.session['history'], self.history[-1:])
+
+    @override_settings(SESSION_MAX_BYTES=300)
+    def test_building_the_index_never_evicts(self):
+        request = self.request()
+        # A session from before the index existed
+        request.session['history'] = self.history
+
+        index = get_history_index(request)
+
+        self.assertEqual([p['id'] for p in index], [p['id'] for p in reversed(self.history)])
+        self.assertEqual(request.session['history'], self.history)
+        self.assertEqual(Upload.objects.count(), 40)
+
+    def test_under_budget_is_unchanged(self):
+        request = self.request()
+        with self.assertNoLogs('musicinsights.services.history_index', 'WARNING'):
+            self.assertEqual(set_history(request, self.history), [])
+        self.assertEqual(request.session['history'], self.history)
+        self.assertEqual(Upload.objects.count(), 40)
+
+    @mock.patch('musicinsights.views.get_spotify_service', return_value=None)
+    def test_new_upload_is_kept_over_older_ones(self, _):
+        client = Client()
+        session = client.session
+        session['history'] = self.history
+        session.save()
+        # Full as it is, so storing one more playlist goes over
+        request = self.request()
+        request.session.update(session.items())
+        budget = session_size(request)
+
+        with self.settings(SESSION_MAX_BYTES=budget), self.assertLogs('musicinsights.services.history_index', 'WARNING'):
+            client.post(reverse('upload_file'), {'file': SimpleUploadedFile("new.csv", CSV_CONTENT)})
+
+        history = client.session['history']
+        self.assertEqual(history[-1]['name'], "new.csv")
+        self.assertLess(len(history), 41)
+        self.assertFalse(Upload.objects.filter(pk=self.uploads[0].pk).exists())
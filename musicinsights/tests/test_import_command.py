@@ -0,0 +1,67 @@
+import os
+import tempfile
+import zipfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from musicinsights.models import PlaylistEntry, Upload
+from musicinsights.services.playlist_store import load_aggregate
+
+HEADER = "Track URI,Track Name,Album Name,Artist Name(s),Added At,Energy\n"
+ROW = "spotify:track:{0},Song {0},Album,Artist {0},2023-01-01T08:00:00Z,0.5\n"
+
+
+def csv_bytes(*ids):
+    return (HEADER + "".join(ROW.format(i) for i in ids)).encode('utf-8')
+
+
+class ImportExportifyCommandTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        os.makedirs(os.path.join(self.tmp.name, '2023'))
+        self.write('a.csv', csv_bytes(1, 2))
+        self.write(os.path.join('2023', 'b.csv'), csv_bytes(3))
+        self.write('notes.txt', b"not a playlist")
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmp.name, name), 'wb') as f:
+            f.write(content)
+
+    def run_import(self, path, workers=1):
+        out = StringIO()
+        call_command('import_exportify', path, workers=workers, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_imports_directory_and_skips_on_rerun(self):
+        output = self.run_import(self.tmp.name)
+
+        self.assertIn("Imported 2 files (3 rows)", output)
+        self.assertIn("rows/sec", output)
+        self.assertEqual(sorted(Upload.objects.values_list('name', flat=True)), ['a.csv', 'b.csv'])
+        self.assertEqual(PlaylistEntry.objects.count(), 3)
+        self.assertEqual(load_aggregate(Upload.objects.get(name='a.csv')).total_tracks, 2)
+
+        # Same contents under another name are skipped too
+        self.write('copy.csv', csv_bytes(1, 2))
+        output = self.run_import(self.tmp.name)
+        self.assertIn("Imported 0 files", output)
+        self.assertIn("skipped 3", output)
+        self.assertEqual(Upload.objects.count(), 2)
+
+    def test_imports_zip_with_worker_processes(self):
+        path = os.path.join(self.tmp.name, 'archive.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('exports/x.csv', csv_bytes(1))
+            archive.writestr('exports/y.csv', csv_bytes(2, 3, 4))
+            archive.writestr('exports/duplicate.csv', csv_bytes(1))
+
+        output = self.run_import(path, workers=2)
+
+        self.assertIn("Imported 2 files (4 rows)", output)
+        self.assertIn("skipped 1", output)
+
+    def test_rejects_other_paths(self):
+        with self.assertRaises(CommandError):
+            self.run_import(os.path.join(self.tmp.name, 'notes.txt'))
@@ -0,0 +1,65 @@
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase, Client
+from django.urls import reverse
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.library import Library
+from musicinsights.services.playlist_store import save_playlist
+from musicinsights.services.snapshot_cache import SNAPSHOT_CACHE_ALIAS
+from musicinsights.services.stats_service import build_dashboard_context
+
+
+class LibraryTest(TestCase):
+    def setUp(self):
+        caches[SNAPSHOT_CACHE_ALIAS].clear()
+        # Halves of one playlist: separate generate_dummy_data() calls reuse
+        # track URIs with different artists, which the shared Track rows can't hold
+        entries = generate_dummy_data()
+        self.entries = [entries[:len(entries) // 2], entries[len(entries) // 2:]]
+        self.uploads = [save_playlist(entries, f"Mix {i}") for i, entries in enumerate(self.entries)]
+
+        self.client = Client()
+        session = self.client.session
+        session['history'] = [{'id': str(u.pk), 'name': u.name} for u in self.uploads]
+        session.save()
+
+    def test_merged_aggregate_matches_combined_entries(self):
+        combined = build_dashboard_context(self.entries[0] + self.entries[1])
+        library = build_dashboard_context(None, aggregate=Library(self.uploads).aggregate())
+
+        for key in ('total_tracks', 'total_listening_hours', 'top_artists', 'era_values', 'avg_features'):
+            self.assertEqual(library[key], combined[key], key)
+
+    def test_content_hash_depends_on_playlists(self):
+        self.assertEqual(Library(self.uploads).content_hash, Library(list(self.uploads)).content_hash)
+        self.assertNotEqual(Library(self.uploads).content_hash, Library(self.uploads[:1]).content_hash)
+
+    @mock.patch('musicinsights.views.get_spotify_service', return_value=None)
+    def test_view_merges_stored_aggregates(self, _):
+        with mock.patch('musicinsights.services.playlist_store.load_playlist') as load_playlist:
+            response = self.client.get(reverse('library'))
+
+        self.assertEqual(response.status_code, 200)
+        load_playlist.assert_not_called()
+        total = sum(len(entries) for entries in self.entries)
+        self.assertEqual(response.context['total_tracks'], total)
+        self.assertEqual(response.context['track_list_url'], reverse('library_track_list'))
+
+    def test_filter_endpoint_covers_every_playlist(self):
+        response = self.client.get(reverse('library_filter_tracks'))
+        self.assertEqual(response.json()['total'], sum(len(entries) for entries in self.entries))
+
+    def test_track_list_revalidates_after_history_changes(self):
+        first = self.client.get(reverse('library_track_list'))
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        session = self.client.session
+        session['history'] = session['history'][:1]
+        session.save()
+        second = self.client.get(reverse('library_track_list'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_requires_history(self):
+        self.assertEqual(Client().get(reverse('library_track_list')).status_code, 404)
@@ -0,0 +1,111 @@
+import io
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from musicinsights.services.exportify_parser import (
+    ExportifyStreamParser, compile_row_decoder, iter_exportify_entries, parse_added_at, parse_exportify_csv,
+    parse_release_year, resolve_columns,
+)
+
+CSV_CONTENT = (
+    "﻿Track URI,Track Name,Album Name,Artist Name(s),Added At,Duration (ms),Genres,Energy\n"
+    "spotify:track:1,\"Song, A\",Album A,Artist A;Artist B,2023-01-01T12:00:00Z,1000,\"pop,rock\",0.8\n"
+    "spotify:track:2,\"Multi\nLine \"\"B\"\"\",Album B,Artist B,2023-01-02T12:00:00Z,2000,Rock,0.7\n"
+    "spotify:track:3,Café,Album C,Artist C,,3000,,0.1"
+).encode('utf-8')
+
+
+class StreamingParserTest(TestCase):
+    def test_matches_whole_file_parse_for_any_chunk_size(self):
+        expected = parse_exportify_csv(CSV_CONTENT, "playlist.csv")
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(expected[0]['track']['name'], "Song, A")
+        self.assertEqual(expected[1]['track']['name'], 'Multi\nLine "B"')
+        self.assertEqual(expected[2]['track']['name'], "Café")
+
+        for chunk_size in (1, 2, 7, 64):
+            entries = list(iter_exportify_entries(io.BytesIO(CSV_CONTENT), "playlist.csv", chunk_size=chunk_size))
+            self.assertEqual(entries, expected)
+
+    def test_reads_uploaded_file_in_chunks(self):
+        file = SimpleUploadedFile("My Mix.csv", CSV_CONTENT, content_type="text/csv")
+        entries = list(iter_exportify_entries(file, file.name, chunk_size=16))
+
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[0]['playlist_name'], "My Mix")
+        self.assertEqual(entries[0]['track']['artists'], ["Artist A", "Artist B"])
+        self.assertEqual(entries[0]['track']['genres'], ["pop", "rock"])
+
+    def test_falls_back_to_latin1_mid_stream(self):
+        content = (
+            b"Track URI,Track Name,Album Name,Artist Name(s)\n"
+            b"spotify:track:1,Song A,Album A,Artist A\n"
+            b"spotify:track:2,Song \xe9,Album B,Artist B\n"
+        )
+        parser = ExportifyStreamParser("latin1.csv")
+        entries = parser.feed(content[:60]) + parser.feed(content[60:]) + parser.close()
+
+        self.assertEqual([e['track']['name'] for e in entries], ["Song A", "Song é"])
+
+    def test_rejects_non_csv_files(self):
+        with self.assertRaises(ValueError):
+            ExportifyStreamParser("notes.txt")
+
+
+class NumericFieldsTest(TestCase):
+    def test_added_at_precisions(self):
+        self.assertEqual(parse_added_at("2023-01-01T08:30:00Z"), (1672561800, 8))
+        self.assertEqual(parse_added_at("2023-01-01T08:30:00.123Z"), (1672561800, 8))
+        self.assertEqual(parse_added_at("2023-01-01T08:30:00+02:00"), (1672554600, 8))
+        self.assertEqual(parse_added_at("2023-01-01T08:30:00"), (1672561800, 8))
+        self.assertEqual(parse_added_at("2023-01-01"), (1672531200, None))
+        self.assertEqual(parse_added_at("yesterday"), (None, None))
+        self.assertEqual(parse_added_at(None), (None, None))
+
+    def test_release_date_precisions(self):
+        self.assertEqual(parse_release_year("1994-05-01"), 1994)
+        self.assertEqual(parse_release_year("1994-05"), 1994)
+        self.assertEqual(parse_release_year("1994"), 1994)
+        self.assertIsNone(parse_release_year("unknown"))
+        self.assertIsNone(parse_release_year(""))
+
+    def test_entries_carry_numeric_fields(self):
+        entries = parse_exportify_csv(CSV_CONTENT, "playlist.csv")
+
+        self.assertEqual(entries[0]['added_at_epoch'], 1672574400)
+        self.assertEqual(entries[0]['added_hour'], 12)
+        self.assertIsNone(entries[2]['added_hour'])
+        self.assertIsNone(entries[0]['track']['release_year'])
+
+
+class RowDecoderTest(TestCase):
+    def test_maps_older_exportify_headers(self):
+        current = parse_exportify_csv(
+            b"Track URI,Track Name,Artist Name(s),Album Name,Release Date,Duration (ms),Added At,Genres\n"
+            b"spotify:track:1,Song A,Artist A,Album A,1994-05-01,1000,2023-01-01T12:00:00Z,pop\n",
+            "mix.csv",
+        )
+        older = parse_exportify_csv(
+            b"Spotify URI,Track Name,Artist Name,Album Name,Album Release Date,Track Duration (ms),Added By,Added At,Artist Genres\n"
+            b"spotify:track:1,Song A,Artist A,Album A,1994-05-01,1000,spotify:user:me,2023-01-01T12:00:00Z,pop\n",
+            "mix.csv",
+        )
+        self.assertEqual(older, current)
+        self.assertEqual(older[0]['track']['release_year'], 1994)
+
+    def test_header_matching_ignores_case_and_spacing(self):
+        self.assertEqual(resolve_columns([" track uri ", "TRACK NAME"]), {'uri': 0, 'name': 1})
+
+    def test_missing_columns_and_short_rows_are_none(self):
+        decode = compile_row_decoder(("Track URI", "Track Name", "Energy", "Popularity"))
+
+        track = decode(["spotify:track:1", "Song A"], "mix")['track']
+        self.assertEqual(track['uri'], "spotify:track:1")
+        self.assertIsNone(track['energy'])
+        self.assertIsNone(track['popularity'])
+        self.assertIsNone(track['danceability'])
+        self.assertEqual(track['album'], "Unknown Album")
+
+    def test_malformed_numbers_are_none(self):
+        decode = compile_row_decoder(("Track URI", "Energy", "Popularity", "Duration (ms)"))
+        track = decode(["spotify:track:1", "loud", "", "1.5"], "mix")['track']
+        self.assertEqual((track['energy'], track['popularity'], track['duration_ms']), (None, None, None))
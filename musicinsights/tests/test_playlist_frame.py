@@ -0,0 +1,42 @@
+import json
+from django.test import TestCase
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.exportify_parser import parse_exportify_csv
+from musicinsights.services.playlist_frame import PlaylistFrame
+from musicinsights.services.recommendation_service import build_recommendations
+from musicinsights.services.stats_service import build_dashboard_context
+
+
+class PlaylistFrameTest(TestCase):
+    def setUp(self):
+        self.entries = generate_dummy_data()
+        self.frame = PlaylistFrame.from_entries(self.entries)
+
+    def test_row_access_matches_entries(self):
+        self.assertEqual(len(self.frame), len(self.entries))
+        self.assertEqual(list(self.frame), self.entries)
+        self.assertEqual(self.frame[0], self.entries[0])
+        self.assertEqual(self.frame[-1], self.entries[-1])
+
+    def test_strings_are_dictionary_encoded(self):
+        artists = {a for e in self.entries for a in e['track']['artists']}
+        self.assertEqual(sorted(self.frame.artists.values), sorted(artists))
+        self.assertLessEqual(len(self.frame.albums), 8)
+        self.assertEqual(self.frame.artist_counts().most_common(1)[0][1],
+                         max(sum(1 for e in self.entries if a in e['track']['artists']) for a in artists))
+
+    def test_missing_values_round_trip_as_none(self):
+        entries = parse_exportify_csv(b"Track URI,Track Name\nspotify:track:1,Song A", "x.csv")
+        entries[0]['track']['energy'] = None
+        frame = PlaylistFrame.from_entries(entries)
+        self.assertIsNone(frame[0]['track']['energy'])
+        self.assertEqual(frame[0], entries[0])
+
+    def test_dict_round_trip_through_json(self):
+        data = json.loads(json.dumps(self.frame.to_dict()))
+        restored = PlaylistFrame.coerce(data)
+        self.assertEqual(list(restored), self.entries)
+
+    def test_services_accept_frame_directly(self):
+        self.assertEqual(build_dashboard_context(self.frame), build_dashboard_context(self.entries))
+        self.assertEqual(build_recommendations(self.frame), build_recommendations(self.entries))
@@ -0,0 +1,156 @@
+from unittest import mock
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from musicinsights.models import Upload, Artist, Genre, Track, PlaylistEntry
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.exportify_parser import parse_exportify_csv
+from musicinsights.services.playlist_store import save_playlist, load_aggregate, load_playlist
+
+CSV_CONTENT = (
+    "Track URI,Track Name,Album Name,Artist Name(s),Added At,Duration (ms),Genres,Energy\n"
+    "spotify:track:1,Song A,Album A,Artist A;Artist B,2023-01-01T08:00:00Z,1000,\"pop,rock\",0.8\n"
+    "spotify:track:2,Song B,Album B,Artist B,2023-01-02T12:00:00Z,2000,Rock,0.7\n"
+    ",Local Song,Album B,Artist C,,3000,,0.1\n"
+    "spotify:track:1,Song A,Album A,Artist A;Artist B,2023-01-03T08:00:00Z,1000,\"pop,rock\",0.8"
+).encode('utf-8')
+
+
+class PlaylistStoreTest(TestCase):
+    def test_round_trip(self):
+        entries = parse_exportify_csv(CSV_CONTENT, "mix.csv")
+        upload = save_playlist(entries, "mix.csv")
+
+        self.assertEqual(upload.name, "mix.csv")
+        self.assertEqual(Track.objects.count(), 3)
+        self.assertEqual(Artist.objects.count(), 3)
+        self.assertEqual(PlaylistEntry.objects.filter(upload=upload).count(), 4)
+
+        frame = load_playlist(upload)
+        self.assertEqual(len(frame), 4)
+        self.assertEqual(frame[0]['track']['artists'], ["Artist A", "Artist B"])
+        self.assertEqual(frame[0]['track']['genres'], ["pop", "rock"])
+        self.assertEqual(frame[0]['added_at'], "2023-01-01T08:00:00+00:00")
+        self.assertEqual(frame[0]['added_hour'], 8)
+        self.assertIsNone(frame[2]['added_hour'])
+        self.assertEqual(frame[2]['track']['uri'], "")
+        self.assertEqual(frame[2]['track']['name'], "Local Song")
+
+    def test_genres_are_normalized(self):
+        upload = save_playlist(parse_exportify_csv(CSV_CONTENT, "mix.csv"), "mix.csv")
+
+        self.assertEqual(sorted(Genre.objects.values_list('name', flat=True)), ["Rock", "pop", "rock"])
+        self.assertEqual(PlaylistEntry.objects.filter(upload=upload, track__genres__name="rock").count(), 2)
+        self.assertEqual(load_playlist(upload)[0]['track']['genres'], ["pop", "rock"])
+
+    def test_tracks_are_shared_between_uploads(self):
+        entries = generate_dummy_data()
+        first = save_playlist(entries, "a")
+        second = save_playlist(entries, "b")
+
+        self.assertEqual(Track.objects.count(), len(entries))
+        self.assertEqual(list(load_playlist(first)), list(load_playlist(second)))
+
+    def test_tracks_are_upserted_by_uri(self):
+        save_playlist(parse_exportify_csv(CSV_CONTENT, "mix.csv"), "mix.csv")
+        updated = CSV_CONTENT.replace(b"2000,Rock,0.7", b"2000,Rock,0.2")
+        save_playlist(parse_exportify_csv(updated, "mix.csv"), "mix.csv")
+
+        self.assertEqual(Track.objects.count(), 3)
+        self.assertEqual(Track.objects.get(spotify_id="spotify:track:2").energy, 0.2)
+
+    def test_reexport_replaces_track_artists(self):
+        save_playlist(parse_exportify_csv(CSV_CONTENT, "mix.csv"), "mix.csv")
+        updated = CSV_CONTENT.replace(b",Artist B,2023-01-02", b",Artist D,2023-01-02")
+        upload = save_playlist(parse_exportify_csv(updated, "mix.csv"), "mix.csv")
+
+        self.assertEqual(load_playlist(upload)[1]['track']['artists'], ["Artist D"])
+        self.assertEqual(upload.aggregate['total_tracks'], 4)
+        self.assertEqual(load_aggregate(upload).artist_counter["Artist B"], 2)
+
+    def test_reexport_replaces_track_genres(self):
+        save_playlist(parse_exportify_csv(CSV_CONTENT, "mix.csv"), "mix.csv")
+        updated = CSV_CONTENT.replace(b"\"pop,rock\"", b"\"jazz,pop\"")
+        upload = save_playlist(parse_exportify_csv(updated, "mix.csv"), "mix.csv")
+
+        self.assertEqual(load_playlist(upload)[0]['track']['genres'], ["jazz", "pop"])
+        self.assertNotIn("rock", load_aggregate(upload).genre_counter)
+
+    def test_demos_do_not_share_tracks(self):
+        first = save_playlist(generate_dummy_data(), "Demo Playlist")
+        first_rows = list(load_playlist(first))
+        for _ in range(3):
+            latest = save_playlist(generate_dummy_data(), "Demo Playlist")
+
+        self.assertEqual(list(load_playlist(first)), first_rows)
+        self.assertEqual(sum(load_aggregate(latest).artist_counter.values()), 50)
+
+    def test_query_count_grows_with_batches_not_rows(self):
+        entries = generate_dummy_data()
+
+        # Fixed queries (savepoint, upload, artists, albums, genres, SQL aggregation) plus seven per batch
+        with mock.patch('musicinsights.services.playlist_store.BATCH_SIZE', len(entries)):
+            with self.assertNumQueries(26):
+                save_playlist(entries, "one batch")
+        with mock.patch('musicinsights.services.playlist_store.BATCH_SIZE', len(entries) // 2):
+            with self.assertNumQueries(33):
+                save_playlist(entries, "two batches")
+
+
+@mock.patch('musicinsights.views.get_spotify_service', return_value=None)
+class PlaylistHistoryViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_session_keeps_only_ids_and_names(self, _):
+        file = SimpleUploadedFile("mix.csv", CSV_CONTENT, content_type="text/csv")
+        response = self.client.post(reverse('upload_file'), {'file': file})
+
+        upload = Upload.objects.get()
+        self.assertRedirects(response, reverse('dashboard', args=[str(upload.pk)]))
+        history = self.client.session['history']
+        self.assertEqual(history[0]['id'], str(upload.pk))
+        self.assertNotIn('data', history[0])
+
+        response = self.client.get(reverse('dashboard', args=[str(upload.pk)]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_tracks'], 4)
+
+    def test_delete_removes_upload(self, _):
+        self.client.get(reverse('load_dummy_data'))
+        playlist_id = self.client.session['history'][0]['id']
+
+        self.client.get(reverse('delete_history', args=[playlist_id]))
+
+        self.assertEqual(self.client.session['history'], [])
+        self.assertFalse(Upload.objects.exists())
+
+    def test_identical_file_reuses_stored_upload(self, _):
+        other = Client()
+        self.client.post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", CSV_CONTENT)})
+
+        with mock.patch('musicinsights.views.save_playlist') as save:
+            response = other.post(reverse('upload_file'), {'file': SimpleUploadedFile("top songs.csv", CSV_CONTENT)})
+        save.assert_not_called()
+
+        upload = Upload.objects.get()
+        self.assertRedirects(response, reverse('dashboard', args=[str(upload.pk)]), fetch_redirect_response=False)
+        self.assertEqual(upload.ref_count, 2)
+        self.assertEqual(other.session['history'][0]['name'], "top songs.csv")
+        self.assertEqual(other.session['history'][0]['track_count'], 4)
+
+        # Uploading it again in the same session doesn't add a second entry
+        other.post(reverse('upload_file'), {'file': SimpleUploadedFile("top songs.csv", CSV_CONTENT)})
+        self.assertEqual(len(other.session['history']), 1)
+
+    def test_shared_upload_survives_until_last_delete(self, _):
+        other = Client()
+        for client in (self.client, other):
+            client.post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", CSV_CONTENT)})
+        playlist_id = self.client.session['history'][0]['id']
+
+        self.client.get(reverse('delete_history', args=[playlist_id]))
+        self.assertEqual(Upload.objects.get().ref_count, 1)
+
+        other.get(reverse('delete_history', args=[playlist_id]))
+        self.assertFalse(Upload.objects.exists())
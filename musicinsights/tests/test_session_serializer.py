@@ -0,0 +1,35 @@
+import json
+from django.contrib.sessions.serializers import JSONSerializer
+from django.test import TestCase, override_settings
+from musicinsights.services.history_index import HISTORY_INDEX_KEY
+from musicinsights.session_serializer import CompressedJSONSerializer
+
+
+def session_with(count):
+    history = [
+        {'id': str(i), 'name': f"Playlist {i}.csv", 'created_at': f"2026-10-{i % 28 + 1:02d}", 'track_count': i}
+        for i in range(count)
+    ]
+    return {'history': history, HISTORY_INDEX_KEY: history[::-1]}
+
+
+class CompressedJSONSerializerTest(TestCase):
+    def test_round_trips_with_each_codec(self):
+        session = session_with(20)
+        for codec in ('zlib', 'lzma'):
+            with self.subTest(codec), override_settings(SESSION_COMPRESSION=codec):
+                data = CompressedJSONSerializer().dumps(session)
+                self.assertEqual(CompressedJSONSerializer().loads(data), session)
+                self.assertLess(len(data), len(json.dumps(session)) / 4)
+
+    def test_reads_uncompressed_sessions(self):
+        session = session_with(2)
+        self.assertEqual(CompressedJSONSerializer().loads(JSONSerializer().dumps(session)), session)
+
+    @override_settings(SESSION_MAX_BYTES=300)
+    def test_never_drops_playlists(self):
+        # Eviction is set_history's job, where the evicted Uploads get released
+        session = session_with(40)
+        data = CompressedJSONSerializer().dumps(session)
+        self.assertGreater(len(data), 300)
+        self.assertEqual(CompressedJSONSerializer().loads(data), session)
@@ -0,0 +1,61 @@
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase, Client
+from django.urls import reverse
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.playlist_frame import PlaylistFrame
+from musicinsights.services.playlist_store import save_playlist
+from musicinsights.services.snapshot_cache import SNAPSHOT_CACHE_ALIAS, get_dashboard_snapshot
+from musicinsights.services import stats_service
+
+
+@mock.patch('musicinsights.views.get_spotify_service', return_value=None)
+class DashboardSnapshotTest(TestCase):
+    def setUp(self):
+        caches[SNAPSHOT_CACHE_ALIAS].clear()
+        self.client = Client()
+        self.entries = generate_dummy_data()
+
+    def _add_to_history(self, upload, name):
+        session = self.client.session
+        session['history'] = session.get('history', []) + [{'id': str(upload.pk), 'name': name}]
+        session.save()
+
+    def test_repeat_views_skip_analytics(self, _):
+        upload = save_playlist(self.entries, "Mix")
+        self._add_to_history(upload, "Mix")
+        url = reverse('dashboard', args=[str(upload.pk)])
+
+        with mock.patch('musicinsights.views.build_dashboard_context',
+                        wraps=stats_service.build_dashboard_context) as build:
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first.context['avg_features'], second.context['avg_features'])
+        self.assertEqual(second.context['playlist_name'], "Mix")
+        self.assertNotIn('top_tracks', first.context)
+        self.assertNotIn('mood_data', first.context)
+
+    def test_identical_content_shares_one_snapshot(self, _):
+        first = save_playlist(self.entries, "Mine")
+        second = save_playlist(self.entries, "Yours")
+        self.assertEqual(first.content_hash, second.content_hash)
+
+        self._add_to_history(first, "Mine")
+        self._add_to_history(second, "Yours")
+        with mock.patch('musicinsights.views.build_dashboard_context',
+                        wraps=stats_service.build_dashboard_context) as build:
+            self.client.get(reverse('dashboard', args=[str(first.pk)]))
+            response = self.client.get(reverse('dashboard', args=[str(second.pk)]))
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(response.context['playlist_name'], "Yours")
+
+    def test_snapshot_is_copied_per_request(self, _):
+        content_hash = PlaylistFrame.from_entries(self.entries).content_hash()
+        context = get_dashboard_snapshot(content_hash, lambda: {'total_tracks': 50})
+        context['playlist_name'] = "changed"
+
+        again = get_dashboard_snapshot(content_hash, lambda: {})
+        self.assertEqual(again, {'total_tracks': 50})
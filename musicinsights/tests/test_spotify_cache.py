@@ -0,0 +1,66 @@
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase
+from musicinsights.services.spotify_cache import SPOTIFY_CACHE_ALIAS, CACHE_STATS, cache_stats
+from musicinsights.services.spotify_service import SpotifyService
+
+
+def _entry(artist, uri):
+    return {'track': {'name': uri, 'artists': [artist], 'uri': uri}}
+
+
+def _spotify_track(track_id, artist):
+    return {
+        'id': track_id,
+        'uri': f'spotify:track:{track_id}',
+        'name': f'Hit {track_id}',
+        'artists': [{'name': artist}],
+        'album': {'images': []},
+        'preview_url': None,
+        'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'},
+    }
+
+
+class SpotifyLookupCacheTest(TestCase):
+    def setUp(self):
+        caches[SPOTIFY_CACHE_ALIAS].clear()
+        CACHE_STATS.clear()
+        self.service = SpotifyService('id', 'secret')
+        self.service.sp = mock.Mock()
+
+        def search(q, type, limit):
+            if 'Nobody' in q:
+                return {'artists': {'items': []}}
+            return {'artists': {'items': [{'id': 'artist-a'}]}}
+
+        self.service.sp.search.side_effect = search
+        self.service.sp.artist_top_tracks.return_value = {
+            'tracks': [_spotify_track('t1', 'Artist A'), _spotify_track('t2', 'Artist A')]
+        }
+        self.playlist = [_entry('Artist A', 'spotify:track:t1'), _entry('Nobody Known', 'local')]
+
+    def test_second_lookup_is_served_from_cache(self):
+        first = self.service.get_missing_top_tracks(self.playlist)
+        second = self.service.get_missing_top_tracks(self.playlist)
+
+        self.assertEqual([r['id'] for r in first], ['t2'])
+        self.assertEqual([r['id'] for r in second], ['t2'])
+        self.assertEqual(self.service.sp.search.call_count, 2)
+        self.assertEqual(self.service.sp.artist_top_tracks.call_count, 1)
+
+    def test_artists_without_match_are_negatively_cached(self):
+        self.service.get_missing_top_tracks(self.playlist)
+        self.service.get_missing_top_tracks(self.playlist)
+
+        searched = [c.kwargs['q'] for c in self.service.sp.search.call_args_list]
+        self.assertEqual(searched.count('artist:Nobody Known'), 1)
+
+    def test_hit_and_miss_counters(self):
+        self.service.get_missing_top_tracks(self.playlist)
+        self.service.get_missing_top_tracks(self.playlist)
+
+        stats = cache_stats()
+        self.assertEqual(stats['artist_misses'], 2)
+        self.assertEqual(stats['artist_hits'], 2)
+        # First view only fetched tracks for a freshly searched id, so no cache read
+        self.assertEqual(stats['tracks_hits'], 1)
@@ -0,0 +1,70 @@
+import time
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase
+from spotipy.exceptions import SpotifyException
+from musicinsights.services.spotify_cache import SPOTIFY_CACHE_ALIAS
+from musicinsights.services.spotify_service import SpotifyService
+
+
+class ConcurrentDeepCutsTest(TestCase):
+    def setUp(self):
+        caches[SPOTIFY_CACHE_ALIAS].clear()
+        self.service = SpotifyService('id', 'secret')
+        self.service.search_artist_id = lambda name: f'id-{name}'
+        self.service.deadline_seconds = 2
+
+    def test_lookups_run_in_parallel(self):
+        def slow_tracks(artist_id):
+            time.sleep(0.3)
+            return [{'id': artist_id}]
+        self.service.fetch_top_tracks = slow_tracks
+
+        started = time.monotonic()
+        results = self.service.fetch_artists_top_tracks(['A', 'B', 'C', 'D'])
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(sorted(results), ['A', 'B', 'C', 'D'])
+        self.assertLess(elapsed, 0.9)
+
+    def test_deadline_returns_partial_results(self):
+        def tracks(artist_id):
+            if artist_id == 'id-Slow':
+                time.sleep(1.5)
+            return [{'id': artist_id}]
+        self.service.fetch_top_tracks = tracks
+        self.service.deadline_seconds = 0.5
+
+        started = time.monotonic()
+        results = self.service.fetch_artists_top_tracks(['Fast', 'Slow'])
+
+        self.assertLess(time.monotonic() - started, 1.2)
+        self.assertEqual(list(results), ['Fast'])
+        # Nothing was cached for the artist that missed the deadline
+        self.assertIsNotNone(self.service.cache.artist_id('Fast'))
+
+    @mock.patch('musicinsights.services.spotify_service.time.sleep')
+    def test_rate_limit_honours_retry_after(self, sleep):
+        calls = []
+
+        def tracks(artist_id):
+            calls.append(artist_id)
+            if len(calls) == 1:
+                raise SpotifyException(429, -1, 'rate limited', headers={'Retry-After': '1'})
+            return [{'id': artist_id}]
+        self.service.fetch_top_tracks = tracks
+
+        results = self.service.fetch_artists_top_tracks(['A'])
+
+        self.assertEqual(results, {'A': [{'id': 'id-A'}]})
+        sleep.assert_called_once_with(1.0)
+
+    def test_rate_limit_past_deadline_gives_up(self):
+        def tracks(artist_id):
+            raise SpotifyException(429, -1, 'rate limited', headers={'Retry-After': '30'})
+        self.service.fetch_top_tracks = tracks
+
+        started = time.monotonic()
+        with self.assertLogs('musicinsights.services.spotify_service', 'ERROR'):
+            self.assertEqual(self.service.fetch_artists_top_tracks(['A']), {})
+        self.assertLess(time.monotonic() - started, 1)
@@ -0,0 +1,48 @@
+from unittest import mock
+from django.test import TestCase
+from musicinsights.services.aggregation import BUCKET_FIELDS, COUNTER_FIELDS, FEATURES, aggregate_playlist
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.exportify_parser import parse_exportify_csv
+from musicinsights.services.playlist_store import load_playlist, save_playlist
+from musicinsights.services.sql_aggregation import aggregate_upload
+from musicinsights.services.stats_service import build_dashboard_context
+
+CSV_CONTENT = (
+    "Track URI,Track Name,Album Name,Artist Name(s),Release Date,Added At,Duration (ms),Genres,Popularity,Tempo,Energy\n"
+    "spotify:track:1,Song A,Album A,Artist A;Artist B,1994-05-01,2023-01-01T08:00:00Z,1000,\"pop,rock\",15,0,0.8\n"
+    "spotify:track:2,Song B,,Artist B,2004,2023-01-02T22:00:00Z,2000,rock,,128.5,\n"
+    ",Local Song,Album B,Artist C,,2023-01-03,,,95,70,0.1\n"
+    "spotify:track:1,Song A,Album A,Artist A;Artist B,1994-05-01,2023-01-04T03:00:00Z,1000,\"pop,rock\",15,0,0.8\n"
+).encode('utf-8')
+
+
+class SqlAggregationTest(TestCase):
+    def assertMatchesRowPass(self, upload):
+        expected = aggregate_playlist(load_playlist(upload))
+        actual = aggregate_upload(upload)
+
+        for name in COUNTER_FIELDS + BUCKET_FIELDS + ['artist_duration', 'track_listening_time', 'track_entry_counts']:
+            # Same counts, inserted in the same (first appearance) order
+            self.assertEqual(list(getattr(actual, name).items()), list(getattr(expected, name).items()), name)
+        for name in ('total_tracks', 'total_duration_ms', 'high_energy_tracks', 'playlist_name', 'feature_counts'):
+            self.assertEqual(getattr(actual, name), getattr(expected, name), name)
+        for f in FEATURES:
+            self.assertAlmostEqual(actual.feature_totals[f], expected.feature_totals[f])
+        self.assertAlmostEqual(actual.tempo_total, expected.tempo_total)
+        self.assertEqual(list(actual.track_objects), list(expected.track_objects))
+
+    def test_matches_row_pass_with_missing_values(self):
+        self.assertMatchesRowPass(save_playlist(parse_exportify_csv(CSV_CONTENT, "mix.csv"), "mix.csv"))
+
+    def test_matches_row_pass_on_dummy_data(self):
+        self.assertMatchesRowPass(save_playlist(generate_dummy_data(), "Demo"))
+
+    def test_empty_upload(self):
+        self.assertEqual(aggregate_upload(save_playlist([], "empty")).total_tracks, 0)
+
+    def test_dashboard_reads_stored_aggregate(self):
+        upload = save_playlist(generate_dummy_data(), "Demo")
+        with mock.patch('musicinsights.services.playlist_store.load_playlist') as load:
+            context = build_dashboard_context(upload)
+        load.assert_not_called()
+        self.assertEqual(context['total_tracks'], upload.entries.count())
@@ -19,7 +19,7 @@ class StatsServiceTest(TestCase):
         )
 
     def test_build_dashboard_context(self):
-        context = build_dashboard_context(self.upload)
+        context = build_dashboard_context(self.upload, include_tracks=True)
         
         self.assertEqual(context['total_tracks'], 1)
         self.assertIn('total_listening_hours', context)
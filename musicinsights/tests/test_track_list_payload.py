@@ -0,0 +1,77 @@
+import gzip
+import json
+from django.core.cache import caches
+from django.test import TestCase, Client
+from django.urls import reverse
+from musicinsights.services.aggregation import aggregate_playlist
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.playlist_store import load_playlist, save_playlist
+from musicinsights.services.snapshot_cache import SNAPSHOT_CACHE_ALIAS
+from musicinsights.services.stats_service import build_dashboard_context
+from musicinsights.services.track_list_payload import encode_track_list
+
+
+def _decode(payload):
+    strings, columns = payload['strings'], payload['columns']
+    return [
+        {
+            'name': name,
+            'artist': ", ".join(strings['artists'][i] for i in columns['artists'][row]),
+            'album': strings['albums'][columns['album'][row]],
+            'listening_time_hours': columns['listening_time_hours'][row],
+        }
+        for row, name in enumerate(columns['name'])
+    ]
+
+
+class TrackListPayloadTest(TestCase):
+    def test_decodes_to_dashboard_top_tracks(self):
+        entries = generate_dummy_data() * 2
+        aggregate = aggregate_playlist(entries)
+        context = build_dashboard_context(entries, aggregate=aggregate, include_tracks=True)
+
+        payload = encode_track_list(aggregate)
+
+        self.assertEqual(_decode(payload), context['top_tracks'])
+        mood = json.loads(context['mood_data'])
+        self.assertEqual(
+            [v for v in payload['columns']['valence'] if v is not None],
+            [round(point['x'], 3) for point in mood],
+        )
+
+    def test_is_smaller_than_row_json(self):
+        entries = generate_dummy_data()
+        aggregate = aggregate_playlist(entries)
+        context = build_dashboard_context(entries, aggregate=aggregate, include_tracks=True)
+
+        payload = json.dumps(encode_track_list(aggregate), separators=(',', ':'))
+
+        self.assertLess(len(payload), len(json.dumps(context['top_tracks'])) + len(context['mood_data']))
+
+
+class TrackListEndpointTest(TestCase):
+    def setUp(self):
+        caches[SNAPSHOT_CACHE_ALIAS].clear()
+        self.client = Client()
+        self.upload = save_playlist(generate_dummy_data(), "Mix")
+        session = self.client.session
+        session['history'] = [{'id': str(self.upload.pk), 'name': "Mix"}]
+        session.save()
+        self.url = reverse('track_list', args=[str(self.upload.pk)])
+
+    def test_served_gzipped_with_etag(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        payload = json.loads(gzip.decompress(response.content))
+        expected = encode_track_list(aggregate_playlist(load_playlist(self.upload)))
+        self.assertEqual(payload['columns']['name'], expected['columns']['name'])
+
+        revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_other_sessions_cannot_read_playlist(self):
+        self.assertEqual(Client().get(self.url).status_code, 404)
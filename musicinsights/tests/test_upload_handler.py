@@ -0,0 +1,141 @@
+import contextlib
+import json
+from unittest import mock
+from django.core.files.uploadhandler import StopFutureHandlers, StopUpload
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from musicinsights.models import Upload
+from musicinsights.services.aggregation import aggregate_playlist
+from musicinsights.services.exportify_parser import parse_exportify_csv
+from musicinsights.upload_handlers import ExportifyUploadHandler
+
+CSV_CONTENT = (
+    "Track URI,Track Name,Album Name,Artist Name(s),Added At,Duration (ms),Genres,Energy\n"
+    + "".join(
+        f"spotify:track:{i},\"Song, {i}\",Album {i % 3},Artist {i % 4},2023-01-0{i % 9 + 1}T12:00:00Z,{1000 * i},pop,0.{i}\n"
+        for i in range(10)
+    )
+).encode('utf-8')
+
+
+def receive(handler, content, name="mix.csv", chunk_size=7):
+    with contextlib.suppress(StopFutureHandlers):
+        handler.new_file('file', name, 'text/csv', len(content))
+    for start in range(0, len(content), chunk_size):
+        handler.receive_data_chunk(content[start:start + chunk_size], start)
+    return handler.file_complete(len(content))
+
+
+class ExportifyUploadHandlerTest(TestCase):
+    def test_parses_and_aggregates_while_receiving(self):
+        parsed = receive(ExportifyUploadHandler(), CSV_CONTENT)
+
+        expected = parse_exportify_csv(CSV_CONTENT, "mix.csv")
+        self.assertIsNone(parsed.error)
+        self.assertEqual(list(parsed.frame), expected)
+        self.assertEqual(parsed.aggregate.to_dict(), aggregate_playlist(expected).to_dict())
+        self.assertEqual(parsed.aggregate.track_rows, [])
+        self.assertEqual(parsed.size, len(CSV_CONTENT))
+
+    def test_passes_other_fields_through(self):
+        handler = ExportifyUploadHandler()
+        handler.new_file('original_file', "mix.csv", 'text/csv', 3)
+        self.assertEqual(handler.receive_data_chunk(b"abc", 0), b"abc")
+        self.assertIsNone(handler.file_complete(3))
+
+    def test_later_handlers_only_see_zips(self):
+        handler = ExportifyUploadHandler()
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file('file', "mix.csv", 'text/csv', None)
+        # Falls through to TemporaryFileUploadHandler
+        handler.new_file('file', "library.zip", 'application/zip', None)
+
+    @override_settings(UPLOAD_MAX_ROWS=5)
+    def test_rejects_too_many_rows(self):
+        handler = ExportifyUploadHandler()
+        with mock.patch.object(handler, '_add', wraps=handler._add) as add:
+            with self.assertRaises(StopUpload) as stopped:
+                receive(handler, CSV_CONTENT)
+
+        self.assertTrue(stopped.exception.connection_reset)
+        self.assertIn("more than 5 tracks", handler.rejection)
+        self.assertEqual(len(handler.frame), 0)
+        # Rows after the limit are never parsed
+        self.assertLess(add.call_count, len(CSV_CONTENT) // 7)
+
+    @override_settings(UPLOAD_MAX_BYTES=100)
+    def test_rejects_too_many_bytes(self):
+        handler = ExportifyUploadHandler()
+        with mock.patch('musicinsights.upload_handlers.ExportifyStreamParser.feed', return_value=[]) as feed:
+            with self.assertRaises(StopUpload):
+                receive(handler, CSV_CONTENT)
+
+        self.assertIn("larger than", handler.rejection)
+        self.assertEqual(feed.call_count, 100 // 7)
+
+    @override_settings(UPLOAD_MAX_BYTES=100)
+    def test_limits_zips_passed_to_the_next_handler(self):
+        handler = ExportifyUploadHandler()
+        handler.new_file('file', "library.zip", 'application/zip', None)
+        self.assertEqual(handler.receive_data_chunk(b"x" * 60, 0), b"x" * 60)
+
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(b"x" * 60, 60)
+        self.assertIn("larger than", handler.rejection)
+
+
+@mock.patch('musicinsights.views.get_spotify_service', return_value=None)
+class UploadViewStreamingTest(TestCase):
+    def test_stores_parsed_playlist(self, _):
+        with mock.patch('django.core.files.uploadhandler.TemporaryFileUploadHandler.new_file') as temp_file:
+            response = Client().post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", CSV_CONTENT)})
+
+        temp_file.assert_not_called()
+
+        upload = Upload.objects.get()
+        self.assertRedirects(response, reverse('dashboard', args=[str(upload.pk)]))
+        self.assertEqual(upload.entries.count(), 10)
+        self.assertEqual(upload.aggregate['total_tracks'], 10)
+
+    def test_new_version_gets_the_stats_of_its_own_file(self, _):
+        client = Client()
+        client.post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", CSV_CONTENT)})
+        changed = CSV_CONTENT.replace(b",pop,0.", b",pop,0.9") + b"spotify:track:new,New,Album,Artist,,1000,rock,0.5\n"
+
+        client.post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", changed)})
+
+        upload = Upload.objects.latest('pk')
+        self.assertEqual(upload.name, "mix (1).csv")
+        expected = aggregate_playlist(parse_exportify_csv(changed, "mix.csv")).to_dict()
+        self.assertEqual(upload.aggregate, json.loads(json.dumps(expected)))
+
+    def test_malformed_csv_shows_error(self, _):
+        # Over csv's default 128 KB field limit
+        content = CSV_CONTENT + b"spotify:track:x," + b"y" * 200_000 + b"\n"
+        response = Client().post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", content)})
+
+        self.assertContains(response, "Could not read the CSV file")
+        self.assertFalse(Upload.objects.exists())
+
+    @override_settings(UPLOAD_MAX_ROWS=5)
+    def test_oversized_upload_shows_error(self, _):
+        response = Client().post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", CSV_CONTENT)})
+
+        self.assertContains(response, "more than 5 tracks")
+        self.assertFalse(Upload.objects.exists())
+
+    @override_settings(UPLOAD_MAX_BYTES=len(CSV_CONTENT))
+    def test_keeps_files_before_an_oversized_one(self, _):
+        response = Client().post(reverse('upload_file'), {'file': [
+            SimpleUploadedFile("mix.csv", CSV_CONTENT),
+            SimpleUploadedFile("big.zip", b"x" * (len(CSV_CONTENT) + 1)),
+        ]})
+
+        self.assertContains(response, "larger than")
+        self.assertEqual(list(Upload.objects.values_list('name', flat=True)), ["mix.csv"])
+
+    def test_still_checks_csrf(self, _):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('upload_file'), {'file': SimpleUploadedFile("mix.csv", CSV_CONTENT)})
+        self.assertEqual(response.status_code, 403)
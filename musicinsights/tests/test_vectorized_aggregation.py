@@ -0,0 +1,47 @@
+import unittest
+from django.test import TestCase
+from musicinsights.services import vectorized_aggregation
+from musicinsights.services.aggregation import aggregate_playlist
+from musicinsights.services.dummy_data_service import generate_dummy_data
+from musicinsights.services.playlist_frame import PlaylistFrame
+from musicinsights.services.stats_service import build_dashboard_context
+
+
+def _entry(name, artists, added_at, **track):
+    return {
+        'track': {'name': name, 'artists': artists, 'album': 'Album', 'genres': ['pop'],
+                  'uri': '', **track},
+        'added_at': added_at,
+        'playlist_name': 'Mix',
+    }
+
+
+@unittest.skipUnless(vectorized_aggregation.available(), 'numpy is not installed')
+class VectorizedAggregationTest(TestCase):
+    def assertSameDashboard(self, entries):
+        frame = PlaylistFrame.from_entries(entries)
+        scalar = aggregate_playlist(frame, vectorize=False)
+        vectorized = aggregate_playlist(frame, vectorize=True)
+
+        self.assertEqual(vars(vectorized), vars(scalar))
+        self.assertEqual(
+            build_dashboard_context(frame, aggregate=vectorized),
+            build_dashboard_context(frame, aggregate=scalar),
+        )
+
+    def test_matches_scalar_pass_on_dummy_data(self):
+        self.assertSameDashboard(generate_dummy_data() * 3)
+
+    def test_matches_scalar_pass_on_edge_values(self):
+        self.assertSameDashboard([
+            _entry('A', ['X', 'X'], '2023-01-01T05:00:00Z', duration_ms=1000, popularity=20, tempo=80,
+                   energy=0.7, release_date='1999-12-31'),
+            _entry('B', [], '2023-01-01', duration_ms=None, popularity=None, tempo=0, energy=None,
+                   release_date='unknown'),
+            _entry('C', ['Y'], '2023-01-01T23:59:00', popularity=81, tempo=139.9, valence=0.1,
+                   energy=0.71, release_date=None),
+            _entry('A', ['X', 'X'], None, duration_ms=500, popularity=0, tempo=140, release_date='2001'),
+        ])
+
+    def test_empty_frame(self):
+        self.assertEqual(vars(aggregate_playlist(PlaylistFrame(), vectorize=True)), vars(aggregate_playlist([])))
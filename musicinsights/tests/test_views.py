@@ -24,3 +24,31 @@ class UploadViewTest(TestCase):
         
         self.assertEqual(response.status_code, 200) # Renders upload page with error
         self.assertContains(response, "Unsupported file type")
+
+    def test_history_index_lists_newest_first_with_track_counts(self):
+        for name, rows in (("a.csv", 1), ("b.csv", 2)):
+            body = b"Track URI,Track Name,Album Name,Artist Name(s)\n" + b"".join(
+                f"spotify:track:{name}{i},Song {i},Album,Artist\n".encode() for i in range(rows)
+            )
+            self.client.post(self.upload_url, {'file': SimpleUploadedFile(name, body, content_type="text/csv")})
+
+        response = self.client.get(self.upload_url)
+
+        index = response.context['recent_uploads']
+        self.assertEqual([(p['name'], p['track_count']) for p in index], [("b.csv", 2), ("a.csv", 1)])
+        self.assertEqual(set(index[0]), {'id', 'name', 'created_at', 'track_count'})
+
+    def test_history_index_is_built_for_older_sessions(self):
+        self.client.post(self.upload_url, {'file': SimpleUploadedFile(
+            "test.csv", b"Track URI,Track Name,Album Name,Artist Name(s)\nspotify:track:1,Song A,Album A,Artist A",
+            content_type="text/csv",
+        )})
+        session = self.client.session
+        del session['history_index']
+        session['history'] = [{k: v for k, v in p.items() if k != 'track_count'} for p in session['history']]
+        session.save()
+
+        response = self.client.get(self.upload_url)
+
+        self.assertEqual(response.context['recent_uploads'][0]['track_count'], 1)
+        self.assertIn('history_index', self.client.session)
@@ -0,0 +1,123 @@
+import hashlib
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from .services.aggregation import PlaylistAggregate
+from .services.exportify_parser import ExportifyStreamParser
+from .services.filter_index import FilterIndex
+from .services.playlist_frame import PlaylistFrame
+
+
+class ParsedUpload(UploadedFile):
+    """
+    What ExportifyUploadHandler leaves in request.FILES: the playlist parsed,
+    aggregated and indexed while it was received, instead of the file's
+    bytes. error is set (and frame is empty) if it isn't a readable Exportify CSV.
+    """
+
+    def __init__(self, name, size, source_hash, frame, aggregate, filter_index, error=None):
+        super().__init__(file=None, name=name, size=size)
+        self.source_hash = source_hash
+        self.frame = frame
+        self.aggregate = aggregate
+        self.filter_index = filter_index
+        self.error = error
+
+
+class ExportifyUploadHandler(FileUploadHandler):
+    """
+    Parses an Exportify CSV upload as it streams in.
+
+    Each chunk from the request body is hashed and fed straight to an
+    ExportifyStreamParser, and every completed row is added to the frame
+    and the PlaylistAggregate, so both are done when the body is. Nothing
+    is buffered to memory or a temp file.
+
+    Only claims files in `field_name`, and not .zip archives, which go on
+    to the next handler; anything else passes straight through. Files in
+    `field_name`, zips included, are held to settings.UPLOAD_MAX_BYTES (and
+    CSVs to UPLOAD_MAX_ROWS) as they arrive: past either, the rest of the
+    request isn't read at all and rejection says why.
+    """
+
+    def __init__(self, request=None, field_name='file'):
+        super().__init__(request)
+        self.target_field = field_name
+        self.limited = False
+        self.active = False
+        self.rejection = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.limited = field_name == self.target_field
+        self.active = self.limited and not file_name.lower().endswith('.zip')
+        self.size = 0
+        if not self.active:
+            return
+        self.digest = hashlib.sha256()
+        self.frame = PlaylistFrame()
+        self.aggregate = PlaylistAggregate()
+        self.error = None
+        try:
+            self.parser = ExportifyStreamParser(file_name)
+        except ValueError as e:
+            self.error = str(e)
+        # The file is ours alone: later handlers don't set up a temp file for it
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.limited:
+            return raw_data
+        self.size += len(raw_data)
+        if self.size > settings.UPLOAD_MAX_BYTES:
+            self._reject(f"File is larger than the {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit.")
+        if not self.active:
+            return raw_data
+        if self.error:
+            return None
+
+        self.digest.update(raw_data)
+        self._parse(self.parser.feed, raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        if not self.error:
+            self._parse(self.parser.close)
+        filter_index = FilterIndex.from_aggregate(self.aggregate)
+        # Per-entry display rows aren't stored with the aggregate
+        self.aggregate.track_rows = []
+        return ParsedUpload(
+            self.file_name, self.size, self.digest.hexdigest(), self.frame, self.aggregate, filter_index, self.error,
+        )
+
+    def _parse(self, step, *args):
+        try:
+            entries = step(*args)
+        except ValueError as e:
+            # Malformed CSV: the rest is discarded unparsed and the ParsedUpload carries the error
+            self.error = str(e)
+            self.frame = PlaylistFrame()
+            self.aggregate = PlaylistAggregate()
+            return
+        self._add(entries)
+
+    def _add(self, entries):
+        if self.error:
+            return
+        if len(self.frame) + len(entries) > settings.UPLOAD_MAX_ROWS:
+            self._reject(f"Playlist has more than {settings.UPLOAD_MAX_ROWS} tracks.")
+        for entry in entries:
+            self.frame.append(entry)
+            self.aggregate.add(entry)
+
+    def _reject(self, error):
+        self.rejection = error
+        # Drop what was parsed so far; nothing of a rejected file is kept
+        self.active = False
+        self.frame = PlaylistFrame()
+        self.aggregate = PlaylistAggregate()
+        # Stop reading the request body instead of receiving the rest of it
+        raise StopUpload(connection_reset=True)
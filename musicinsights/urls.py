@@ -6,6 +6,13 @@ urlpatterns = [
     path('', views.upload_file, name='upload_file'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('dashboard/<str:playlist_id>/', views.dashboard, name='dashboard'),
+    path('dashboard/<str:playlist_id>/deep-cuts/', views.deep_cuts, name='deep_cuts'),
+    path('dashboard/<str:playlist_id>/tracks/', views.filter_tracks, name='filter_tracks'),
+    path('dashboard/<str:playlist_id>/track-list/', views.track_list, name='track_list'),
+    path('library/', views.library, name='library'),
+    path('library/deep-cuts/', views.library_deep_cuts, name='library_deep_cuts'),
+    path('library/tracks/', views.library_filter_tracks, name='library_filter_tracks'),
+    path('library/track-list/', views.library_track_list, name='library_track_list'),
     path('demo/', views.load_dummy_data, name='load_dummy_data'),
     path('delete/<str:playlist_id>/', views.delete_history, name='delete_history'),
 ]
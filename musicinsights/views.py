@@ -1,13 +1,34 @@
 from django.shortcuts import render, redirect
-import uuid
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse, Http404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
 from datetime import datetime
-from .services.exportify_parser import parse_exportify_csv
+from .models import Upload
+from .services.playlist_frame import PlaylistFrame
+from .services.playlist_store import (
+    find_upload, load_aggregate, load_filter_index, load_playlist, prune_tracks, release_upload, retain_upload, save_playlist,
+    save_playlist_version,
+)
+from .upload_handlers import ExportifyUploadHandler
+from .services.bulk_import import prepare_sources
+from .services.snapshot_cache import get_dashboard_snapshot
+from .services.deep_cuts_jobs import get_deep_cuts
+from .services.library import Library
+from .services.history_index import set_history, touch_history
+from .services.filter_index import FILTER_DIMENSIONS, DEFAULT_TRACK_LIMIT, get_filter_index
+from .services.track_list_payload import TRACK_LIST_VERSION, encode_track_list, get_track_list_json
 from .services.stats_service import build_dashboard_context
 from django.conf import settings
 from .services.recommendation_service import build_recommendations
 from .services.spotify_service import SpotifyService
-from .services.dummy_data_service import generate_dummy_data
+from .services.dummy_data_service import DEMO_URI_PREFIX, generate_dummy_data
+import multiprocessing
 import os
+import zipfile
 
 def get_spotify_service(request):
     # Use server-side credentials
@@ -18,75 +39,225 @@ def get_spotify_service(request):
         return SpotifyService(client_id, client_secret)
     return None
 
+def get_history(request):
+    """
+    The session only keeps [{'id', 'name', 'file_name', 'created_at', 'track_count'}] per playlist; the
+    tracks live in the database. Entries from older sessions that still carry
+    their track data inline are dropped.
+    """
+    history = request.session.get('history', [])
+    current = [p for p in history if 'data' not in p]
+    if len(current) != len(history):
+        set_history(request, current)
+    return current
+
+@csrf_exempt
 def upload_file(request):
-    if request.method == 'POST' and request.FILES.get('file'):
+    # Parse CSVs while the request body is still arriving. The handlers have
+    # to be in place before anything reads request.POST, CSRF checking included.
+    # Zips go to a temporary file for the worker processes to read.
+    upload_handler = ExportifyUploadHandler(request)
+    request.upload_handlers = [upload_handler, TemporaryFileUploadHandler(request)]
+    return _upload_file(request, upload_handler)
+
+@csrf_protect
+def _upload_file(request, upload_handler):
+    files = request.FILES.getlist('file')
+    # A file over the size or row limit stops the upload; only the files
+    # before it are in request.FILES
+    rejection = upload_handler.rejection
+    if request.method == 'POST' and (files or rejection):
+        history = get_history(request)
+        playlist_ids = []
+        error = None
         try:
-            file = request.FILES['file']
-            # Read file content into memory
-            content = file.read()
-            # Parse CSV
-            playlist_data = parse_exportify_csv(content, file.name)
-            
-            # Generate ID
-            playlist_id = str(uuid.uuid4())
-            
-            # Handle duplicate names
-            history = request.session.get('history', [])
-            base_name = file.name
-            display_name = base_name
-            counter = 1
-            
-            existing_names = [p['name'] for p in history]
-            while display_name in existing_names:
-                name_parts = base_name.rsplit('.', 1)
-                if len(name_parts) == 2:
-                    display_name = f"{name_parts[0]} ({counter}).{name_parts[1]}"
-                else:
-                    display_name = f"{base_name} ({counter})"
-                counter += 1
-            
-            playlist_obj = {
-                'id': playlist_id,
-                'name': display_name,
-                'data': playlist_data,
-                'created_at': datetime.now().isoformat()
-            }
-            
-            # Store in session history
-            history.append(playlist_obj)
-            request.session['history'] = history
-            
-            return redirect('dashboard', playlist_id=playlist_id)
+            for file in files:
+                if file.name.lower().endswith('.zip'):
+                    playlist_ids += upload_archive(file, history)
+                    continue
+                # Already parsed, aggregated and hashed by ExportifyUploadHandler
+                if file.error:
+                    raise ValueError(file.error)
+                playlist_ids.append(store_playlist(
+                    history, file.name, file.source_hash, file.frame, file.aggregate, file.filter_index,
+                ))
+            if rejection:
+                raise ValueError(rejection)
         except ValueError as e:
-            return render(request, 'musicinsights/upload.html', {'error': str(e)})
+            error = str(e)
+
+        # Keep whatever was stored before an error, as the most recently
+        # used, so they aren't what gets evicted to make room
+        if playlist_ids:
+            for playlist_id in playlist_ids:
+                touch_history(request, playlist_id)
+            set_history(request, history)
+        if error:
+            return render(request, 'musicinsights/upload.html', {'error': error})
+        if len(set(playlist_ids)) > 1:
+            return redirect('library')
+        return redirect('dashboard', playlist_id=playlist_ids[0])
     return render(request, 'musicinsights/upload.html')
 
+def upload_archive(file, history):
+    """
+    Store every CSV in an uploaded zip (e.g. an Exportify library export).
+    Members are parsed one at a time (or in a pool of
+    settings.UPLOAD_WORKERS processes), each streamed out of the zip
+    without extracting it; returns their playlist ids. The zip itself was
+    held to UPLOAD_MAX_BYTES by ExportifyUploadHandler as it arrived.
+    """
+    # Members are opened by path, so the zip has to be on disk
+    # (TemporaryFileUploadHandler is next after ExportifyUploadHandler)
+    try:
+        path = file.temporary_file_path()
+    except AttributeError:
+        raise ValueError("Zip uploads must be written to a temporary file.")
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith('.csv')]
+    except zipfile.BadZipFile:
+        raise ValueError(f"{file.name} is not a valid zip archive.")
+    if not members:
+        raise ValueError(f"{file.name} has no CSV files in it.")
+    # Checked against the declared sizes, before anything is decompressed
+    if sum(info.file_size for info in members) > settings.UPLOAD_MAX_ARCHIVE_BYTES:
+        raise ValueError(f"{file.name} is larger than the {settings.UPLOAD_MAX_ARCHIVE_BYTES // (1024 * 1024)} MB limit once unzipped.")
+
+    playlist_ids = []
+    failed = []
+    first_new = len(history)
+    sources = [(path, info.filename) for info in sorted(members, key=lambda info: info.filename)]
+    # Each member is stored as soon as it's parsed. Pool workers are spawned:
+    # forking this process would copy whatever locks its other threads hold
+    spawn = multiprocessing.get_context('spawn')
+    for name, prepare in prepare_sources(sources, settings.UPLOAD_WORKERS, mp_context=spawn):
+        try:
+            source_hash, frame, aggregate, filter_index = prepare()
+        except (ValueError, OSError, UnicodeError):
+            failed.append(name)
+            continue
+        if len(frame) > settings.UPLOAD_MAX_ROWS:
+            failed.append(name)
+            continue
+        playlist_ids.append(store_playlist(
+            history, os.path.basename(name), source_hash, frame, aggregate, filter_index, source_path=name,
+        ))
+
+    if not playlist_ids:
+        raise ValueError(f"None of the CSV files in {file.name} could be read: {', '.join(failed)}")
+    # ...but listed in the archive's order
+    order = {name: i for i, (_, name) in enumerate(sources)}
+    history[first_new:] = sorted(history[first_new:], key=lambda p: order[playlist_source(p)])
+    return playlist_ids
+
+def playlist_source(playlist):
+    """Where a history entry's file came from: its path within a zip, or just its file name."""
+    return playlist.get('source_path') or playlist.get('file_name', playlist['name'])
+
+def store_playlist(history, file_name, source_hash, frame, aggregate, filter_index, source_path=None):
+    """
+    Store a parsed playlist and add it to a session's history (in place),
+    returning its playlist id. source_path is where the file came from if
+    that's more than file_name (a zip member's path); only an earlier file
+    from the same source_path counts as an older version of it.
+    """
+    entry = {'file_name': file_name}
+    # Only kept when it differs, to keep the session small
+    if source_path and source_path != file_name:
+        entry['source_path'] = source_path
+    path = source_path or file_name
+
+    # A byte-identical file was stored before (by anyone): reference
+    # that Upload instead of ingesting and analyzing it again
+    upload = find_upload(source_hash)
+    if upload is not None:
+        if not any(p['id'] == str(upload.pk) for p in history):
+            retain_upload(upload)
+            history.append({
+                'id': str(upload.pk),
+                'name': unique_name(file_name, history),
+                **entry,
+                'created_at': datetime.now().isoformat(),
+                'track_count': upload.entries.count(),
+            })
+        return str(upload.pk)
+
+    # A newer export of a playlist already in this session is stored as its
+    # next version, with the aggregate computed while it was parsed
+    previous = None
+    versions = [p for p in history if playlist_source(p) == path]
+    if versions:
+        previous = Upload.objects.filter(pk=versions[-1]['id']).first()
+
+    # Handle duplicate names
+    display_name = unique_name(file_name, history)
+
+    if previous is not None:
+        upload = save_playlist_version(
+            frame, display_name, previous, aggregate=aggregate, source_hash=source_hash, filter_index=filter_index,
+        )
+    else:
+        upload = save_playlist(
+            frame, display_name, aggregate=aggregate, source_hash=source_hash, filter_index=filter_index,
+        )
+
+    # Store in session history
+    history.append({
+        'id': str(upload.pk),
+        'name': display_name,
+        **entry,
+        'created_at': datetime.now().isoformat(),
+        'track_count': len(frame),
+    })
+    return str(upload.pk)
+
+def unique_name(base_name, history):
+    """base_name, or base_name with a (1), (2)... suffix if the history already has it."""
+    display_name = base_name
+    counter = 1
+    existing_names = [p['name'] for p in history]
+    while display_name in existing_names:
+        name_parts = base_name.rsplit('.', 1)
+        if len(name_parts) == 2:
+            display_name = f"{name_parts[0]} ({counter}).{name_parts[1]}"
+        else:
+            display_name = f"{base_name} ({counter})"
+        counter += 1
+    return display_name
+
 def load_dummy_data(request):
     """Generates dummy data and redirects to dashboard."""
-    playlist_data = generate_dummy_data()
-    playlist_id = 'demo-data'
+    playlist_data = PlaylistFrame.from_entries(generate_dummy_data())
     
     # Check if demo already exists in history to avoid duplicates or update it
-    history = request.session.get('history', [])
+    history = get_history(request)
     
     # Remove existing demo if present so we can add a fresh one at the end
-    history = [p for p in history if p['id'] != playlist_id]
+    for old_demo_id in [p['id'] for p in history if p.get('is_demo')]:
+        release_upload(old_demo_id)
+    history = [p for p in history if not p.get('is_demo')]
+    # Every demo gets its own tracks; drop those no demo uses any more
+    prune_tracks(DEMO_URI_PREFIX)
     
+    upload = save_playlist(playlist_data, 'Demo Playlist')
     playlist_obj = {
-        'id': playlist_id,
+        'id': str(upload.pk),
         'name': 'Demo Playlist',
-        'data': playlist_data,
-        'created_at': datetime.now().isoformat()
+        'created_at': datetime.now().isoformat(),
+        'track_count': len(playlist_data),
+        'is_demo': True
     }
     
     history.append(playlist_obj)
-    request.session['history'] = history
+    touch_history(request, playlist_obj['id'])
+    set_history(request, history)
     request.session.modified = True # Ensure session is saved
     
-    return redirect('dashboard', playlist_id=playlist_id)
+    return redirect('dashboard', playlist_id=playlist_obj['id'])
 
 def dashboard(request, playlist_id=None):
-    history = request.session.get('history', [])
+    history = get_history(request)
     
     if not history:
         return redirect('upload_file')
@@ -106,25 +277,173 @@ def dashboard(request, playlist_id=None):
         if playlist_id: 
              return redirect('dashboard', playlist_id=selected_playlist['id'])
 
-    context = build_dashboard_context(selected_playlist['data'], playlist_name_override=selected_playlist['name'])
-    context['recommendations'] = build_recommendations(selected_playlist['data'])
+    upload = Upload.objects.filter(pk=selected_playlist['id']).first()
+    if upload is None:
+        # Stored playlist is gone; forget it and fall back to another one
+        set_history(request, [p for p in history if p['id'] != selected_playlist['id']])
+        return redirect('dashboard')
+
+    touch_history(request, selected_playlist['id'])
+    ensure_content_hash(upload)
+
+    def build_snapshot():
+        # Stored at ingest, so the playlist's rows aren't read at all here
+        aggregate = load_aggregate(upload)
+        snapshot = build_dashboard_context(upload, aggregate=aggregate)
+        snapshot['recommendations'] = build_recommendations(upload, aggregate=aggregate)
+        # Warm the track list the page fetches next
+        get_track_list_json(upload.content_hash, lambda: encode_track_list(aggregate))
+        return snapshot
+
+    # Analytics only run the first time a given playlist content is viewed
+    context = get_dashboard_snapshot(upload.content_hash, build_snapshot)
+    context['playlist_name'] = selected_playlist['name']
     
-    # Spotify Recommendations ("Deep Cuts")
-    spotify = get_spotify_service(request)
-    if spotify:
-        context['spotify_recommendations'] = spotify.get_missing_top_tracks(selected_playlist['data'])
-        context['spotify_connected'] = True
-    else:
-        context['spotify_recommendations'] = []
-        context['spotify_connected'] = False
+    # Spotify Recommendations ("Deep Cuts") are fetched by the page from deep_cuts()
+    context['spotify_connected'] = get_spotify_service(request) is not None
             
     context['current_playlist_id'] = selected_playlist['id']
+    context['deep_cuts_url'] = reverse('deep_cuts', args=[selected_playlist['id']])
+    context['filter_tracks_url'] = reverse('filter_tracks', args=[selected_playlist['id']])
+    context['track_list_url'] = reverse('track_list', args=[selected_playlist['id']])
     
     return render(request, 'musicinsights/dashboard.html', context)
 
+def library(request):
+    """Every playlist in the session's history combined into one dashboard."""
+    history = get_history(request)
+    if not history:
+        return redirect('upload_file')
+
+    library = get_session_library(request)
+
+    def build_snapshot():
+        # One merge per playlist; no playlist's rows are read
+        aggregate = library.aggregate()
+        snapshot = build_dashboard_context(None, aggregate=aggregate)
+        snapshot['recommendations'] = build_recommendations(None, aggregate=aggregate)
+        get_track_list_json(library.content_hash, lambda: encode_track_list(aggregate))
+        return snapshot
+
+    context = get_dashboard_snapshot(library.content_hash, build_snapshot)
+    context['playlist_name'] = f"Library ({len(library.uploads)} playlists)"
+    context['spotify_connected'] = get_spotify_service(request) is not None
+    context['current_playlist_id'] = None
+    context['deep_cuts_url'] = reverse('library_deep_cuts')
+    context['filter_tracks_url'] = reverse('library_filter_tracks')
+    context['track_list_url'] = reverse('library_track_list')
+
+    return render(request, 'musicinsights/dashboard.html', context)
+
+def ensure_content_hash(upload):
+    if not upload.content_hash:
+        # Uploads stored before content hashing was added
+        upload.content_hash = load_playlist(upload).content_hash()
+        upload.save(update_fields=['content_hash'])
+
+def get_session_upload(request, playlist_id):
+    """The Upload for a playlist in this session's history, or 404."""
+    if not any(p['id'] == playlist_id for p in get_history(request)):
+        raise Http404("Playlist not found")
+    upload = Upload.objects.filter(pk=playlist_id).first()
+    if upload is None:
+        raise Http404("Playlist not found")
+    return upload
+
+def get_session_library(request):
+    """A Library of the stored playlists in this session's history, or 404 if there are none."""
+    history = get_history(request)
+    uploads = {str(u.pk): u for u in Upload.objects.filter(pk__in=[p['id'] for p in history])}
+    # Keep the history's order
+    library = Library(uploads[p['id']] for p in history if p['id'] in uploads)
+    if not library.uploads:
+        raise Http404("No playlists found")
+    for upload in library.uploads:
+        ensure_content_hash(upload)
+    return library
+
+def deep_cuts(request, playlist_id):
+    """JSON for the dashboard's Deep Cuts card; computed in the background and polled."""
+    upload = get_session_upload(request, playlist_id)
+    return deep_cuts_response(request, upload.content_hash, lambda: load_aggregate(upload))
+
+def library_deep_cuts(request):
+    library = get_session_library(request)
+    return deep_cuts_response(request, library.content_hash, library.aggregate)
+
+def deep_cuts_response(request, content_hash, build_aggregate):
+    spotify = get_spotify_service(request)
+    if not spotify:
+        return JsonResponse({'status': 'unavailable', 'tracks': []})
+
+    status, tracks = get_deep_cuts(content_hash, build_aggregate, spotify)
+    return JsonResponse({'status': status, 'tracks': tracks}, status=202 if status == 'pending' else 200)
+
+def filter_tracks(request, playlist_id):
+    """
+    JSON for the dashboard's filterable cards (track table, top artists and
+    charts), e.g. ?era=1990s&genre=pop&limit=50.
+    """
+    upload = get_session_upload(request, playlist_id)
+    return filter_tracks_response(request, upload.content_hash, lambda: load_filter_index(upload))
+
+def library_filter_tracks(request):
+    library = get_session_library(request)
+    return filter_tracks_response(request, library.content_hash, library.filter_index)
+
+def filter_tracks_response(request, content_hash, load_index):
+    filters = {dimension: request.GET.get(dimension) for dimension in FILTER_DIMENSIONS}
+    try:
+        limit = max(1, int(request.GET.get('limit', DEFAULT_TRACK_LIMIT)))
+    except ValueError:
+        limit = DEFAULT_TRACK_LIMIT
+
+    index = get_filter_index(content_hash, load_index)
+    return JsonResponse(index.query(filters, limit=limit))
+
+def track_list_etag(request, playlist_id):
+    upload = get_session_upload(request, playlist_id)
+    if not upload.content_hash:
+        return None
+    return f"{upload.content_hash}-{TRACK_LIST_VERSION}"
+
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=track_list_etag)
+def track_list(request, playlist_id):
+    """
+    Per-track data for the tracks table and mood map, in the compact
+    columnar format from encode_track_list. The content never changes for
+    a given content hash and layout version, so browsers revalidate with
+    the ETag on every request and get 304s.
+    """
+    upload = get_session_upload(request, playlist_id)
+    body = get_track_list_json(upload.content_hash, lambda: encode_track_list(load_aggregate(upload)))
+    return HttpResponse(body, content_type='application/json')
+
+def library_track_list_etag(request):
+    return f"{get_session_library(request).content_hash}-{TRACK_LIST_VERSION}"
+
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=library_track_list_etag)
+def library_track_list(request):
+    """
+    track_list for the whole library. Its URL stays the same as playlists
+    are added and deleted, so browsers must revalidate with the ETag on
+    every request rather than reuse a stored copy.
+    """
+    library = get_session_library(request)
+    body = get_track_list_json(library.content_hash, lambda: encode_track_list(library.aggregate()))
+    return HttpResponse(body, content_type='application/json')
+
 def delete_history(request, playlist_id):
-    history = request.session.get('history', [])
+    history = get_history(request)
     # Filter out the playlist with the given ID
     new_history = [p for p in history if p['id'] != playlist_id]
-    request.session['history'] = new_history
+    if len(new_history) != len(history):
+        # Only release uploads that belong to this session; others may still share it
+        release_upload(playlist_id)
+        prune_tracks(DEMO_URI_PREFIX)
+    set_history(request, new_history)
     return redirect('dashboard')